@@ -1,17 +1,18 @@
-import websocket
-import json
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import ssl
+import logging
+import threading
 import time
+import uuid
 import pandas as pd
-from arch import arch_model
 import numpy as np
 import streamlit as st 
-import matplotlib.pyplot as plt
 import plotly.graph_objs as go
-import requests
+from engine import calculer_lambdas
+from service import ServiceVolatilite
+from rapports import RepartiteurRapports
+from historique import decouvrir_instruments
+from partition import MoteurReparti
+from plages import NOMS_ESTIMATEURS
+from alertes import RegleSeuil, RegleZScore, RegleDivergence, PuitsEmail, DECLENCHEE
 
 
 
@@ -29,15 +30,26 @@ st.set_page_config(
     }
 )
 # Initialisation de st.session_state pour stocker les données
-if "volatility_data" not in st.session_state:
-    st.session_state.volatility_data = {}
-if "data_list" not in st.session_state:
-    st.session_state.data_list = {}
 if "chart_fig" not in st.session_state:
     st.session_state.chart_fig = go.Figure()
-if "last_chart_update" not in st.session_state:
-    st.session_state.last_chart_update = 0
+if "chart_versions" not in st.session_state:
+    st.session_state.chart_versions = {}
     
+# Instruments proposés si la découverte de l'univers Deribit échoue
+ACTIFS_PAR_DEFAUT = ["BTC-PERPETUAL", "ETH-PERPETUAL", "SOL-PERPETUAL", "ADA-PERPETUAL", "AVAX-PERPETUAL"]
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def obtenir_instruments():
+    """Univers des perpétuels et futures Deribit actifs, rafraîchi toutes les heures."""
+    return decouvrir_instruments() or ACTIFS_PAR_DEFAUT
+
+
+# Facteurs et demi-vies supplémentaires proposés : le service partagé les calcule tous, chaque session choisit
+# lesquels afficher (la banque EWMA les met à jour en une seule opération vectorisée)
+LAMBDAS_PROPOSES = [0.90, 0.97, 0.99]
+DEMI_VIES_PROPOSEES = [60, 300, 900, 3600]
+
 # Barre latérale pour la sélection du stock/actif
 st.sidebar.title("Volatility Analysis Settings")
 
@@ -45,124 +57,205 @@ st.sidebar.title("Volatility Analysis Settings")
 
 selected_assets = st.sidebar.multiselect(
         "Choose the cryptocurrencies:",
-        ["BTC-PERPETUAL", "ETH-PERPETUAL", "SOL-PERPETUAL", "ADA-PERPETUAL", "AVAX-PERPETUAL"]
+        obtenir_instruments()
     )
 
 # Champs de saisie pour l'email, la fenêtre de données, et l'intervalle de prédiction dans la sidebar
 to_email = st.sidebar.text_input("Enter your email address to receive reports:")
-data_window = st.sidebar.number_input("Enter the data window size (number of data points):", min_value=50, max_value=500, value=100, step=10)
+data_window = st.sidebar.number_input("Enter the data window size (number of data points):", min_value=50, max_value=10000, value=100, step=10)
 time_between_predictions = st.sidebar.number_input("Time interval between predictions (in seconds):", min_value=0.1, max_value=60.0, value=10.0, step=0.1)
+warmup_hours = st.sidebar.number_input("Warm-up history (in hours):", min_value=1, max_value=168, value=1, step=1)
+volatility_retention = st.sidebar.number_input("Volatility history retention (number of estimates kept per asset):", min_value=1000, max_value=500000, value=20000, step=1000)
+extra_lambdas = st.sidebar.multiselect("Additional EWMA decay factors (λ):", LAMBDAS_PROPOSES, default=[])
+half_lives = st.sidebar.multiselect("Additional EWMA half-lives (in seconds):", DEMI_VIES_PROPOSEES, default=[])
+garch_enabled = st.sidebar.checkbox("GARCH(1,1) forecast alongside EWMA")
+garch_refit = st.sidebar.number_input("GARCH refit cadence (number of bars between refits):", min_value=10, max_value=10000, value=60, step=10)
+range_enabled = st.sidebar.checkbox("Range-based estimators (Parkinson, Garman-Klass, Rogers-Satchell, Yang-Zhang)")
+alert_threshold = st.sidebar.number_input("Alert when volatility exceeds (0 to disable):", min_value=0.0, value=0.0, step=0.0001, format="%.6f")
+alert_zscore = st.sidebar.number_input("Alert on volatility z-score jumps above (0 to disable):", min_value=0.0, max_value=20.0, value=0.0, step=0.5)
+alert_divergence = st.sidebar.number_input("Alert when fast/slow EWMA volatility ratio exceeds (0 to disable):", min_value=0.0, max_value=10.0, value=0.0, step=0.1)
+universe_enabled = st.sidebar.checkbox("Track the whole instrument universe (sharded across worker processes)")
+universe_workers = st.sidebar.number_input("Number of worker processes:", min_value=1, max_value=64, value=4, step=1)
 
 # Titre et description de l'application
 st.sidebar.title(f"Real-time volatility (EWMA) for selected assets")
 st.sidebar.write(f"This Streamlit application enables you to track the volatility of multiple assets in real time, calculated instantly from market data transmitted via WebSocket. An interactive graph continuously illustrates changes in the volatility of these assets. When 100 real-time estimates are collected, a full report is automatically sent by e-mail.")
 
-# Placeholder pour le graphique
-chart_placeholder = st.empty()
-
-# Placeholder pour le statut des données
-status_placeholder = st.container()
-with status_placeholder:
-    st.subheader("Data and Volatility Status")
-    data_status = {asset: st.empty() for asset in selected_assets}
+# Conteneur du graphique et du tableau de progression (rafraîchis par un fragment, voir afficher_tableau_de_bord)
+dashboard_container = st.container()
 
 if not to_email:
     st.warning("Please enter your email address to receive the volatility reports.")
     st.stop()
-status_placeholder = st.container()
-progress_bar = st.progress(0)
 
 
-# URL du WebSocket Deribit (environnement de test ou production)
-DERIBIT_WS_URL = "wss://test.deribit.com/ws/api/v2"
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s : %(message)s")
+
+# Intervalle minimal entre deux rafraîchissements de l'affichage (secondes)
+INTERVALLE_RAFRAICHISSEMENT_MIN = 1.0
 
-# Variables pour stocker les données par actif
-subscribed_channels = set()
+# Port local des métriques Prometheus du service partagé (/metrics)
+PORT_METRIQUES = 9464
 
-collecte_terminee = False  
-last_volatility_calc_time = time.time() - 3 
-# Initialisation des espaces dans st.session_state si non définis
-# Initialisation des espaces dans st.session_state si non définis
-if "data_list" not in st.session_state:
-    st.session_state.data_list = {asset: [] for asset in selected_assets}
-if "volatility_data" not in st.session_state:
-    st.session_state.volatility_data = {asset: [] for asset in selected_assets}
 
+def regles_alertes(seuil, zscore, divergence):
+    """Règles d'alerte choisies dans la barre latérale (une valeur nulle désactive la règle)."""
+    regles = []
+    if seuil:
+        regles.append(RegleSeuil(seuil))
+    if zscore:
+        regles.append(RegleZScore(zscore))
+    if divergence:
+        regles.append(RegleDivergence(divergence))
+    return regles
 
 
+@st.cache_resource
+def registre_ressources():
+    """Ressources partagées en cours (une seule par nom), avec la configuration qui les a créées."""
+    return {"verrou": threading.Lock()}
 
-def reset_session_state():
-    if "volatility_data" not in st.session_state:
-        st.session_state.volatility_data = {asset: [] for asset in selected_assets}
-    if "data_list" not in st.session_state:
-        st.session_state.data_list = {asset: [] for asset in selected_assets}
 
-# Initialisation des espaces dans st.session_state au démarrage
-if "app_initialized" not in st.session_state:
-    # Réinitialisation des données
-    reset_session_state()
-    # Marquer l'application comme initialisée
-    st.session_state.app_initialized = True
+def ressource_unique(nom, configuration, creer, arreter):
+    """
+    Ressource partagée par toutes les sessions, recréée seulement si sa configuration change : l'ancienne est
+    alors arrêtée (connexion, threads, processus, port), de sorte qu'une seule instance vit à la fois.
+    """
+    registre = registre_ressources()
+    with registre["verrou"]:
+        courante = registre.get(nom)
+        if courante is not None and courante[0] == configuration:
+            return courante[1]
+        if courante is not None:
+            arreter(courante[1])
+        ressource = creer()
+        registre[nom] = (configuration, ressource)
+        return ressource
+
+
+def creer_service(intervalle):
+    """
+    Service de flux et de calcul partagé par toutes les sessions : une seule connexion WebSocket et un seul
+    calcul EWMA, quel que soit le nombre de spectateurs. Les réglages propres à une session sont appliqués
+    ensuite en cours de route (voir ServiceVolatilite.configurer).
+    """
+    # Les rapports sont construits et envoyés en arrière-plan, par lots sur une même connexion SMTP
+    repartiteur = RepartiteurRapports(st.secrets["email_credentials"]["FROMEMAIL"],
+                                      st.secrets["email_credentials"]["EMAILPASSWORD"])
+
+    def envoyer_rapport(asset, volatility_data, destinataire_email, correlation=None):
+        repartiteur.soumettre(volatility_data, destinataire_email, asset=asset, correlation=correlation)
+
+    service = ServiceVolatilite(
+        intervalle=intervalle,
+        client_id=st.secrets["api_credentials"]["API_KEY"],
+        client_secret=st.secrets["api_credentials"]["API_SECRET"],
+        rapporteur=envoyer_rapport,
+        lambdas=tuple(LAMBDAS_PROPOSES),
+        demi_vies=tuple(DEMI_VIES_PROPOSEES),
+        port_metriques=PORT_METRIQUES,
+    )
+    # Les alertes déclenchées sont aussi envoyées par e-mail, à la seule session propriétaire de la règle
+    service.alertes.ajouter_puits(PuitsEmail(repartiteur, service.destinataires_alerte))
+    service.repartiteur = repartiteur
+    repartiteur.metriques = service.metriques
+    service.metriques.jauge("rapports_en_attente", lambda: repartiteur.statistiques()["en_attente"])
+    return service
 
 
+def arreter_service(service):
+    service.arreter()
+    service.repartiteur.arreter()
 
-# Fonction utilitaire pour récupérer les données de volatilité en cache
-def get_cached_volatility_data(asset):
-    """Récupère ou initialise les données de volatilité pour un actif donné."""
-    if asset not in st.session_state.volatility_data:
-        st.session_state.volatility_data[asset] = []
-    return st.session_state.volatility_data[asset]
 
+def obtenir_service(intervalle):
+    """Service partagé : seul l'intervalle des barres définit le flux et impose de le recréer."""
+    return ressource_unique("service", intervalle, lambda: creer_service(intervalle), arreter_service)
 
-# Fonction utilitaire pour récupérer ou initialiser les fenêtres de prix
-def get_cached_price_data(asset):
-    """Récupère ou initialise les données de prix pour un actif donné."""
-    if asset not in st.session_state.data_list:
-        st.session_state.data_list[asset] = []
-    return st.session_state.data_list[asset]
 
-# Fonction pour mettre à jour le graphique
-def update_chart():
+def obtenir_moteur_reparti(instruments, nb_workers, data_window, intervalle, warmup_hours):
     """
-    Met à jour le graphique en ajoutant les nouvelles données sans créer de doublons.
-    Cette version utilise un index pour les traces et optimise les mises à jour incrémentielles.
+    Moteur réparti partagé par toutes les sessions : l'univers est suivi par `nb_workers` processus,
+    qui publient dans une table en mémoire partagée lue directement par l'interface.
     """
-    current_time = time.time()
+    def creer():
+        moteur = MoteurReparti(
+            instruments, nb_workers=nb_workers, duree_prechauffage=warmup_hours * 3600, data_window=data_window,
+            intervalle=intervalle, lambdas=tuple(LAMBDAS_PROPOSES), demi_vies=tuple(DEMI_VIES_PROPOSEES),
+            client_id=st.secrets["api_credentials"]["API_KEY"], client_secret=st.secrets["api_credentials"]["API_SECRET"],
+        )
+        moteur.demarrer()
+        return moteur
 
-    # Respecter l'intervalle minimal entre les mises à jour
-    if current_time - st.session_state["last_chart_update"] < time_between_predictions:
-        return
+    return ressource_unique("moteur_reparti", (instruments, nb_workers, data_window, intervalle, warmup_hours), creer,
+                            lambda moteur: moteur.arreter())
 
+
+# Fonction pour mettre à jour le graphique
+def update_chart(instantane, metriques=None, lambdas_affiches=()):
+    """
+    Met à jour le graphique à partir de l'instantané partagé, sans créer de doublons.
+    Seules les traces des actifs ayant reçu de nouveaux points sont remplacées ; les séries
+    de l'instantané sont déjà sous-échantillonnées (seaux min/max) par le service : le coût de
+    rafraîchissement et la taille envoyée au navigateur restent constants.
+    """
+    debut = time.perf_counter_ns()
     fig = st.session_state["chart_fig"]
 
+    # Retirer les traces d'actifs ou de séries que la session n'affiche plus
+    attendues = {f'Volatility (EWMA) - {asset}' for asset in selected_assets}
+    attendues.update(f'Volatility (EWMA λ={lam:.4g}) - {asset}' for lam in lambdas_affiches for asset in selected_assets)
+    if garch_enabled:
+        attendues.update(f'Volatility (GARCH) - {asset}' for asset in selected_assets)
+    if range_enabled:
+        attendues.update(f'Volatility ({nom}) - {asset}' for nom in NOMS_ESTIMATEURS.values() for asset in selected_assets)
+    if any(trace.name not in attendues for trace in fig.data):
+        fig.data = [trace for trace in fig.data if trace.name in attendues]
+
     # Créer un index des noms des traces existantes pour des recherches rapides
     existing_traces = {trace.name: i for i, trace in enumerate(fig.data)}
     updated = False  # Indicateur de modification
 
     for asset in selected_assets:
-        # Récupérer les données de volatilité en cache pour l'actif
-        cached_volatility = get_cached_volatility_data(asset)
-
-        if len(cached_volatility) > 0:
-            # Convertir les données en DataFrame pour le traitement
-            df = pd.DataFrame(cached_volatility)
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-            trace_name = f'Volatility (EWMA) - {asset}'
-
-            if trace_name in existing_traces:
+        # Récupérer la série publiée pour l'actif
+        serie = instantane.series.get(asset)
+        trace_name = f'Volatility (EWMA) - {asset}'
+
+        if serie is None:
+            continue
+
+        # Ne rien reconstruire si aucun point n'a été ajouté depuis le dernier rafraîchissement
+        if trace_name in existing_traces and st.session_state.chart_versions.get(trace_name) == serie.nb_ajouts:
+            continue
+
+        # Série principale, puis une série parallèle (pointillés) par facteur supplémentaire choisi dans cette session
+        traces = [(trace_name, serie.timestamps, serie.volatilites, None)]
+        for lam, (x_banque, y_banque) in serie.banque.items():
+            if lam in lambdas_affiches:
+                traces.append((f'Volatility (EWMA λ={lam:.4g}) - {asset}', x_banque, y_banque, 'dot'))
+        if serie.garch is not None and garch_enabled:
+            traces.append((f'Volatility (GARCH) - {asset}', *serie.garch, 'dash'))
+        if range_enabled:
+            for nom, (x_plage, y_plage) in serie.plages.items():
+                traces.append((f'Volatility ({NOMS_ESTIMATEURS[nom]}) - {asset}', x_plage, y_plage, 'dashdot'))
+
+        for name, x, volatilities, dash in traces:
+            if name in existing_traces:
                 # Mise à jour de la trace existante
-                trace_index = existing_traces[trace_name]
-                fig.data[trace_index].x = df['timestamp']
-                fig.data[trace_index].y = df['volatility']
+                trace_index = existing_traces[name]
+                fig.data[trace_index].x = x
+                fig.data[trace_index].y = volatilities
             else:
                 # Ajout d'une nouvelle trace si elle n'existe pas
                 fig.add_trace(go.Scatter(
-                    x=df['timestamp'],
-                    y=df['volatility'],
+                    x=x,
+                    y=volatilities,
                     mode='lines',
-                    name=trace_name
+                    name=name,
+                    line=dict(dash=dash)
                 ))
-            updated = True
+        st.session_state.chart_versions[trace_name] = serie.nb_ajouts
+        updated = True
 
     # Appliquer les mises à jour si le graphique a été modifié
     if updated:
@@ -173,432 +266,162 @@ def update_chart():
             template="plotly_dark"
         )
         st.session_state["chart_fig"] = fig  # Sauvegarder le graphique mis à jour dans st.session_state
-        chart_placeholder.plotly_chart(fig, use_container_width=True)
-        st.session_state["last_chart_update"] = current_time
-
-
-
-def appliquer_modele_ewma(asset, price_data, lambda_factor=0.94):
-    prices = pd.Series([item['mark_price'] for item in price_data])
-    if len(prices) < 2:
-        return None
-    returns = np.log(prices / prices.shift(1)).dropna()
-
-    # Démarrage avec la dernière variance stockée
-    variance = st.session_state.get(f"{asset}_last_variance", returns.var())
-    for r in returns:
-        variance = lambda_factor * variance + (1 - lambda_factor) * r ** 2
-    st.session_state[f"{asset}_last_variance"] = variance  # Sauvegarde
-    volatility = np.sqrt(variance)
-    timestamp = time.time()
-    get_cached_volatility_data(asset).append({'timestamp': timestamp, 'volatility': volatility})
-    return volatility
-
-def on_message(ws, message):
-    """Gère les messages reçus via WebSocket et traite les données en temps réel."""
-    global last_volatility_calc_time
-
-    # Charger la réponse JSON
-    response = json.loads(message)
-
-    # Log : Réponse brute reçue
-    print(f"Message reçu : {json.dumps(response, indent=4)}")
-
-    # Gestion des messages d'authentification
-    if 'id' in response and 'result' in response:
-        print("Message d'authentification reçu ou autre réponse.")
-        if response['id'] == 9929:  # ID correspondant à l'authentification
-            print("Authentification réussie.")
-        return  # Ne rien faire d'autre avec ces messages
-
-    # Vérifier si les données contiennent des informations pertinentes
-    if 'params' in response and 'data' in response['params']:
-        data = response['params']['data']
-
-        # Vérifier que les données contiennent un prix marqué
-        if 'mark_price' in data:
-            asset = response['params']['channel'].split('.')[1]  # Extraction de l'actif
-            print(f"Asset détecté : {asset}")
-
-            if asset in selected_assets:
-                # Récupérer ou initialiser les données de prix pour cet actif
-                cached_prices = get_cached_price_data(asset)
-
-                # Ajouter les nouvelles données de prix avec un timestamp
-                cached_prices.append({
-                    'timestamp': time.time(),
-                    'mark_price': data['mark_price']
-                })
-
-                # Log : Données ajoutées
-                print(f"Nouvelles données de prix ajoutées pour {asset}: {cached_prices[-1]}")
-
-                # Limiter la taille de la fenêtre de données
-                if len(cached_prices) > data_window:
-                    removed = cached_prices.pop(0)
-                    
-                    print(f"Donnée supprimée pour {asset} (fenêtre limitée à {data_window}): {removed}")
-                # Mettre à jour `st.session_state`
-                st.session_state.data_list[asset] = cached_prices
-
-                # Log : Longueur actuelle des données de prix
-                print(f"Longueur des données de prix pour {asset}: {len(cached_prices)}")
-
-                # Vérifier si le temps écoulé permet un nouveau calcul de volatilité
-                current_time = time.time()
-                time_since_last_calc = current_time - last_volatility_calc_time
-                print(f"Temps depuis le dernier calcul de volatilité : {time_since_last_calc:.2f} secondes")
-
-                if time_since_last_calc >= time_between_predictions:
-                    print(f"Calcul de la volatilité pour {asset} en cours...")
-
-                    # Calculer la volatilité en utilisant le modèle EWMA
-                    new_volatility = appliquer_modele_ewma(asset, cached_prices)
-                    afficher_progression()
-
-                    if new_volatility is not None:
-                        print(f"Nouvelle volatilité calculée pour {asset}: {new_volatility}")
-
-                    # Mettre à jour le graphique
-                    update_chart()
-
-                    # Mettre à jour le temps du dernier calcul
-                    last_volatility_calc_time = current_time
-                else:
-                    print(f"Aucun calcul effectué pour {asset} (attente du prochain intervalle).")
-            else:
-                print(f"L'actif {asset} n'est pas sélectionné pour l'analyse.")
-        else:
-            print("Aucun prix marqué trouvé dans les données reçues. Ignoré.")
-    else:
-        print("Structure de données inattendue dans le message. Ignoré.")
-
-
-
-
-
-
-def envoyer_email_rapport_volatilites(volatility_data):
-    email_expediteur = st.secrets["email_credentials"]["FROMEMAIL"]
-    mot_de_passe = st.secrets["email_credentials"]["EMAILPASSWORD"]
-    destinataire_email = to_email
-    serveur_smtp = "smtp.gmail.com"
-    port_smtp = 587  
-
-    msg = MIMEMultipart("alternative")
-    msg['From'] = email_expediteur
-    msg['To'] = destinataire_email
-    msg['Subject'] = "Rapport des 100 derniers indices de volatilité - Modèle EWMA"
-
-    message_html = """
-    <html>
-        <body>
-            <p>Bonjour,</p>
-            <p>Veuillez trouver ci-dessous le rapport des <strong>100 derniers indices de volatilité</strong> générés par le modèle EWMA :</p>
-            <table border="1" cellpadding="5" cellspacing="0" style="border-collapse: collapse; width: 100%;">
-                <thead>
-                    <tr style="background-color: #f2f2f2;">
-                        <th style="text-align: left;">Timestamp</th>
-                        <th style="text-align: left;">Volatilité</th>
-                    </tr>
-                </thead>
-                <tbody>
-    """
-
-    for entry in volatility_data:
-        time_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['timestamp']))
-        volatilite_str = f"{entry['volatility']:.6f}"
-        message_html += f"""
-                    <tr>
-                        <td>{time_str}</td>
-                        <td>{volatilite_str}</td>
-                    </tr>
-        """
-
-    message_html += """
-                </tbody>
-            </table>
-            <p>Merci et à bientôt,</p>
-            <p><em>Équipe d'analyse des données financières</em></p>
-        </body>
-    </html>
-    """
-
-    msg.attach(MIMEText(message_html, "html"))
-
-    try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP(serveur_smtp, port_smtp) as serveur:
-            serveur.starttls(context=context)
-            serveur.login(email_expediteur, mot_de_passe)
-            serveur.sendmail(email_expediteur, destinataire_email, msg.as_string())
-            print("Email envoyé avec succès!")
-    except Exception as e:
-        print(f"Erreur lors de l'envoi de l'email : {e}")
-
-
+    st.plotly_chart(fig, use_container_width=True)
+    if metriques is not None:
+        metriques.observer("rafraichissement_graphique", time.perf_counter_ns() - debut)
 
 
-def on_open(ws):
-    """Gestion de l'ouverture de la connexion WebSocket."""
-    print("Connexion ouverte")
 
-    # Authentification
-    auth_message = {
-        "jsonrpc": "2.0",
-        "id": 9929,
-        "method": "public/auth",
-        "params": {
-            "grant_type": "client_credentials",
-            "client_id": st.secrets["api_credentials"]["API_KEY"],
-            "client_secret": st.secrets["api_credentials"]["API_SECRET"]
-        }
-    }
-    ws.send(json.dumps(auth_message))
-    print("Message d'authentification envoyé")
-
-    # Souscription unique aux actifs sélectionnés
-    for asset in selected_assets:
-        channel_ticker = f"ticker.{asset}.raw"
-        if channel_ticker not in subscribed_channels:
-            subscribe_message = {
-                "jsonrpc": "2.0",
-                "method": "public/subscribe",
-                "params": {"channels": [channel_ticker]},
-                "id": 43
-            }
-            ws.send(json.dumps(subscribe_message))
-            subscribed_channels.add(channel_ticker)
-            print(f"Souscrit au canal {channel_ticker}")
-
-
-def on_error(ws, error):
-    """Gestion des erreurs de la connexion WebSocket."""
-    print("Erreur : ", error)
-
-    if "too_many_requests" in str(error):
-        print("Trop de requêtes envoyées. Attente prolongée avant de réessayer...")
-        time.sleep(30)  # Attendre plus longtemps avant de réessayer
+def afficher_correlation(instantane):
+    """Carte de chaleur de la corrélation EWMA entre les actifs de la session."""
+    correlation = instantane.correlation
+    if correlation is None:
         return
-
-
-
-# Limite les tentatives de reconnexion
-reconnection_attempts = 0
-
-def on_close(ws, close_status_code, close_msg):
-    """Gestion de la fermeture de la connexion WebSocket."""
-    global reconnection_attempts
-    print(f"Connexion fermée : Code {close_status_code}, Message : {close_msg}")
-
-    if close_status_code == 1000:
-        print("Connexion fermée volontairement.")
+    indices = [correlation.assets.index(asset) for asset in selected_assets if asset in correlation.assets]
+    if len(indices) < 2:
         return
-
-    if reconnection_attempts < 10:  # Limite des tentatives de reconnexion
-        delay = min(2 ** reconnection_attempts, 60)  # Exponential backoff avec un maximum de 60 secondes
-        print(f"Tentative de reconnexion dans {delay} secondes...")
-        time.sleep(delay)
-        reconnection_attempts += 1
-        ws.run_forever()
-    else:
-        print("Nombre maximal de tentatives de reconnexion atteint. Arrêt.")
-
-
-
-
-def calculer_volatilite_initiale(asset, historique_data, lambda_factor=0.94):
-    """
-    Calcule la volatilité initiale à partir des données historiques et l'enregistre dans st.session_state.
-    """
-    # Vérifiez qu'il y a au moins 2 points pour calculer les rendements
-    if len(historique_data) < 2:
-        st.warning(f"Pas assez de données historiques pour {asset}.")
+    noms = [correlation.assets[i] for i in indices]
+    matrice = correlation.matrice[np.ix_(indices, indices)]
+    fig = go.Figure(go.Heatmap(z=matrice, x=noms, y=noms, zmin=-1, zmax=1, colorscale="RdBu", reversescale=True,
+                               text=np.round(matrice, 2), texttemplate="%{text}"))
+    fig.update_layout(title="EWMA correlation", template="plotly_dark", yaxis_autorange="reversed")
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def afficher_alertes(instantane):
+    """Dernières alertes des actifs de la session."""
+    alertes = [alerte for alerte in instantane.alertes
+               if alerte.asset in selected_assets and alerte.regle in st.session_state.get("regles_alertes", ())]
+    if not alertes:
         return
-
-    # Récupérer ou initialiser la liste des volatilités pour l'actif
-    if asset not in st.session_state.volatility_data:
-        st.session_state.volatility_data[asset] = []
-
-    # Extraire les prix et calculer les rendements log
-    prices = pd.Series([item['mark_price'] for item in historique_data])
-    returns = np.log(prices / prices.shift(1)).dropna()
-    variance = returns.var()
-
-    volatility_points = []  # Liste temporaire pour stocker les points calculés
-
-    # Calculer la volatilité avec EWMA
-    for i, r in enumerate(returns):
-        variance = lambda_factor * variance + (1 - lambda_factor) * (r ** 2)
-        volatility = np.sqrt(variance)
-
-        # Stocker chaque volatilité calculée avec le timestamp correspondant
-        volatility_points.append({
-            'timestamp': historique_data[i + 1]['timestamp'],  # Décalage pour aligner avec returns
-            'volatility': volatility
-        })
-
-    # Ajouter les points calculés à st.session_state.volatility_data
-    st.session_state.volatility_data[asset].extend(volatility_points)
-
-    # Afficher un message avec le nombre de points calculés
-    st.write(f"Volatilité initiale calculée pour {asset}. Points calculés : {len(volatility_points)}.")
-
-
-
-def charger_donnees_tick_deribit(asset):
-    """
-    Cette fonction récupère des données de l'heure précédente pour un actif donné via l'API de Deribit,
-    et retourne une liste de dictionnaires au format :
-    [
-        {
-            'timestamp': <timestamp en secondes>,
-            'mark_price': <prix de clôture>
-        },
-        ...
-    ]
-    """
-    url = "https://www.deribit.com/api/v2/public/get_tradingview_chart_data"
-
-    # Calcul des timestamps pour l'heure précédente (en millisecondes)
-    end_timestamp = int(time.time() * 1000)
-    start_timestamp = end_timestamp - 3600000  # 1 heure avant en millisecondes
-
-    params = {
-        "instrument_name": asset,
-        "resolution": "1",  # Résolution à 1 minute
-        "start_timestamp": start_timestamp,
-        "end_timestamp": end_timestamp
-    }
-
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # Vérifie si la requête a échoué
-        data = response.json()
-
-        # Vérifie si le résultat est valide et contient les clés nécessaires
-        if "result" in data and all(key in data["result"] for key in ["ticks", "close"]):
-            historique_data = [
-                {
-                    'timestamp': ts / 1000,
-                    'mark_price': close
-                } 
-                for ts, close in zip(data["result"]["ticks"], data["result"]["close"])
-            ]
-
-            # Exemple : création de DataFrame pour un éventuel usage interne
-            df = pd.DataFrame(historique_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-            # df_analyse = df.copy()
-            # df_analyse['variation'] = df['mark_price'].pct_change() * 100
-
-            return historique_data
-        else:
-            print(f"Les données de l'heure précédente pour {asset} ne sont pas disponibles ou sont incomplètes.")
-            return []
-
-    except requests.exceptions.RequestException as e:
-        print(f"Erreur de connexion pour récupérer les données de {asset}: {e}")
-        return []
-    except Exception as e:
-        print(f"Une erreur inattendue est survenue lors de la récupération des données pour {asset}: {e}")
-        return []
-
-
-
-def augmenter_resolution_historique(historique_data, interval_seconds):
-    """
-    Augmente la résolution des données historiques pour correspondre à l'intervalle défini par l'utilisateur.
-    :param historique_data: Liste de dicts contenant des timestamps et des prix.
-    :param interval_seconds: Intervalle cible en secondes.
-    :return: Nouvelle liste interpolée.
-    """
-    # Convertir les données historiques en DataFrame
-    df = pd.DataFrame(historique_data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')  # Convertir en datetime
-    df.set_index('timestamp', inplace=True)
-
-    # Générer une grille temporelle plus dense à l'intervalle désiré
-    new_index = pd.date_range(
-        start=df.index.min(),
-        end=df.index.max(),
-        freq=f"{interval_seconds}S"  # Fréquence basée sur l'intervalle utilisateur
-    )
-
-    # Appliquer l'interpolation linéaire pour les prix
-    df_interpolated = df.reindex(new_index).interpolate(method='linear')
-
-    # Retourner les données au format original (liste de dicts)
-    result = [
-        {'timestamp': ts.timestamp(), 'mark_price': price}
-        for ts, price in zip(df_interpolated.index, df_interpolated['mark_price'])
-    ]
-    return result
-
-def afficher_progression():
+    st.subheader("Volatility alerts")
+    st.dataframe(pd.DataFrame({
+        "Heure": (np.array([alerte.timestamp for alerte in alertes]) * 1000).astype("datetime64[ms]"),
+        "Actif": [alerte.asset for alerte in alertes],
+        "Règle": [alerte.regle for alerte in alertes],
+        "État": ["🔴 déclenchée" if alerte.etat == DECLENCHEE else "🟢 levée" for alerte in alertes],
+        "Valeur": [alerte.valeur for alerte in alertes],
+        "Seuil": [alerte.seuil for alerte in alertes],
+        "Volatilité": [alerte.volatilite for alerte in alertes],
+    }), hide_index=True)
+
+
+def afficher_progression(instantane):
     """
     Affiche un tableau unique mis à jour dynamiquement qui montre la progression
     des données de remplissage pour chaque actif.
     """
-    # Titre pour la section
-    st.subheader("Progression des données de remplissage")
+    # Collecter les données pour le tableau (actifs de cette session uniquement)
+    progression_data = [ligne for ligne in instantane.progression if ligne["Actif"] in selected_assets]
 
-    # Conteneur unique pour le tableau
-    if "progress_table" not in st.session_state:
-        st.session_state["progress_table"] = st.empty()  # Initialise un conteneur vide dans session_state
+    # Mettre à jour dynamiquement le tableau
+    st.subheader("Progression des données de remplissage")
+    st.dataframe(pd.DataFrame(progression_data))
 
-    # Collecter les données pour le tableau
-    progression_data = []
 
-    for asset in selected_assets:
-        # Récupérer les informations nécessaires
-        data_points = len(st.session_state.data_list.get(asset, []))
-        price_progress = f"{data_points}/{data_window}"  # Progression des prix
-        volatility_points = len(st.session_state.volatility_data.get(asset, []))
-        last_volatility = (
-            f"{st.session_state.volatility_data[asset][-1]['volatility']:.6f}"
-            if volatility_points > 0
-            else "N/A"
+@st.fragment(run_every=max(INTERVALLE_RAFRAICHISSEMENT_MIN, time_between_predictions))
+def afficher_tableau_de_bord(service):
+    """
+    Rafraîchit le graphique et le tableau à partir du dernier instantané publié, sur un minuteur propre
+    à l'interface : le rendu ne bloque jamais l'ingestion, qui tourne dans les threads du service.
+    """
+    instantane = service.instantane
+    colonne_graphique, colonne_correlation = st.columns([3, 2])
+    with colonne_graphique:
+        # Facteurs supplémentaires affichés dans cette session (mêmes valeurs que celles calculées par le service)
+        lambdas_affiches = set(calculer_lambdas(service.moteur.lambda_factor, extra_lambdas, half_lives,
+                                                service.moteur.intervalle)[1:])
+        update_chart(instantane, service.metriques, lambdas_affiches)
+    with colonne_correlation:
+        afficher_correlation(instantane)
+    afficher_alertes(instantane)
+    afficher_progression(instantane)
+
+    # Compteurs de la file d'entrée partagée (dimensionnement du déploiement)
+    stats = instantane.statistiques
+    if stats:
+        st.caption(
+            f"Messages reçus : {stats['recus']} · fusionnés : {stats['fusionnes']} · "
+            f"file : {stats['profondeur']} (max {stats['profondeur_max']}) · "
+            f"retard : {stats['dernier_retard'] * 1000:.1f} ms (max {stats['retard_max'] * 1000:.1f} ms)"
+        )
+    if "garch" in stats:
+        garch = stats["garch"]
+        st.caption(
+            f"Réajustements GARCH : {garch['ajustements']} (échecs : {garch['echecs']}) · "
+            f"latence : {garch['derniere_latence'] * 1000:.0f} ms (moyenne {garch['latence_moyenne'] * 1000:.0f} ms, "
+            f"max {garch['latence_max'] * 1000:.0f} ms) · optimisation : {garch['duree_ajustement'] * 1000:.0f} ms"
         )
 
-        # Ajouter une ligne pour cet actif dans les données du tableau
-        progression_data.append({
-            "Actif": asset,
-            "Progression des données de prix": price_progress,
-            "Données de volatilité (points)": volatility_points,
-            "Dernière volatilité calculée": last_volatility,
-        })
 
-    # Mettre à jour dynamiquement le tableau dans le conteneur unique
-    st.session_state["progress_table"].dataframe(pd.DataFrame(progression_data))
 
+# Nombre d'instruments affichés dans le tableau de l'univers
+NB_INSTRUMENTS_UNIVERS = 50
 
 
-if __name__ == "__main__":
-    # Traiter les données historiques pour chaque actif sélectionné
-    for asset in selected_assets:
-        historique_data = charger_donnees_tick_deribit(asset)
-        if historique_data:
-            historique_data = augmenter_resolution_historique(historique_data, int(time_between_predictions))
-            # Afficher les données interpolées pour vérifier
+@st.fragment(run_every=5)
+def afficher_univers(moteur_reparti):
+    """Instruments les plus volatils de tout l'univers, lus dans la table partagée des workers (sans copie côté moteur)."""
+    lignes = moteur_reparti.table.vue()
+    actifs = lignes["nb_ajouts"] > 0
+    ordre = np.flatnonzero(actifs)[np.argsort(lignes["volatilite"][actifs])[::-1][:NB_INSTRUMENTS_UNIVERS]]
+    st.subheader("Instrument universe")
+    st.dataframe(pd.DataFrame({
+        "Actif": [moteur_reparti.instruments[i] for i in ordre],
+        "Dernière volatilité calculée": lignes["volatilite"][ordre],
+        "Dernier prix": lignes["dernier_prix"][ordre],
+        "Ticks reçus": lignes["nb_ticks"][ordre],
+        "Données de volatilité (points)": lignes["nb_ajouts"][ordre],
+    }), hide_index=True)
+    stats = moteur_reparti.statistiques()
+    st.caption(f"Instruments : {stats['instruments']} · workers actifs : {stats['workers_actifs']}/{stats['workers']} · "
+               f"estimations : {stats['estimations']}")
 
 
-            # Calculer la volatilité initiale
-            calculer_volatilite_initiale(asset, historique_data)
+@st.fragment(run_every=5)
+def afficher_diagnostics(service):
+    """Panneau de diagnostic : durées par étape (histogrammes à seaux fixes), compteurs et jauges du service."""
+    resume = service.metriques.resume()
+    with st.expander("Diagnostics", expanded=False):
+        if resume["etapes"]:
+            st.dataframe(pd.DataFrame(resume["etapes"]).round(4), hide_index=True)
+        st.json({**resume["compteurs"], **resume["jauges"]})
+        st.caption(f"Prometheus : http://127.0.0.1:{PORT_METRIQUES}/metrics")
 
-        else:
-            st.warning(f"Pas de données historiques pour l'actif {asset}.")
 
-    # Mise à jour du graphique une seule fois après le traitement de toutes les données
-    update_chart()  # Affiche le graphique après avoir traité tous les actifs
-
-
-    # Lancement de la connexion WebSocket pour la collecte de données en temps réel
-    ws = websocket.WebSocketApp(
-        DERIBIT_WS_URL,
-        on_open=on_open,
-        on_message=on_message,
-        on_close=on_close,
-        on_error=on_error
-    )
-    ws.run_forever()
+if __name__ == "__main__":
+    # Rejoindre le flux partagé et s'inscrire aux rapports des actifs de cette session
+    service = obtenir_service(time_between_predictions)
+    service.configurer(data_window=data_window, retention=volatility_retention, duree_prechauffage=warmup_hours * 3600)
+    if garch_enabled:
+        service.activer_garch(garch_refit)
+    if range_enabled:
+        service.activer_plages()
+    # Les règles de la session remplacent celles de son passage précédent ; ses alertes ne sont envoyées qu'à elle
+    id_session = st.session_state.setdefault("id_session", uuid.uuid4().hex)
+    st.session_state.regles_alertes = service.ajouter_regles_alertes(
+        regles_alertes(alert_threshold, alert_zscore, alert_divergence), id_session, to_email, selected_assets)
+    service.ajouter_actifs(selected_assets)
+    # Remplacer les inscriptions aux rapports faites par cette session lors du passage précédent (adresse ou actifs
+    # modifiés) ; un service recréé entre-temps ne connaît aucune des anciennes inscriptions
+    inscriptions = {(asset, to_email) for asset in selected_assets}
+    service_precedent, anciennes = st.session_state.get("inscriptions", (None, set()))
+    if service_precedent is not service:
+        anciennes = set()
+    for asset, email in anciennes - inscriptions:
+        service.retirer_destinataire(asset, email)
+    for asset, email in inscriptions - anciennes:
+        service.ajouter_destinataire(asset, email)
+    st.session_state.inscriptions = (service, inscriptions)
+
+    # Afficher le tableau de bord ; le fragment se rafraîchit ensuite seul (tout redessiner au premier passage)
+    st.session_state.chart_versions = {}
+    with dashboard_container:
+        afficher_tableau_de_bord(service)
+    with st.sidebar:
+        afficher_diagnostics(service)
+
+    if universe_enabled:
+        moteur_reparti = obtenir_moteur_reparti(tuple(obtenir_instruments()), universe_workers, data_window,
+                                                time_between_predictions, warmup_hours)
+        afficher_univers(moteur_reparti)
@@ -0,0 +1,534 @@
+"""
+Alertes de régime de volatilité, évaluées à chaque nouvelle estimation EWMA (voir MoteurVolatilite.appliquer_modele_ewma).
+
+Trois familles de règles :
+- RegleSeuil : la volatilité franchit un seuil absolu (à la hausse ou à la baisse) ;
+- RegleZScore : saut de la volatilité par rapport à sa propre distribution récente, suivie par une moyenne
+  et une variance EWMA du logarithme de la volatilité ;
+- RegleDivergence : le rapport entre un facteur rapide et un facteur lent de la banque EWMA s'écarte de 1.
+
+Toutes les statistiques sont incrémentales : chaque évaluation coûte un temps constant par règle, quelle que
+soit la longueur de l'historique. Une hystérésis (seuil de déclenchement et seuil de levée distincts) et un délai
+minimal entre deux déclenchements d'une même règle pour un même actif évitent les rafales d'alertes. Les alertes
+sont remises à des puits interchangeables (journal, mémoire, webhook HTTP, e-mail via RepartiteurRapports) ;
+les puits réseau envoient en arrière-plan et ne bloquent jamais le calcul.
+
+Récepteur de webhook local, pour tester les alertes sans service externe :
+
+    python App/alertes.py --port 8765
+"""
+import abc
+import argparse
+import json
+import logging
+import math
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from decodage import logger
+
+HAUSSE = "hausse"
+BAISSE = "baisse"
+
+# États d'une alerte remise aux puits
+DECLENCHEE = "declenchee"
+LEVEE = "levee"
+
+# Délai minimal (secondes, horodatage des estimations) entre deux déclenchements d'une même règle pour un même actif
+DELAI_REEMISSION = 300.0
+
+# Nombre d'alertes conservées par PuitsMemoire, et capacité de la file d'envoi de PuitsWebhook
+NB_ALERTES_MEMOIRE = 100
+CAPACITE_FILE_WEBHOOK = 1000
+
+Alerte = namedtuple("Alerte", ["asset", "regle", "etat", "timestamp", "valeur", "seuil", "volatilite", "message"])
+
+
+class Regle(abc.ABC):
+    """
+    Règle d'alerte : mesure une valeur à chaque estimation, comparée à `seuil` pour le déclenchement et à
+    `seuil_levee` pour la levée (hystérésis). Les statistiques propres à un actif sont conservées dans l'objet
+    retourné par nouvel_etat(), de sorte qu'une même règle sert pour tous les actifs.
+    """
+
+    description = "valeur"
+
+    def __init__(self, nom, seuil, seuil_levee, direction=HAUSSE):
+        if direction not in (HAUSSE, BAISSE):
+            raise ValueError(f"Direction inconnue : {direction!r}")
+        if (seuil_levee > seuil) if direction == HAUSSE else (seuil_levee < seuil):
+            raise ValueError(f"Le seuil de levée de la règle {nom!r} doit être en deçà du seuil de déclenchement.")
+        self.nom = nom
+        self.seuil = float(seuil)
+        self.seuil_levee = float(seuil_levee)
+        self.direction = direction
+
+    def preparer(self, lambdas):
+        """Appelée avec les facteurs de la banque EWMA du moteur, avant toute évaluation."""
+
+    def nouvel_etat(self):
+        return None
+
+    @abc.abstractmethod
+    def mesurer(self, etat, volatilites):
+        """
+        :param volatilites: Vecteur des volatilités de la banque EWMA (le premier élément est le facteur principal).
+        :return: Valeur comparée aux seuils, ou None si la règle ne peut pas encore conclure.
+        """
+
+    def depasse(self, valeur, seuil):
+        return valeur >= seuil if self.direction == HAUSSE else valeur <= seuil
+
+
+class RegleSeuil(Regle):
+    """Volatilité du facteur principal au-delà d'un seuil absolu (même unité que les estimations)."""
+
+    description = "volatilité"
+
+    def __init__(self, seuil, seuil_levee=None, direction=HAUSSE, nom=None):
+        if seuil_levee is None:
+            seuil_levee = seuil * (0.9 if direction == HAUSSE else 1.1)
+        super().__init__(nom or f"seuil_{direction}_{seuil:g}", seuil, seuil_levee, direction)
+
+    def mesurer(self, etat, volatilites):
+        return float(volatilites[0])
+
+
+class StatistiquesEWMA:
+    """Moyenne et variance EWMA incrémentales d'une série (une instance par actif et par règle)."""
+
+    __slots__ = ("moyenne", "variance", "nb_observations")
+
+    def __init__(self):
+        self.moyenne = None
+        self.variance = 0.0
+        self.nb_observations = 0
+
+    def ajouter(self, x, lambda_factor):
+        if self.moyenne is None:
+            self.moyenne = x
+        else:
+            ecart = x - self.moyenne
+            poids = 1.0 - lambda_factor
+            self.moyenne += poids * ecart
+            self.variance = lambda_factor * (self.variance + poids * ecart * ecart)
+        self.nb_observations += 1
+
+
+class RegleZScore(Regle):
+    """
+    Saut de la volatilité par rapport à sa distribution récente : z = (ln v - moyenne) / écart-type, où moyenne
+    et variance sont des EWMA de ln v de facteur `lambda_factor`. Le logarithme rend la distribution de la
+    volatilité à peu près symétrique. Le z est calculé avant d'intégrer la nouvelle valeur, puis les statistiques
+    sont mises à jour, y compris pendant une alerte, afin que la référence suive un changement de régime durable.
+    """
+
+    description = "z-score"
+
+    def __init__(self, seuil=3.0, seuil_levee=1.0, lambda_factor=0.99, nb_min_observations=30, direction=HAUSSE,
+                 nom=None):
+        if direction == BAISSE:
+            seuil, seuil_levee = -abs(seuil), -abs(seuil_levee)
+        super().__init__(nom or f"zscore_{direction}_{abs(seuil):g}", seuil, seuil_levee, direction)
+        self.lambda_factor = lambda_factor
+        self.nb_min_observations = int(nb_min_observations)
+
+    def nouvel_etat(self):
+        return StatistiquesEWMA()
+
+    def mesurer(self, etat, volatilites):
+        volatilite = float(volatilites[0])
+        if not volatilite > 0.0:
+            return None
+        x = math.log(volatilite)
+        z = None
+        if etat.nb_observations >= self.nb_min_observations and etat.variance > 0.0:
+            z = (x - etat.moyenne) / math.sqrt(etat.variance)
+        etat.ajouter(x, self.lambda_factor)
+        return z
+
+
+class RegleDivergence(Regle):
+    """
+    Divergence entre un facteur rapide et un facteur lent de la banque EWMA : rapport des volatilités
+    rapide / lente. Par défaut, le plus petit et le plus grand facteur de la banque ; un rapport élevé signale
+    une hausse récente de la volatilité que le facteur lent n'a pas encore absorbée.
+    """
+
+    description = "rapport rapide/lent"
+
+    def __init__(self, seuil=1.5, seuil_levee=None, rapide=None, lent=None, direction=HAUSSE, nom=None):
+        if seuil_levee is None:
+            seuil_levee = 1.0 + (seuil - 1.0) / 2.0
+        super().__init__(nom or f"divergence_{direction}_{seuil:g}", seuil, seuil_levee, direction)
+        self.rapide = rapide
+        self.lent = lent
+        self._indices = None
+
+    def preparer(self, lambdas):
+        lambdas = [float(lam) for lam in lambdas]
+        self._indices = None
+        if len(lambdas) < 2:
+            logger.warning("Règle %s inactive : la banque EWMA ne contient qu'un facteur (voir --lambdas/--half-lives).",
+                           self.nom)
+            return
+        rapide = min(lambdas) if self.rapide is None else self.rapide
+        lent = max(lambdas) if self.lent is None else self.lent
+        indices = [min(range(len(lambdas)), key=lambda i: abs(lambdas[i] - cible)) for cible in (rapide, lent)]
+        if indices[0] == indices[1]:
+            logger.warning("Règle %s inactive : facteurs rapide et lent identiques.", self.nom)
+            return
+        self._indices = tuple(indices)
+
+    def mesurer(self, etat, volatilites):
+        if self._indices is None:
+            return None
+        rapide, lent = self._indices
+        if not volatilites[lent] > 0.0:
+            return None
+        return float(volatilites[rapide] / volatilites[lent])
+
+
+class EtatRegle:
+    """État d'une règle pour un actif : alerte active, dernier déclenchement et statistiques propres à la règle."""
+
+    __slots__ = ("active", "dernier_declenchement", "statistiques")
+
+    def __init__(self, statistiques=None):
+        self.active = False
+        self.dernier_declenchement = -math.inf
+        self.statistiques = statistiques
+
+
+class MoteurAlertes:
+    """
+    Évalue les règles à chaque estimation d'un actif et remet les alertes aux puits.
+
+    Une règle se déclenche quand sa valeur atteint `seuil`, puis reste active (sans nouvelle alerte) jusqu'à
+    ce que sa valeur repasse `seuil_levee` ; la levée est aussi notifiée. Après un déclenchement, la même règle
+    ne peut plus se déclencher pour le même actif avant `delai_reemission` secondes (horodatage des estimations).
+
+    Une estimation dont l'horodatage n'est pas plus récent que la précédente du même actif est ignorée : une même
+    valeur n'entre jamais deux fois dans les statistiques glissantes (voir RegleZScore).
+
+    Une règle peut appartenir à des propriétaires (ex. les sessions du tableau de bord, voir proprietaires) : elle
+    est supprimée, avec ses états, quand son dernier propriétaire la retire. Une règle ajoutée sans propriétaire
+    (constructeur, ligne de commande) est permanente.
+    """
+
+    def __init__(self, regles=(), puits=(), delai_reemission=DELAI_REEMISSION, notifier_levees=True):
+        self.regles = list(regles)
+        self.puits = list(puits)
+        self.delai_reemission = float(delai_reemission)
+        self.notifier_levees = notifier_levees
+        self.lambdas = ()
+        self._proprietaires = {regle.nom: {None} for regle in self.regles}  # nom -> propriétaires (None : permanente)
+        self._etats = {}
+        self._derniers_timestamps = {}
+        self.nb_evaluations = 0
+        self.nb_declenchees = 0
+        self.nb_levees = 0
+        self.nb_supprimees = 0
+        self.nb_erreurs_puits = 0
+
+    def configurer(self, lambdas):
+        """Associe les règles aux facteurs de la banque EWMA du moteur (à rappeler si la banque change)."""
+        self.lambdas = tuple(lambdas)
+        for regle in self.regles:
+            regle.preparer(self.lambdas)
+
+    def ajouter_puits(self, puits):
+        self.puits.append(puits)
+
+    def ajouter_regle(self, regle, proprietaire=None):
+        """
+        Ajoute une règle en cours de route, sauf si une règle de même nom existe déjà : `proprietaire` est alors
+        ajouté aux propriétaires de la règle existante.
+        :return: La règle évaluée sous ce nom.
+        """
+        self._proprietaires.setdefault(regle.nom, set()).add(proprietaire)
+        for existante in self.regles:
+            if existante.nom == regle.nom:
+                return existante
+        regle.preparer(self.lambdas)
+        self.regles.append(regle)
+        return regle
+
+    def retirer_regles(self, proprietaire):
+        """
+        Retire un propriétaire de toutes ses règles ; celles qui n'ont plus de propriétaire sont supprimées
+        avec leurs états. Les règles permanentes (sans propriétaire) ne sont jamais retirées.
+        :return: Noms des règles supprimées.
+        """
+        if proprietaire is None:
+            return []
+        supprimees = []
+        for nom, proprietaires in list(self._proprietaires.items()):
+            if proprietaire in proprietaires:
+                proprietaires.discard(proprietaire)
+                if not proprietaires:
+                    del self._proprietaires[nom]
+                    supprimees.append(nom)
+        if supprimees:
+            garder = [regle.nom not in supprimees for regle in self.regles]
+            self.regles = [regle for regle, garde in zip(self.regles, garder) if garde]
+            # Les états sont alignés sur les règles (éventuellement moins nombreux, voir etats)
+            for asset, etats in self._etats.items():
+                self._etats[asset] = [etat for etat, garde in zip(etats, garder) if garde]
+        return supprimees
+
+    def proprietaires(self, nom):
+        """Propriétaires de la règle `nom` (sans le marqueur None des règles permanentes)."""
+        return {proprietaire for proprietaire in self._proprietaires.get(nom, ()) if proprietaire is not None}
+
+    def etats(self, asset):
+        etats = self._etats.get(asset)
+        if etats is None:
+            etats = self._etats[asset] = []
+        if len(etats) < len(self.regles):
+            # Règles ajoutées depuis la dernière évaluation de l'actif
+            etats.extend(EtatRegle(regle.nouvel_etat()) for regle in self.regles[len(etats):])
+        return etats
+
+    def actives(self):
+        """Liste des (actif, règle) dont l'alerte est actuellement déclenchée."""
+        return [(asset, regle.nom) for asset, etats in self._etats.items()
+                for regle, etat in zip(self.regles, etats) if etat.active]
+
+    def evaluer(self, asset, timestamp, volatilites):
+        """
+        Évalue toutes les règles pour une nouvelle estimation de l'actif, en temps constant.
+        :param volatilites: Volatilités de la banque EWMA (scalaire accepté si la banque n'a qu'un facteur).
+        :return: Liste des alertes émises (souvent vide).
+        """
+        if timestamp <= self._derniers_timestamps.get(asset, -math.inf):
+            return []
+        self._derniers_timestamps[asset] = timestamp
+        if not hasattr(volatilites, "__len__"):
+            volatilites = (volatilites,)
+        self.nb_evaluations += 1
+        alertes = []
+        for regle, etat in zip(self.regles, self.etats(asset)):
+            valeur = regle.mesurer(etat.statistiques, volatilites)
+            if valeur is None or not math.isfinite(valeur):
+                continue
+            if etat.active:
+                if regle.depasse(valeur, regle.seuil_levee):
+                    continue
+                etat.active = False
+                self.nb_levees += 1
+                if self.notifier_levees:
+                    alertes.append(self._alerte(asset, regle, LEVEE, timestamp, valeur, regle.seuil_levee, volatilites))
+            elif regle.depasse(valeur, regle.seuil):
+                if timestamp - etat.dernier_declenchement < self.delai_reemission:
+                    # Toujours au-delà du seuil pendant le délai : réévaluée aux estimations suivantes
+                    self.nb_supprimees += 1
+                    continue
+                etat.active = True
+                etat.dernier_declenchement = timestamp
+                self.nb_declenchees += 1
+                alertes.append(self._alerte(asset, regle, DECLENCHEE, timestamp, valeur, regle.seuil, volatilites))
+        for alerte in alertes:
+            self._remettre(alerte)
+        return alertes
+
+    def statistiques(self):
+        return {
+            "regles": len(self.regles),
+            "evaluations": self.nb_evaluations,
+            "declenchees": self.nb_declenchees,
+            "levees": self.nb_levees,
+            "supprimees": self.nb_supprimees,
+            "actives": len(self.actives()),
+            "erreurs_puits": self.nb_erreurs_puits,
+        }
+
+    def _alerte(self, asset, regle, etat, timestamp, valeur, seuil, volatilites):
+        sens = {(DECLENCHEE, HAUSSE): ">=", (DECLENCHEE, BAISSE): "<=", (LEVEE, HAUSSE): "<", (LEVEE, BAISSE): ">"}
+        message = (f"{asset} : alerte {regle.nom} {'déclenchée' if etat == DECLENCHEE else 'levée'}, "
+                   f"{regle.description} {valeur:.4g} {sens[etat, regle.direction]} {seuil:.4g} "
+                   f"(volatilité {float(volatilites[0]):.6g})")
+        return Alerte(asset, regle.nom, etat, timestamp, valeur, seuil, float(volatilites[0]), message)
+
+    def _remettre(self, alerte):
+        for puits in self.puits:
+            try:
+                puits(alerte)
+            except Exception:
+                self.nb_erreurs_puits += 1
+                logger.exception("Erreur du puits d'alertes %r.", puits)
+
+
+# --- Puits d'alertes ---------------------------------------------------------------------------
+
+def alerte_en_dict(alerte):
+    """Représentation JSON d'une alerte (corps des webhooks)."""
+    return dict(alerte._asdict(), timestamp=float(alerte.timestamp), valeur=float(alerte.valeur),
+                seuil=float(alerte.seuil))
+
+
+class PuitsLog:
+    """Écrit les alertes dans le journal de l'application."""
+
+    def __init__(self, niveau=logging.WARNING):
+        self.niveau = niveau
+
+    def __call__(self, alerte):
+        logger.log(self.niveau if alerte.etat == DECLENCHEE else logging.INFO, alerte.message)
+
+
+class PuitsMemoire:
+    """Conserve les dernières alertes en mémoire (affichage dans le tableau de bord)."""
+
+    def __init__(self, capacite=NB_ALERTES_MEMOIRE):
+        self._alertes = deque(maxlen=capacite)
+
+    def __call__(self, alerte):
+        self._alertes.append(alerte)
+
+    def recentes(self):
+        """Alertes conservées, de la plus récente à la plus ancienne."""
+        return list(reversed(self._alertes))
+
+
+class PuitsWebhook:
+    """
+    Envoie chaque alerte en JSON (HTTP POST) à une URL, depuis un thread dédié. La file d'envoi est bornée :
+    si le destinataire ne suit pas, les alertes en excès sont abandonnées plutôt que de ralentir le calcul.
+    """
+
+    def __init__(self, url, timeout=5.0, capacite=CAPACITE_FILE_WEBHOOK):
+        self.url = url
+        self.timeout = timeout
+        self.nb_envoyees = 0
+        self.nb_echecs = 0
+        self.nb_abandonnees = 0
+        self._file = queue.Queue(maxsize=capacite)
+        self._thread = threading.Thread(target=self._boucle, name="webhook-alertes", daemon=True)
+        self._thread.start()
+
+    def __call__(self, alerte):
+        try:
+            self._file.put_nowait(alerte)
+        except queue.Full:
+            self.nb_abandonnees += 1
+
+    def statistiques(self):
+        return {"en_attente": self._file.qsize(), "envoyees": self.nb_envoyees, "echecs": self.nb_echecs,
+                "abandonnees": self.nb_abandonnees}
+
+    def attendre(self, timeout=None):
+        """Attend l'envoi des alertes en file ; retourne False à l'expiration du délai."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._file.unfinished_tasks:
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _boucle(self):
+        while True:
+            alerte = self._file.get()
+            try:
+                requete = urllib.request.Request(self.url, data=json.dumps(alerte_en_dict(alerte)).encode("utf-8"),
+                                                 headers={"Content-Type": "application/json"}, method="POST")
+                with urllib.request.urlopen(requete, timeout=self.timeout) as reponse:
+                    reponse.read()
+                self.nb_envoyees += 1
+            except Exception as e:
+                self.nb_echecs += 1
+                logger.warning("Échec de l'envoi de l'alerte au webhook %s : %s", self.url, e)
+            finally:
+                self._file.task_done()
+
+
+class PuitsEmail:
+    """
+    Envoie les alertes déclenchées par e-mail, via la file d'envoi d'un RepartiteurRapports (connexion SMTP
+    partagée avec les rapports). `destinataires` est une liste d'adresses, ou une fonction alerte -> adresses
+    (ex. les adresses des propriétaires de la règle suivant l'actif, voir ServiceVolatilite.destinataires_alerte).
+    """
+
+    def __init__(self, repartiteur, destinataires, levees=False):
+        self.repartiteur = repartiteur
+        self.destinataires = destinataires
+        self.levees = levees
+
+    def __call__(self, alerte):
+        if alerte.etat == LEVEE and not self.levees:
+            return
+        destinataires = self.destinataires(alerte) if callable(self.destinataires) else self.destinataires
+        if not destinataires:
+            return
+        sujet = f"Alerte de volatilité - {alerte.asset} - {alerte.regle}"
+        horodatage = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(alerte.timestamp))
+        corps_html = f"""
+    <html>
+        <body>
+            <p>Bonjour,</p>
+            <p><strong>{alerte.message}</strong></p>
+            <p>Estimation du {horodatage}.</p>
+            <p><em>Équipe d'analyse des données financières</em></p>
+        </body>
+    </html>
+    """
+        for email in list(destinataires):
+            self.repartiteur.soumettre_message(email, sujet, corps_html)
+
+
+# --- Récepteur de webhook local ----------------------------------------------------------------
+
+def serveur_webhook_local(port, hote="127.0.0.1", puits=None):
+    """
+    Récepteur HTTP minimal des alertes envoyées par PuitsWebhook : chaque corps JSON reçu est journalisé
+    (ou remis à `puits`, appelé avec le dict de l'alerte). Le serveur tourne dans un thread de fond.
+    :return: Le serveur (arrêt par shutdown()).
+    """
+
+    class GestionnaireWebhook(BaseHTTPRequestHandler):
+        def do_POST(self):
+            longueur = int(self.headers.get("Content-Length") or 0)
+            try:
+                alerte = json.loads(self.rfile.read(longueur) or b"{}")
+            except ValueError:
+                self.send_error(400)
+                return
+            if puits is not None:
+                puits(alerte)
+            else:
+                logger.warning("Webhook reçu : %s", alerte.get("message", alerte))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    serveur = ThreadingHTTPServer((hote, port), GestionnaireWebhook)
+    threading.Thread(target=serveur.serve_forever, name="webhook-local", daemon=True).start()
+    logger.info("Récepteur de webhook d'alertes sur http://%s:%s/", hote, serveur.server_address[1])
+    return serveur
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Récepteur local des alertes de volatilité (webhook).")
+    parser.add_argument("--port", type=int, default=8765, help="Port d'écoute")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s : %(message)s")
+
+    serveur = serveur_webhook_local(args.port, args.host)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.shutdown()
+
+
+if __name__ == "__main__":
+    main()
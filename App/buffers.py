@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class RingBufferPrix:
+    """
+    Fenêtre glissante de prix à capacité fixe, préallouée en NumPy.
+    Les colonnes timestamp et prix (float64) sont stockées en double exemplaire
+    (positions i et i + capacité) afin que les N derniers points soient toujours
+    accessibles sous forme de vue contiguë, sans copie.
+    Avec `nb_colonnes`, chaque point porte un vecteur de valeurs (vues de forme (n, nb_colonnes)).
+    """
+
+    __slots__ = ("capacite", "nb_ajouts", "_timestamps", "_prix", "_debut", "_taille")
+
+    def __init__(self, capacite, nb_colonnes=None):
+        if capacite < 1:
+            raise ValueError("La capacité du buffer doit être au moins égale à 1.")
+        self.capacite = int(capacite)
+        self._timestamps = np.zeros(2 * self.capacite, dtype=np.float64)
+        forme = (2 * self.capacite,) if nb_colonnes is None else (2 * self.capacite, int(nb_colonnes))
+        self._prix = np.zeros(forme, dtype=np.float64)
+        self._debut = 0
+        self._taille = 0
+        self.nb_ajouts = 0  # Nombre total de points ajoutés depuis la création (y compris les points écrasés)
+
+    def __len__(self):
+        return self._taille
+
+    @property
+    def nb_colonnes(self):
+        """Nombre de valeurs par point, ou None pour une série scalaire."""
+        return self._prix.shape[1] if self._prix.ndim > 1 else None
+
+    def append(self, timestamp, prix):
+        """Ajoute un point en O(1) ; le plus ancien est écrasé lorsque le buffer est plein."""
+        if self._taille < self.capacite:
+            position = self._debut + self._taille
+            self._taille += 1
+        else:
+            position = self._debut
+            self._debut = (self._debut + 1) % self.capacite
+        self._timestamps[position] = timestamp
+        self._timestamps[position + self.capacite] = timestamp
+        self._prix[position] = prix
+        self._prix[position + self.capacite] = prix
+        self.nb_ajouts += 1
+
+    def extend(self, timestamps, prix):
+        """Ajoute un lot de points de manière vectorisée ; seuls les `capacite` derniers sont conservés."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prix = np.asarray(prix, dtype=np.float64)
+        n = len(prix)
+        if n == 0:
+            return
+        self.nb_ajouts += n
+        if n >= self.capacite:
+            for colonne, valeurs in ((self._timestamps, timestamps), (self._prix, prix)):
+                colonne[:self.capacite] = valeurs[-self.capacite:]
+                colonne[self.capacite:] = valeurs[-self.capacite:]
+            self._debut = 0
+            self._taille = self.capacite
+            return
+
+        positions = (self._debut + self._taille + np.arange(n)) % self.capacite
+        for colonne, valeurs in ((self._timestamps, timestamps), (self._prix, prix)):
+            colonne[positions] = valeurs
+            colonne[positions + self.capacite] = valeurs
+        total = self._taille + n
+        if total > self.capacite:
+            self._debut = (self._debut + total - self.capacite) % self.capacite
+            self._taille = self.capacite
+        else:
+            self._taille = total
+
+    def _bornes(self, n):
+        n = self._taille if n is None else min(int(n), self._taille)
+        fin = self._debut + self._taille
+        return fin - n, fin
+
+    def timestamps(self, n=None):
+        """Vue en lecture seule (sans copie) sur les n derniers timestamps, du plus ancien au plus récent."""
+        debut, fin = self._bornes(n)
+        vue = self._timestamps[debut:fin]
+        vue.flags.writeable = False
+        return vue
+
+    def prix(self, n=None):
+        """Vue en lecture seule (sans copie) sur les n derniers prix, du plus ancien au plus récent."""
+        debut, fin = self._bornes(n)
+        vue = self._prix[debut:fin]
+        vue.flags.writeable = False
+        return vue
+
+    def dernier(self):
+        """Retourne le dernier point (timestamp, prix), ou None si le buffer est vide."""
+        if self._taille == 0:
+            return None
+        position = self._debut + self._taille - 1
+        valeur = self._prix[position]
+        return float(self._timestamps[position]), (valeur.copy() if valeur.ndim else float(valeur))
+
+    def redimensionner(self, capacite):
+        """Change la capacité du buffer en conservant les points les plus récents."""
+        timestamps, prix = self.timestamps(capacite).copy(), self.prix(capacite).copy()
+        nb_ajouts = self.nb_ajouts
+        RingBufferPrix.__init__(self, capacite, self.nb_colonnes)
+        self.nb_ajouts = nb_ajouts
+        n = len(prix)
+        for colonne, valeurs in ((self._timestamps, timestamps), (self._prix, prix)):
+            colonne[:n] = valeurs
+            colonne[self.capacite:self.capacite + n] = valeurs
+        self._taille = n
+
+
+class HistoriqueVolatilite(RingBufferPrix):
+    """
+    Historique des volatilités estimées d'un actif, borné à `capacite` points.
+    Même stockage que RingBufferPrix ; la seconde colonne contient les volatilités (une par facteur
+    de décroissance `lambdas` pour l'historique d'une banque EWMA).
+    """
+
+    __slots__ = ("lambdas",)
+
+    def __init__(self, capacite, nb_colonnes=None, lambdas=None):
+        super().__init__(capacite, nb_colonnes)
+        self.lambdas = lambdas
+
+    volatilites = RingBufferPrix.prix
+
+
+def reduire_minmax(timestamps, valeurs, nb_points):
+    """
+    Sous-échantillonnage visuel par seaux min/max.
+    Découpe la série en environ nb_points / 2 seaux et conserve, pour chacun, le point
+    minimum et le point maximum (ainsi que le dernier point de la série), ce qui préserve
+    les pics tout en bornant le nombre de points tracés.
+    :return: Tuple (timestamps, valeurs) réduit, trié par ordre chronologique.
+    """
+    n = len(valeurs)
+    if n <= nb_points:
+        return timestamps, valeurs
+
+    taille_seau = -(-n // max(nb_points // 2, 1))
+    reste = n % taille_seau
+    seaux = valeurs[reste:].reshape(-1, taille_seau)
+    origines = reste + np.arange(len(seaux)) * taille_seau
+    indices = [origines + np.argmin(seaux, axis=1), origines + np.argmax(seaux, axis=1), [n - 1]]
+    if reste:
+        indices.append([np.argmin(valeurs[:reste]), np.argmax(valeurs[:reste])])
+    indices = np.unique(np.concatenate(indices))
+    return timestamps[indices], valeurs[indices]
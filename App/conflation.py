@@ -0,0 +1,69 @@
+import threading
+import time
+
+
+class FileConflation:
+    """
+    File d'entrée conflatante : au plus une mise à jour en attente par instrument.
+    Une nouvelle mise à jour remplace celle qui n'a pas encore été traitée (elle est alors comptée
+    comme fusionnée), si bien que le retard du traitement reste borné quel que soit le débit entrant.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._en_attente = {}  # cle -> (valeur, instant du premier dépôt non traité)
+        self.recus = 0
+        self.fusionnes = 0
+        self.traites = 0
+        self.profondeur_max = 0
+        self.dernier_retard = 0.0
+        self.retard_max = 0.0
+
+    def __len__(self):
+        return len(self._en_attente)
+
+    def deposer(self, cle, valeur):
+        """Dépose la dernière valeur d'un instrument, en remplaçant la valeur en attente s'il y en a une."""
+        with self._condition:
+            self.recus += 1
+            precedent = self._en_attente.get(cle)
+            if precedent is None:
+                self._en_attente[cle] = (valeur, time.monotonic())
+                if len(self._en_attente) > self.profondeur_max:
+                    self.profondeur_max = len(self._en_attente)
+                self._condition.notify()
+            else:
+                self.fusionnes += 1
+                self._en_attente[cle] = (valeur, precedent[1])
+
+    def vider(self, timeout=None):
+        """
+        Retire et retourne toutes les valeurs en attente ({cle: valeur}), en attendant au plus
+        `timeout` secondes qu'au moins une soit disponible (dictionnaire vide sinon).
+        """
+        with self._condition:
+            if not self._en_attente:
+                self._condition.wait(timeout)
+            en_attente, self._en_attente = self._en_attente, {}
+
+        if not en_attente:
+            return {}
+        maintenant = time.monotonic()
+        retard = maintenant - min(depot for _, depot in en_attente.values())
+        self.dernier_retard = retard
+        if retard > self.retard_max:
+            self.retard_max = retard
+        self.traites += len(en_attente)
+        return {cle: valeur for cle, (valeur, _) in en_attente.items()}
+
+    def statistiques(self):
+        """Compteurs de dimensionnement : messages reçus, fusionnés (abandonnés), traités, profondeur et retard."""
+        return {
+            "recus": self.recus,
+            "fusionnes": self.fusionnes,
+            "traites": self.traites,
+            "profondeur": len(self._en_attente),
+            "profondeur_max": self.profondeur_max,
+            "dernier_retard": self.dernier_retard,
+            "retard_max": self.retard_max,
+        }
@@ -0,0 +1,236 @@
+import asyncio
+import itertools
+import json
+import logging
+import random
+
+import websockets
+
+from decodage import LogLimite, logger
+
+# Paramètres par défaut du gestionnaire de connexions
+CANAUX_PAR_CONNEXION = 200
+INTERVALLE_HEARTBEAT = 30  # secondes (minimum accepté par Deribit : 10)
+TIMEOUT_REPONSE = 10.0
+DELAI_RECONNEXION_MIN = 1.0
+DELAI_RECONNEXION_MAX = 60.0
+DELAI_TROP_DE_REQUETES = 30.0
+
+
+class ErreurDeribit(Exception):
+    """Réponse JSON-RPC en erreur renvoyée par Deribit."""
+
+    def __init__(self, erreur):
+        super().__init__(erreur)
+        self.erreur = erreur
+
+    @property
+    def trop_de_requetes(self):
+        return "too_many_requests" in str(self.erreur)
+
+
+class GestionnaireConnexions:
+    """
+    Gestionnaire asyncio des connexions WebSocket Deribit.
+
+    Les canaux sont répartis sur plusieurs connexions (au plus `canaux_par_connexion` chacune).
+    Chaque connexion s'authentifie si des identifiants sont fournis, active le heartbeat
+    (public/set_heartbeat, réponses public/test), puis souscrit à tous ses canaux en une seule
+    requête. Les réponses sont corrélées aux requêtes par leur identifiant. Après une coupure,
+    la reconnexion se fait dans une boucle (sans récursion) avec un délai exponentiel aléatoire
+    qui n'occupe aucun thread.
+
+    Les notifications de souscription sont transmises telles quelles à `on_message(connexion, message)`,
+    sans être décodées ici ; `on_connecte(canaux)` et `on_deconnecte(canaux)` permettent
+    de réagir aux changements d'état d'une connexion.
+
+    Avec le heartbeat, Deribit envoie un message au moins toutes les `intervalle_heartbeat` secondes :
+    une connexion restée muette plus de deux intervalles est considérée comme à moitié ouverte et rouverte.
+    Une trame illisible ou une erreur de `on_message` est journalisée (en fréquence limitée) sans couper la connexion.
+    """
+
+    def __init__(self, url, canaux=(), on_message=None, client_id=None, client_secret=None,
+                 canaux_par_connexion=CANAUX_PAR_CONNEXION, intervalle_heartbeat=INTERVALLE_HEARTBEAT,
+                 on_connecte=None, on_deconnecte=None):
+        self.url = url
+        self.on_message = on_message
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.canaux_par_connexion = canaux_par_connexion
+        self.intervalle_heartbeat = intervalle_heartbeat
+        self.on_connecte = on_connecte
+        self.on_deconnecte = on_deconnecte
+
+        self.shards = []  # Liste des listes de canaux, une par connexion
+        self.reconnexions = 0
+        self._ids = itertools.count(1)
+        self._en_attente = {}  # id de requête -> future
+        self._connexions = {}  # indice de shard -> connexion ouverte
+        self._taches = []
+        self._boucle = None
+        self._arret = None
+        self._arret_demande = False
+        self.log_limite = LogLimite(intervalle=5.0)
+        self._ajouter_aux_shards(canaux)
+
+    def _ajouter_aux_shards(self, canaux):
+        """Répartit de nouveaux canaux ; retourne {indice de shard: [canaux ajoutés]}."""
+        existants = {canal for shard in self.shards for canal in shard}
+        ajouts = {}
+        for canal in dict.fromkeys(canaux):
+            if canal in existants:
+                continue
+            if not self.shards or len(self.shards[-1]) >= self.canaux_par_connexion:
+                self.shards.append([])
+            self.shards[-1].append(canal)
+            ajouts.setdefault(len(self.shards) - 1, []).append(canal)
+        return ajouts
+
+    # --- Pilotage depuis d'autres threads --------------------------------------------------------
+
+    def executer(self):
+        """Exécute le gestionnaire jusqu'à l'appel de arreter() (bloquant)."""
+        asyncio.run(self._principal())
+
+    def arreter(self):
+        """Ferme toutes les connexions et termine la boucle (avant même son démarrage)."""
+        self._arret_demande = True
+        boucle, arret = self._boucle, self._arret
+        if boucle is not None and arret is not None and not boucle.is_closed():
+            boucle.call_soon_threadsafe(arret.set)
+
+    def ajouter_canaux(self, canaux):
+        """Ajoute des canaux (thread-safe) : souscrits sur une connexion existante ou sur une nouvelle connexion."""
+        if self._boucle is None:
+            self._ajouter_aux_shards(canaux)
+            return
+        self._boucle.call_soon_threadsafe(self._ajouter_canaux, list(canaux))
+
+    # --- Boucle asyncio ----------------------------------------------------------------------------
+
+    async def _principal(self):
+        # L'événement d'arrêt existe avant que la boucle soit visible des autres threads (voir arreter)
+        self._arret = asyncio.Event()
+        self._boucle = asyncio.get_running_loop()
+        if self._arret_demande:
+            return
+        self._taches = [asyncio.create_task(self._maintenir(indice)) for indice in range(len(self.shards))]
+        await self._arret.wait()
+        for tache in self._taches:
+            tache.cancel()
+        await asyncio.gather(*self._taches, return_exceptions=True)
+
+    def _ajouter_canaux(self, canaux):
+        for indice, ajouts in self._ajouter_aux_shards(canaux).items():
+            if indice >= len(self._taches):
+                self._taches.append(asyncio.create_task(self._maintenir(indice)))
+            elif indice in self._connexions:
+                asyncio.create_task(self._souscrire_silencieux(self._connexions[indice], ajouts))
+
+    async def _maintenir(self, indice):
+        """Maintient la connexion d'un shard ouverte, avec reconnexion à délai exponentiel aléatoire."""
+        tentatives = 0
+        while True:
+            delai = None
+            try:
+                async with websockets.connect(self.url, ping_interval=None, max_queue=None) as connexion:
+                    lecture = asyncio.create_task(self._lire(connexion))
+                    try:
+                        await self._initialiser(connexion, self.shards[indice])
+                        self._connexions[indice] = connexion
+                        tentatives = 0
+                        logger.info("Connexion %d ouverte : %d canaux souscrits.", indice, len(self.shards[indice]))
+                        if self.on_connecte is not None:
+                            self.on_connecte(list(self.shards[indice]))
+                        await lecture
+                    finally:
+                        lecture.cancel()
+                        self._connexions.pop(indice, None)
+            except asyncio.CancelledError:
+                raise
+            except ErreurDeribit as e:
+                logger.warning("Erreur renvoyée par Deribit sur la connexion %d : %s", indice, e.erreur)
+                if e.trop_de_requetes:
+                    delai = DELAI_TROP_DE_REQUETES
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                logger.warning("Connexion %d interrompue : %s", indice, str(e) or type(e).__name__)
+            except Exception:
+                # Toute autre erreur ne doit pas terminer la tâche du shard : reconnexion avec le même délai
+                logger.exception("Erreur inattendue sur la connexion %d.", indice)
+
+            if self.on_deconnecte is not None:
+                self.on_deconnecte(list(self.shards[indice]))
+            self.reconnexions += 1
+            if delai is None:
+                delai = min(DELAI_RECONNEXION_MAX, DELAI_RECONNEXION_MIN * 2 ** tentatives)
+            delai *= random.uniform(0.5, 1.0)
+            tentatives += 1
+            logger.info("Tentative de reconnexion %d dans %.1f secondes...", indice, delai)
+            await asyncio.sleep(delai)
+
+    async def _initialiser(self, connexion, canaux):
+        if self.client_id and self.client_secret:
+            await self._requete(connexion, "public/auth", {
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            })
+            logger.info("Authentification réussie.")
+        if self.intervalle_heartbeat:
+            await self._requete(connexion, "public/set_heartbeat", {"interval": self.intervalle_heartbeat})
+        await self._requete(connexion, "public/subscribe", {"channels": list(canaux)})
+
+    async def _souscrire_silencieux(self, connexion, canaux):
+        try:
+            await self._requete(connexion, "public/subscribe", {"channels": canaux})
+            logger.info("Souscrit aux canaux %s", ", ".join(canaux))
+        except Exception as e:
+            # La prochaine reconnexion souscrira de toute façon l'ensemble des canaux du shard
+            logger.warning("Échec de la souscription à %s : %s", ", ".join(canaux), e)
+
+    async def _requete(self, connexion, methode, params):
+        """Envoie une requête JSON-RPC et attend la réponse portant le même identifiant."""
+        identifiant = next(self._ids)
+        future = self._boucle.create_future()
+        self._en_attente[identifiant] = future
+        try:
+            await connexion.send(json.dumps({"jsonrpc": "2.0", "id": identifiant, "method": methode, "params": params}))
+            return await asyncio.wait_for(future, TIMEOUT_REPONSE)
+        finally:
+            self._en_attente.pop(identifiant, None)
+
+    async def _lire(self, connexion):
+        """
+        Lit les messages jusqu'à la fermeture de la connexion. Sans message pendant deux intervalles de heartbeat,
+        asyncio.TimeoutError est levée et la connexion est rouverte par _maintenir.
+        """
+        delai_lecture = 2 * self.intervalle_heartbeat if self.intervalle_heartbeat else None
+        while True:
+            message = await asyncio.wait_for(connexion.recv(), delai_lecture)
+            try:
+                await self._traiter(connexion, message)
+            except (OSError, websockets.WebSocketException):
+                raise
+            except Exception as e:
+                self.log_limite.log(logging.WARNING, "message-invalide", "Message ignoré (%s : %s) : %.200s",
+                                    type(e).__name__, e, message)
+
+    async def _traiter(self, connexion, message):
+        # Chemin rapide : les notifications sont transmises sans décodage
+        if '"subscription"' in message:
+            if self.on_message is not None:
+                self.on_message(connexion, message)
+            return
+
+        reponse = json.loads(message)
+        if reponse.get("method") == "heartbeat":
+            if reponse.get("params", {}).get("type") == "test_request":
+                await connexion.send(json.dumps({"jsonrpc": "2.0", "id": next(self._ids), "method": "public/test", "params": {}}))
+            return
+
+        future = self._en_attente.get(reponse.get("id"))
+        if future is not None and not future.done():
+            if "error" in reponse:
+                future.set_exception(ErreurDeribit(reponse["error"]))
+            else:
+                future.set_result(reponse.get("result"))
@@ -0,0 +1,217 @@
+import heapq
+from collections import deque, namedtuple
+
+import numpy as np
+
+# Matrice de corrélation (ou de covariance) publiée, avec l'ordre des actifs de ses lignes et colonnes
+MatriceCorrelation = namedtuple("MatriceCorrelation", ["assets", "matrice"])
+
+# Nombre maximal de barres en attente d'alignement : au-delà, la plus ancienne est intégrée sans attendre
+# les actifs en retard (illiquides ou muets), dont le dernier prix est reconduit (rendement nul sur la barre)
+MAX_BARRES_EN_ATTENTE = 30
+
+# Nombre de barres intégrées conservées pour le rattrapage d'un actif ajouté après les autres (voir integrer_historiques)
+MAX_BARRES_CONSERVEES = 2000
+
+
+class CovarianceEWMA:
+    """
+    Matrice de covariance EWMA N×N entre actifs, mise à jour en direct.
+
+    Les clôtures de barres de chaque actif (grille commune alignée sur l'époque Unix, voir ResamplerBarres)
+    sont regroupées par timestamp de barre. Une barre est intégrée dès que tous les actifs ont émis une barre
+    au moins aussi récente : le vecteur des rendements r met alors à jour toute la matrice par une mise à jour
+    de rang 1, C = lambda * C + (1 - lambda) * r r^T, sans boucle Python sur les paires d'actifs.
+
+    Un actif muet ne bloque jamais la matrice : au-delà de `max_en_attente` barres en attente, la plus ancienne
+    est intégrée telle quelle, les actifs absents reconduisant leur dernier prix. Les barres en attente sont
+    ordonnées par un tas : chaque barre coûte O(log n) en plus de la mise à jour de rang 1.
+
+    Les historiques de préchauffage sont d'abord collectés (ajouter_historique), puis intégrés ensemble par
+    integrer_historiques, alignés sur la grille commune et sans intégration forcée. Un actif dont l'historique
+    est antérieur à la dernière barre intégrée (actif ajouté après les autres) est rattrapé sur les
+    `max_conservees` dernières barres intégrées, sans modifier les covariances des actifs déjà suivis.
+    """
+
+    def __init__(self, lambda_factor=0.94, assets=(), max_en_attente=MAX_BARRES_EN_ATTENTE,
+                 max_conservees=MAX_BARRES_CONSERVEES):
+        self.lambda_factor = lambda_factor
+        self.max_en_attente = int(max_en_attente)
+        self.assets = []
+        self._indices = {}
+        self.matrice = np.zeros((0, 0), dtype=np.float64)
+        self.derniers_prix = np.zeros(0, dtype=np.float64)
+        self.amorce = np.zeros(0, dtype=bool)  # Actifs dont la variance a été initialisée
+        self.dernier_timestamp = None  # Dernière barre intégrée
+        self.nb_barres = 0
+        self._en_attente = {}  # timestamp de barre -> vecteur des clôtures (NaN si absente)
+        self._ordre = []  # Tas des timestamps en attente
+        self._derniere_barre = {}  # actif -> timestamp de sa dernière barre reçue
+        self._conservees = deque(maxlen=int(max_conservees))  # (timestamp, clôtures) des dernières barres intégrées
+        self._historiques = {}  # actif -> (timestamps, clôtures) collectés en attente d'integrer_historiques
+        self.ajouter_actifs(assets)
+
+    def __len__(self):
+        return len(self.assets)
+
+    def ajouter_actifs(self, assets):
+        """Ajoute des actifs : la matrice est agrandie, les nouvelles covariances partent de zéro."""
+        nouveaux = [asset for asset in dict.fromkeys(assets) if asset not in self._indices]
+        if not nouveaux:
+            return
+        k = len(nouveaux)
+        for asset in nouveaux:
+            self._indices[asset] = len(self.assets)
+            self.assets.append(asset)
+        self.matrice = np.pad(self.matrice, ((0, k), (0, k)))
+        self.derniers_prix = np.concatenate([self.derniers_prix, np.full(k, np.nan)])
+        self.amorce = np.concatenate([self.amorce, np.zeros(k, dtype=bool)])
+        self._en_attente = {ts: np.concatenate([ligne, np.full(k, np.nan)]) for ts, ligne in self._en_attente.items()}
+
+    def ajouter_barres(self, asset, timestamps, clotures):
+        """
+        Enregistre des clôtures de barres d'un actif et intègre toutes les barres désormais alignées.
+        :return: Nombre de barres intégrées dans la matrice.
+        """
+        indice = self._indices.get(asset)
+        if indice is None:
+            return 0
+        for timestamp, cloture in zip(timestamps, clotures):
+            if self.dernier_timestamp is not None and timestamp <= self.dernier_timestamp:
+                continue  # Barre antérieure à la dernière barre intégrée (ex. historique d'un actif ajouté en cours de route)
+            ligne = self._en_attente.get(timestamp)
+            if ligne is None:
+                ligne = self._en_attente[timestamp] = np.full(len(self.assets), np.nan)
+                heapq.heappush(self._ordre, timestamp)
+            ligne[indice] = cloture
+            self._derniere_barre[asset] = max(timestamp, self._derniere_barre.get(asset, timestamp))
+        return self._integrer()
+
+    def ajouter_barre(self, asset, timestamp, cloture):
+        return self.ajouter_barres(asset, (timestamp,), (cloture,))
+
+    def ajouter_historique(self, asset, timestamps, clotures):
+        """
+        Collecte l'historique de préchauffage d'un actif, sans rien intégrer : la matrice ne change qu'à l'appel
+        d'integrer_historiques, une fois les historiques de tous les actifs préchauffés ensemble collectés.
+        """
+        self._historiques[asset] = (np.asarray(timestamps, dtype=np.float64), np.asarray(clotures, dtype=np.float64))
+
+    def integrer_historiques(self):
+        """
+        Intègre les historiques collectés, alignés sur leur grille commune. Les barres postérieures à la dernière
+        barre intégrée passent par la file d'attente, sans intégration forcée ; les barres antérieures rattrapent
+        leur actif sur les barres conservées (voir _rattraper).
+        :return: Nombre de barres intégrées dans la matrice (hors rattrapage).
+        """
+        historiques, self._historiques = self._historiques, {}
+        if not historiques:
+            return 0
+        self.ajouter_actifs(historiques)
+        a_rattraper = {}
+        for asset, (timestamps, clotures) in historiques.items():
+            indice = self._indices[asset]
+            if len(timestamps):
+                self._derniere_barre[asset] = max(float(timestamps.max()), self._derniere_barre.get(asset, -np.inf))
+            for timestamp, cloture in zip(timestamps.tolist(), clotures.tolist()):
+                if self.dernier_timestamp is not None and timestamp <= self.dernier_timestamp:
+                    a_rattraper.setdefault(asset, []).append((timestamp, cloture))
+                    continue
+                ligne = self._en_attente.get(timestamp)
+                if ligne is None:
+                    ligne = self._en_attente[timestamp] = np.full(len(self.assets), np.nan)
+                    heapq.heappush(self._ordre, timestamp)
+                ligne[indice] = cloture
+        if a_rattraper:
+            self._rattraper(a_rattraper)
+        return self._integrer(forcer=False)
+
+    def _rattraper(self, barres):
+        """
+        Rattrapage d'actifs dont les barres (actif -> [(timestamp, clôture)]) sont antérieures à la dernière barre
+        intégrée : leurs clôtures sont fusionnées aux barres conservées, qui sont rejouées depuis une matrice vide.
+        Seules leurs lignes et colonnes sont conservées : les covariances des autres actifs restent inchangées.
+        """
+        n = len(self.assets)
+        lignes = {}
+        for timestamp, clotures in self._conservees:
+            ligne = lignes[timestamp] = np.full(n, np.nan)
+            ligne[:len(clotures)] = clotures
+        for asset, valeurs in barres.items():
+            indice = self._indices[asset]
+            for timestamp, cloture in valeurs:
+                ligne = lignes.get(timestamp)
+                if ligne is None:
+                    ligne = lignes[timestamp] = np.full(n, np.nan)
+                if not np.isfinite(ligne[indice]):
+                    ligne[indice] = cloture
+
+        anciens = np.ones(n, dtype=bool)
+        anciens[[self._indices[asset] for asset in barres]] = False
+        matrice, derniers_prix, amorce, nb_barres = (self.matrice.copy(), self.derniers_prix.copy(),
+                                                     self.amorce.copy(), self.nb_barres)
+        self.matrice = np.zeros((n, n), dtype=np.float64)
+        self.derniers_prix = np.full(n, np.nan)
+        self.amorce = np.zeros(n, dtype=bool)
+        self._conservees.clear()
+        for timestamp in sorted(lignes):
+            self._mettre_a_jour(lignes[timestamp])
+            self._conservees.append((timestamp, lignes[timestamp]))
+
+        bloc = np.ix_(anciens, anciens)
+        self.matrice[bloc] = matrice[bloc]
+        self.derniers_prix[anciens] = derniers_prix[anciens]
+        self.amorce[anciens] = amorce[anciens]
+        self.nb_barres = nb_barres
+
+    def _integrer(self, forcer=True):
+        # Barres alignées : tous les actifs ont émis une barre au moins aussi récente
+        limite = min(self._derniere_barre.values()) if len(self._derniere_barre) == len(self.assets) else None
+        nb = 0
+        while self._ordre and ((limite is not None and self._ordre[0] <= limite)
+                               or (forcer and len(self._en_attente) > self.max_en_attente)):
+            timestamp = heapq.heappop(self._ordre)
+            ligne = self._en_attente.pop(timestamp)
+            self._mettre_a_jour(ligne)
+            self._conservees.append((timestamp, ligne))
+            self.dernier_timestamp = timestamp
+            nb += 1
+        return nb
+
+    def _mettre_a_jour(self, clotures):
+        """Mise à jour de rang 1 à partir des clôtures d'une barre (NaN : actif sans barre, rendement nul)."""
+        presents = np.isfinite(clotures) & (clotures > 0)
+        precedents = np.isfinite(self.derniers_prix)
+        rendements = np.zeros(len(clotures))
+        calcul = presents & precedents
+        rendements[calcul] = np.log(clotures[calcul] / self.derniers_prix[calcul])
+        self.derniers_prix[presents] = clotures[presents]
+        if not calcul.any():
+            return
+
+        # Premier rendement d'un actif : sa variance est amorcée avec son carré (comme BanqueEWMA)
+        nouveaux = calcul & ~self.amorce
+        self.matrice *= self.lambda_factor
+        self.matrice += (1 - self.lambda_factor) * np.outer(rendements, rendements)
+        if nouveaux.any():
+            self.matrice[nouveaux, nouveaux] = rendements[nouveaux] ** 2
+            self.amorce |= nouveaux
+        self.nb_barres += 1
+
+    def volatilites(self):
+        """Volatilités EWMA de chaque actif (racine de la diagonale)."""
+        return np.sqrt(np.diag(self.matrice))
+
+    def correlation(self):
+        """Matrice de corrélation ; NaN pour les actifs dont la variance est nulle ou pas encore connue."""
+        ecarts = self.volatilites()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverses = np.where(ecarts > 0, 1.0 / ecarts, np.nan)
+        correlation = self.matrice * np.outer(inverses, inverses)
+        np.fill_diagonal(correlation, np.where(np.isfinite(inverses), 1.0, np.nan))
+        return correlation
+
+    def instantane(self):
+        """Copie de la matrice de corrélation courante, avec l'ordre des actifs."""
+        return MatriceCorrelation(tuple(self.assets), self.correlation())
+
@@ -0,0 +1,71 @@
+import json
+import logging
+import time
+from collections import namedtuple
+
+# Backend JSON plus rapide si disponible (optionnel)
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+logger = logging.getLogger("volatilite")
+
+# Message décodé : seuls les champs utiles au calcul sont extraits d'une notification ticker.
+MessageDecode = namedtuple("MessageDecode", ["channel", "mark_price", "timestamp"])
+MESSAGE_IGNORE = MessageDecode(None, None, None)
+
+
+def decoder_message(message):
+    """
+    Décode une trame Deribit.
+    :return: MessageDecode avec channel, mark_price et timestamp (en secondes, horodatage de la plateforme)
+        pour une notification ticker ; MessageDecode(None, None, None) sinon (réponses JSON-RPC, heartbeats).
+    """
+    response = _json_loads(message)
+
+    params = response.get("params")
+    if params is None:
+        return MESSAGE_IGNORE
+
+    data = params.get("data")
+    if not isinstance(data, dict) or "mark_price" not in data:
+        return MESSAGE_IGNORE
+
+    timestamp = data.get("timestamp")
+    timestamp = timestamp / 1000 if timestamp is not None else time.time()
+    return MessageDecode(params.get("channel"), data["mark_price"], timestamp)
+
+
+def construire_dispatch(assets):
+    """Table de correspondance précalculée canal ticker -> actif, pour un aiguillage en O(1)."""
+    return {f"ticker.{asset}.raw": asset for asset in assets}
+
+
+class LogLimite:
+    """
+    Journalisation limitée en fréquence : au plus un message par clé et par intervalle.
+    Les messages supprimés sont comptés et signalés avec le message suivant.
+    """
+
+    def __init__(self, intervalle=5.0, journal=logger):
+        self.intervalle = intervalle
+        self.journal = journal
+        self._derniers = {}
+        self._supprimes = {}
+
+    def log(self, niveau, cle, message, *args):
+        if not self.journal.isEnabledFor(niveau):
+            return
+        maintenant = time.monotonic()
+        if maintenant - self._derniers.get(cle, -self.intervalle) < self.intervalle:
+            self._supprimes[cle] = self._supprimes.get(cle, 0) + 1
+            return
+        self._derniers[cle] = maintenant
+        supprimes = self._supprimes.pop(cle, 0)
+        if supprimes:
+            message = f"{message} ({supprimes} messages similaires ignorés)"
+        self.journal.log(niveau, message, *args)
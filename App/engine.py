@@ -0,0 +1,900 @@
+"""
+Moteur de calcul de volatilité EWMA en temps réel, indépendant de Streamlit.
+
+Le moteur regroupe l'ingestion WebSocket Deribit (voir connexion.py), le modèle EWMA
+(préchauffage historique et mise à jour incrémentale) et la diffusion des résultats
+(abonnés notifiés à chaque lot de calcul, rapports périodiques). Il peut être piloté
+par l'application Streamlit ou lancé seul en ligne de commande :
+
+    python App/engine.py --assets BTC-PERPETUAL ETH-PERPETUAL --window 100 --interval 10
+    python App/engine.py --universe --workers 4
+    python App/engine.py --assets BTC-PERPETUAL --lambdas 0.99 --alert-zscore 3 --alert-webhook http://127.0.0.1:8765/
+
+Avec --workers, les instruments sont répartis entre plusieurs processus (voir partition.py).
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from alertes import (MoteurAlertes, RegleSeuil, RegleZScore, RegleDivergence, PuitsLog, PuitsWebhook, PuitsEmail,
+                     HAUSSE, BAISSE, DELAI_REEMISSION)
+from buffers import RingBufferPrix, HistoriqueVolatilite
+from conflation import FileConflation
+from connexion import GestionnaireConnexions
+from covariance import CovarianceEWMA
+from decodage import decoder_message, construire_dispatch, LogLimite, logger
+from ewma import BanqueEWMA, calculer_variance_ewma_batch, lambda_depuis_demi_vie
+from garch import EtatGARCH, ReajusteurGARCH
+from historique import (charger_historiques, charger_plage_deribit, decouvrir_instruments, CacheHistorique,
+                        HistoriqueIncomplet, DERIBIT_API_URL)
+from journal import ouvrir_journal, FORMATS_JOURNAL
+from metriques import Metriques, Chronometre
+from ordonnanceur import OrdonnanceurPredictions
+from plages import EtatPlageEWMA, ESTIMATEURS_PLAGE
+from resampler import ResamplerBarres
+
+# URL du WebSocket Deribit (environnement de test ou production)
+DERIBIT_WS_URL = "wss://test.deribit.com/ws/api/v2"
+
+# Cache disque des bougies historiques (seule la fin manquante est téléchargée au démarrage)
+CACHE_HISTORIQUE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_historique")
+
+# Durée des bougies historiques Deribit demandées (résolution "1" : une minute), en secondes
+DUREE_BOUGIE = 60.0
+
+
+def augmenter_resolution_historique(historique_data, interval_seconds, resampler=None):
+    """
+    Rééchantillonne les données historiques sur la grille de barres utilisée en temps réel.
+    Les données passent par le même ResamplerBarres que les ticks en direct : passer le resampler
+    de l'actif permet aux barres en direct de prendre le relais exactement là où l'historique s'arrête.
+    :param historique_data: Liste de dicts contenant des timestamps et des prix.
+    :param interval_seconds: Intervalle cible en secondes.
+    :param resampler: ResamplerBarres à alimenter (un nouveau est créé si None).
+    :return: Nouvelle liste rééchantillonnée.
+    """
+    if resampler is None:
+        resampler = ResamplerBarres(interval_seconds)
+
+    barres = []
+    for item in historique_data:
+        barres.extend(resampler.ajouter(item['timestamp'], item['mark_price']))
+    barres.extend(resampler.vider())
+
+    # Retourner les données au format original (liste de dicts)
+    return [{'timestamp': barre.timestamp, 'mark_price': barre.close} for barre in barres]
+
+
+def calculer_lambdas(lambda_factor, lambdas=(), demi_vies=(), intervalle=10.0):
+    """Facteurs d'une banque EWMA : facteur principal en tête, puis facteurs explicites et demi-vies, sans doublon."""
+    tous = [lambda_factor, *lambdas]
+    tous.extend(lambda_depuis_demi_vie(demi_vie, intervalle) for demi_vie in demi_vies)
+    return tuple(dict.fromkeys(float(lam) for lam in tous))
+
+
+class MoteurVolatilite:
+    """
+    État et logique de calcul de la volatilité pour un ensemble d'actifs, en Python pur.
+    Les abonnés (voir abonner) sont notifiés après chaque lot de calcul ; les rapporteurs
+    (voir abonner_rapport) reçoivent l'historique d'un actif toutes les `seuil_rapport` estimations.
+
+    Outre le facteur principal `lambda_factor`, des facteurs supplémentaires (`lambdas`) et des demi-vies
+    en secondes (`demi_vies`, converties selon l'intervalle des barres) alimentent une banque EWMA par actif :
+    toutes les variances sont mises à jour ensemble à chaque barre, et leurs volatilités sont conservées
+    en séries parallèles (voir historique_banque).
+
+    Avec `covariance`, les clôtures de barres de tous les actifs alimentent en plus une matrice de covariance
+    EWMA inter-actifs (voir covariance.CovarianceEWMA).
+
+    Avec `garch`, une prévision GARCH(1,1) est calculée en parallèle de l'EWMA : le modèle est réajusté toutes
+    les `garch_reajustement` barres sur les `data_window` dernières clôtures dans un pool de processus (voir
+    garch.ReajusteurGARCH), et la variance est mise à jour en O(1) à chaque barre entre deux réajustements.
+
+    Avec `plages`, les estimateurs d'étendue (Parkinson, Garman-Klass, Rogers-Satchell, Yang-Zhang, voir plages.py)
+    sont calculés en parallèle avec le facteur principal : en lot sur les bougies OHLC historiques, puis barre par
+    barre sur les barres OHLC construites à partir des ticks (voir historique_plage).
+    """
+
+    def __init__(self, assets, data_window=100, intervalle=10.0, retention=20000, lambda_factor=0.94,
+                 ws_url=DERIBIT_WS_URL, client_id=None, client_secret=None, seuil_rapport=100, conflation=False,
+                 api_url=DERIBIT_API_URL, lambdas=(), demi_vies=(), covariance=False,
+                 garch=False, garch_reajustement=60, garch_workers=None, journal=None, plages=False, alertes=None):
+        self.assets = list(assets)
+        self.data_window = int(data_window)
+        self.intervalle = float(intervalle)
+        self.retention = int(retention)
+        self.lambda_factor = lambda_factor
+        self.lambdas_supplementaires = tuple(lambdas)
+        self.demi_vies = tuple(demi_vies)
+        self.lambdas = self._calculer_lambdas()
+        self.ws_url = ws_url
+        self.api_url = api_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.seuil_rapport = seuil_rapport
+
+        # Données par actif
+        self.prix = {}
+        self.volatilites = {}
+        self.volatilites_banque = {}
+        self.etats_ewma = {}
+        self.resamplers = {}
+        self.actifs_prechauffes = set()
+        self.prechauffages_en_cours = set()  # Actifs dont l'historique est en cours de chargement
+        self.actifs_interrompus = set()  # Actifs dont le flux a été coupé et pas encore rattrapé
+        self.rattrapages = {}  # Actif en cours de rattrapage -> ticks en direct mis de côté d'ici la fin du rattrapage
+        self._estimations_depuis_rapport = {}
+
+        self.ordonnanceur = OrdonnanceurPredictions(self.intervalle, self.assets)
+        self.channel_dispatch = construire_dispatch(self.assets)
+        self.covariance = CovarianceEWMA(self.lambda_factor, self.assets) if covariance else None
+
+        # Prévision GARCH optionnelle : clôtures de barres récentes, état O(1) et réajustements hors processus
+        self.garch = ReajusteurGARCH(self._appliquer_ajustement_garch, garch_workers) if garch else None
+        self.garch_reajustement = int(garch_reajustement)
+        self.barres_garch = {}
+        self.etats_garch = {}
+        self.volatilites_garch = {}
+        self._barres_depuis_ajustement = {}
+
+        # Estimateurs d'étendue optionnels : état EWMA des termes OHLC et historique (une colonne par estimateur)
+        self.plages = bool(plages)
+        self.etats_plage = {}
+        self.volatilites_plage = {}
+
+        # Moteur d'alertes optionnel (voir alertes.py), évalué à chaque nouvelle estimation
+        self.alertes = alertes
+        self._barres_evaluees = {}  # Actif -> nombre de barres intégrées lors de la dernière évaluation des alertes
+        if alertes is not None:
+            alertes.configurer(self.lambdas)
+        self.log_limite = LogLimite(intervalle=5.0)
+        self.connexions = None
+        self.journal = journal  # Journal des ticks reçus (voir journal.py), ou None
+
+        # Protège l'état lorsque le moteur est partagé entre plusieurs threads (voir service.py)
+        self.verrou = threading.RLock()
+
+        # File conflatante optionnelle entre la réception des trames et leur traitement
+        self.file = FileConflation() if conflation else None
+        self._thread_traitement = None
+        self._arret_traitement = threading.Event()
+
+        self._abonnes = []
+        self._rapporteurs = []
+
+        # Instrumentation : durées par étape, compteurs et jauges (voir metriques.py)
+        self.metriques = Metriques()
+        self.metriques.jauge("actifs", lambda: len(self.assets))
+        self.metriques.compteur_externe("reconnexions",
+                                        lambda: self.connexions.reconnexions if self.connexions is not None else 0)
+        if self.file is not None:
+            self.metriques.jauge("profondeur_file", lambda: len(self.file))
+            self.metriques.compteur_externe("messages_fusionnes", lambda: self.file.fusionnes)
+
+    # --- Configuration et abonnements -------------------------------------------------------
+
+    def configurer(self, assets=None, data_window=None, intervalle=None, retention=None):
+        """Met à jour la configuration ; les buffers existants sont redimensionnés à leur prochain accès."""
+        if data_window is not None:
+            self.data_window = int(data_window)
+        if retention is not None:
+            self.retention = int(retention)
+        if intervalle is not None and float(intervalle) != self.intervalle:
+            self.intervalle = float(intervalle)
+            self.ordonnanceur = OrdonnanceurPredictions(self.intervalle, self.assets)
+            self.lambdas = self._calculer_lambdas()
+            if self.alertes is not None:
+                self.alertes.configurer(self.lambdas)
+        if assets is not None and list(assets) != self.assets:
+            self.assets = list(assets)
+            self.ordonnanceur = OrdonnanceurPredictions(self.intervalle, self.assets)
+            self.channel_dispatch = construire_dispatch(self.assets)
+            if self.covariance is not None:
+                self.covariance.ajouter_actifs(self.assets)
+
+    def activer_garch(self, garch_reajustement=None, garch_workers=None):
+        """Active la prévision GARCH sur un moteur déjà en marche (elle démarre avec les barres suivantes)."""
+        with self.verrou:
+            if garch_reajustement is not None:
+                self.garch_reajustement = int(garch_reajustement)
+            if self.garch is None:
+                self.garch = ReajusteurGARCH(self._appliquer_ajustement_garch, garch_workers)
+
+    def activer_plages(self):
+        """Active les estimateurs d'étendue sur un moteur déjà en marche (à partir des barres suivantes)."""
+        with self.verrou:
+            self.plages = True
+
+    def _calculer_lambdas(self):
+        return calculer_lambdas(self.lambda_factor, self.lambdas_supplementaires, self.demi_vies, self.intervalle)
+
+    def ajouter_actifs(self, assets):
+        """
+        Ajoute des actifs à un moteur éventuellement déjà connecté : ils sont planifiés, aiguillés
+        et souscrits immédiatement sur la connexion en cours.
+        :return: Liste des actifs réellement ajoutés.
+        """
+        with self.verrou:
+            nouveaux = [asset for asset in dict.fromkeys(assets) if asset not in self.assets]
+            if not nouveaux:
+                return nouveaux
+            self.assets.extend(nouveaux)
+            self.channel_dispatch = construire_dispatch(self.assets)
+            for asset in nouveaux:
+                self.ordonnanceur.ajouter(asset)
+            if self.covariance is not None:
+                self.covariance.ajouter_actifs(nouveaux)
+        if self.connexions is not None:
+            self.connexions.ajouter_canaux(f"ticker.{asset}.raw" for asset in nouveaux)
+        return nouveaux
+
+    def abonner(self, callback):
+        """Enregistre un callback appelé avec (moteur, assets) après chaque lot de calcul de volatilité."""
+        self._abonnes.append(callback)
+
+    def abonner_rapport(self, callback):
+        """Enregistre un callback appelé avec (asset, historique) toutes les `seuil_rapport` estimations d'un actif."""
+        self._rapporteurs.append(callback)
+
+    def reinitialiser_abonnements(self):
+        """Retire tous les abonnés et rapporteurs (ex. avant de les réenregistrer lors d'une nouvelle exécution du client)."""
+        self._abonnes.clear()
+        self._rapporteurs.clear()
+
+    # --- Accès aux données par actif ---------------------------------------------------------
+
+    def buffer_prix(self, asset):
+        """Récupère ou initialise la fenêtre de prix (ring buffer de capacité data_window) pour un actif donné."""
+        buffer = self.prix.get(asset)
+        if buffer is None:
+            buffer = self.prix[asset] = RingBufferPrix(self.data_window)
+        elif buffer.capacite != self.data_window:
+            buffer.redimensionner(self.data_window)
+        return buffer
+
+    def historique_volatilite(self, asset):
+        """Récupère ou initialise l'historique de volatilité (borné à `retention` points) pour un actif donné."""
+        historique = self.volatilites.get(asset)
+        if historique is None:
+            historique = self.volatilites[asset] = HistoriqueVolatilite(self.retention)
+        elif historique.capacite != self.retention:
+            historique.redimensionner(self.retention)
+        return historique
+
+    def historique_banque(self, asset):
+        """
+        Historique des volatilités de tous les facteurs de la banque (une colonne par facteur de `lambdas`),
+        ou None si seul le facteur principal est calculé.
+        """
+        if len(self.lambdas) < 2:
+            return None
+        historique = self.volatilites_banque.get(asset)
+        if historique is None or historique.lambdas != self.lambdas:
+            historique = self.volatilites_banque[asset] = HistoriqueVolatilite(self.retention, len(self.lambdas), self.lambdas)
+        elif historique.capacite != self.retention:
+            historique.redimensionner(self.retention)
+        return historique
+
+    def historique_garch(self, asset):
+        """Historique des volatilités prévues par le GARCH (borné à `retention` points), ou None sans GARCH."""
+        if self.garch is None:
+            return None
+        historique = self.volatilites_garch.get(asset)
+        if historique is None:
+            historique = self.volatilites_garch[asset] = HistoriqueVolatilite(self.retention)
+        elif historique.capacite != self.retention:
+            historique.redimensionner(self.retention)
+        return historique
+
+    def historique_plage(self, asset):
+        """
+        Historique des volatilités des estimateurs d'étendue (une colonne par estimateur, dans l'ordre
+        ESTIMATEURS_PLAGE), ou None si ces estimateurs ne sont pas calculés.
+        """
+        if not self.plages:
+            return None
+        historique = self.volatilites_plage.get(asset)
+        if historique is None:
+            historique = self.volatilites_plage[asset] = HistoriqueVolatilite(self.retention, len(ESTIMATEURS_PLAGE))
+        elif historique.capacite != self.retention:
+            historique.redimensionner(self.retention)
+        return historique
+
+    def etat_plage(self, asset):
+        """Récupère ou initialise l'état des estimateurs d'étendue (facteur principal) pour un actif donné."""
+        etat = self.etats_plage.get(asset)
+        if etat is None or etat.lambda_factor != self.lambda_factor:
+            etat = self.etats_plage[asset] = EtatPlageEWMA(self.lambda_factor)
+        return etat
+
+    def etat_ewma(self, asset):
+        """Récupère ou initialise la banque EWMA (dernier prix et variances courantes) pour un actif donné."""
+        etat = self.etats_ewma.get(asset)
+        if etat is None or len(etat.lambdas) != len(self.lambdas) or tuple(etat.lambdas.tolist()) != self.lambdas:
+            etat = self.etats_ewma[asset] = BanqueEWMA(self.lambdas)
+        return etat
+
+    def resampler(self, asset):
+        """Récupère ou initialise le rééchantillonneur (barres de `intervalle` secondes) pour un actif donné."""
+        resampler = self.resamplers.get(asset)
+        if resampler is None or resampler.intervalle != self.intervalle:
+            resampler = self.resamplers[asset] = ResamplerBarres(self.intervalle)
+        return resampler
+
+    # --- Modèle EWMA --------------------------------------------------------------------------
+
+    def calculer_volatilite_initiale(self, asset, historique_data):
+        """
+        Calcule la volatilité initiale à partir des données historiques et amorce l'état EWMA de l'actif.
+        :return: Nombre de points de volatilité calculés.
+        """
+        # Vérifiez qu'il y a au moins 2 points pour calculer les rendements
+        if len(historique_data) < 2:
+            logger.warning("Pas assez de données historiques pour %s.", asset)
+            return 0
+
+        # Extraire les timestamps et les prix sous forme de tableaux NumPy
+        timestamps = np.fromiter((item['timestamp'] for item in historique_data), dtype=np.float64, count=len(historique_data))
+        prices = np.fromiter((item['mark_price'] for item in historique_data), dtype=np.float64, count=len(historique_data))
+
+        # Calculer les trajectoires de variance de tous les facteurs en une passe vectorisée, forme (L, T-1)
+        variances = calculer_variance_ewma_batch(prices, np.array(self.lambdas))
+        volatilities = np.sqrt(variances)
+
+        # Ajouter les volatilités calculées à l'historique de l'actif (décalage pour aligner les timestamps avec les rendements)
+        self.historique_volatilite(asset).extend(timestamps[1:], volatilities[0])
+        historique_banque = self.historique_banque(asset)
+        if historique_banque is not None:
+            historique_banque.extend(timestamps[1:], volatilities.T)
+
+        # Les barres historiques amorcent aussi la covariance inter-actifs (alignées sur la même grille) : elles sont
+        # collectées ici et intégrées avec celles des autres actifs à la fin du préchauffage (voir prechauffer)
+        if self.covariance is not None:
+            self.covariance.ajouter_historique(asset, timestamps, prices)
+        if self.garch is not None:
+            self.integrer_barres_garch(asset, timestamps, prices, ajuster=True)
+
+        # Amorcer la banque EWMA incrémentale pour prendre le relais sur les données en temps réel
+        self.etats_ewma[asset] = BanqueEWMA(self.lambdas, variances=variances[:, -1], dernier_prix=float(prices[-1]))
+        return volatilities.shape[-1]
+
+    def prechauffer(self, cache=None, duree_secondes=3600, assets=None, **kwargs):
+        """
+        Récupère en parallèle l'historique des actifs pas encore préchauffés (par défaut tous les actifs
+        du moteur) et calcule leur volatilité initiale. Un actif déjà en cours de préchauffage (autre thread)
+        est ignoré : son historique n'est jamais intégré deux fois. Les historiques n'entrent dans la covariance
+        qu'une fois tous chargés, alignés sur la grille commune.
+        Générateur : produit (asset, nb_points) dès que chaque actif est prêt (0 si aucune donnée).
+        """
+        assets = self.assets if assets is None else assets
+        with self.verrou:
+            a_prechauffer = [asset for asset in dict.fromkeys(assets)
+                             if asset not in self.actifs_prechauffes and asset not in self.prechauffages_en_cours]
+            self.prechauffages_en_cours.update(a_prechauffer)
+        restants = set(a_prechauffer)
+        try:
+            for asset, historique_data in charger_historiques(a_prechauffer, cache=cache, duree_secondes=duree_secondes,
+                                                              **kwargs):
+                if not historique_data:
+                    logger.warning("Pas de données historiques pour l'actif %s.", asset)
+                    nb_points = 0
+                else:
+                    with self.verrou:
+                        if self.plages:
+                            # Les estimateurs d'étendue utilisent les bougies OHLC d'origine, avant rééchantillonnage
+                            self.integrer_bougies_plage(asset, historique_data)
+                        historique_data = augmenter_resolution_historique(historique_data, self.intervalle,
+                                                                          self.resampler(asset))
+                        nb_points = self.calculer_volatilite_initiale(asset, historique_data)
+                        if nb_points:
+                            self.actifs_prechauffes.add(asset)
+                with self.verrou:
+                    self.prechauffages_en_cours.discard(asset)
+                    restants.discard(asset)
+                yield asset, nb_points
+        finally:
+            with self.verrou:
+                self.prechauffages_en_cours.difference_update(restants)
+                if self.covariance is not None:
+                    self.covariance.integrer_historiques()
+
+    def appliquer_modele_ewma(self, asset):
+        """
+        Enregistre la volatilité EWMA courante de l'actif.
+        La variance est maintenue barre par barre dans l'état EWMA de l'actif (voir traiter_tick) :
+        aucun rendement n'est recalculé ni réintégré ici.
+        Les volatilités des autres facteurs de la banque sont enregistrées au même instant (voir historique_banque),
+        puis les règles d'alerte éventuelles sont évaluées sur ce vecteur, en temps constant, si une nouvelle barre
+        a été intégrée depuis leur dernière évaluation.
+        """
+        etat = self.etat_ewma(asset)
+        volatility = etat.volatilite
+        if volatility is None:
+            return None
+        # Horodater avec le dernier prix intégré dans la fenêtre (ou l'heure courante à défaut)
+        dernier_point = self.buffer_prix(asset).dernier()
+        timestamp = dernier_point[0] if dernier_point is not None else time.time()
+        historique = self.historique_volatilite(asset)
+        historique.append(timestamp, volatility)
+        historique_banque = self.historique_banque(asset)
+        if historique_banque is not None:
+            historique_banque.append(timestamp, etat.volatilites)
+            historique = historique_banque
+        etat_garch = self.etats_garch.get(asset)
+        if etat_garch is not None and etat_garch.volatilite is not None:
+            self.historique_garch(asset).append(timestamp, etat_garch.volatilite)
+        etat_plage = self.etats_plage.get(asset)
+        if etat_plage is not None and etat_plage.variances is not None:
+            self.historique_plage(asset).append(timestamp, etat_plage.volatilites)
+        if self.alertes is not None and self._barres_evaluees.get(asset) != etat.nb_rendements:
+            # Les alertes ne voient que les estimations issues d'une nouvelle barre, pas les répétitions de l'échéancier
+            self._barres_evaluees[asset] = etat.nb_rendements
+            with Chronometre(self.metriques, "alertes"):
+                self.alertes.evaluer(asset, timestamp, etat.volatilites)
+
+        # Déclencher un rapport toutes les `seuil_rapport` estimations en temps réel
+        if self.seuil_rapport and self._rapporteurs:
+            compteur = self._estimations_depuis_rapport.get(asset, 0) + 1
+            if compteur >= self.seuil_rapport:
+                compteur = 0
+                with Chronometre(self.metriques, "envoi_rapport"):
+                    for rapporteur in self._rapporteurs:
+                        rapporteur(asset, historique)
+            self._estimations_depuis_rapport[asset] = compteur
+        return volatility
+
+    def traiter_tick(self, asset, timestamp, mark_price):
+        """Intègre un prix : ajout à la fenêtre, puis mise à jour EWMA pour chaque barre terminée."""
+        en_attente = self.rattrapages.get(asset)
+        if en_attente is not None:
+            # Le trou du flux n'est pas encore comblé : le tick sera rejoué après l'historique manquant
+            en_attente.append((timestamp, mark_price))
+            return
+
+        debut = time.perf_counter_ns()
+        # Ajouter le nouveau prix avec le timestamp de la plateforme (O(1), le plus ancien point est écrasé)
+        cached_prices = self.buffer_prix(asset)
+        cached_prices.append(timestamp, mark_price)
+        fin = time.perf_counter_ns()
+        self.metriques.observer("ajout_fenetre", fin - debut)
+
+        # Rééchantillonner sur une grille régulière : chaque barre terminée met à jour toutes les variances EWMA en O(1)
+        ewma_state = self.etat_ewma(asset)
+        etat_plage = self.etat_plage(asset) if self.plages else None
+        for barre in self.resampler(asset).ajouter(timestamp, mark_price):
+            ewma_state.mettre_a_jour(barre.close)
+            if etat_plage is not None:
+                etat_plage.mettre_a_jour(barre.open, barre.high, barre.low, barre.close)
+            if self.covariance is not None:
+                self.covariance.ajouter_barre(asset, barre.timestamp, barre.close)
+            if self.garch is not None:
+                self.integrer_barres_garch(asset, (barre.timestamp,), (barre.close,))
+        self.metriques.observer("mise_a_jour_ewma", time.perf_counter_ns() - fin)
+
+        self.log_limite.log(logging.DEBUG, asset, "Prix reçu pour %s (%d points dans la fenêtre).", asset, len(cached_prices))
+
+    def integrer_barres_garch(self, asset, timestamps, clotures, ajuster=False):
+        """
+        Intègre des clôtures de barres dans la prévision GARCH de l'actif (O(1) par barre) et soumet un réajustement
+        en arrière-plan toutes les `garch_reajustement` barres (ou immédiatement avec `ajuster`).
+        """
+        barres = self.barres_garch.get(asset)
+        if barres is None:
+            barres = self.barres_garch[asset] = RingBufferPrix(self.data_window)
+        elif barres.capacite != self.data_window:
+            barres.redimensionner(self.data_window)
+        barres.extend(timestamps, clotures)
+        etat = self.etats_garch.get(asset)
+        if etat is not None:
+            for cloture in clotures:
+                etat.mettre_a_jour(cloture)
+
+        compteur = self._barres_depuis_ajustement.get(asset, 0) + len(clotures)
+        if ajuster or compteur >= self.garch_reajustement:
+            # Le marqueur permet de rejouer les barres arrivées pendant l'ajustement
+            if self.garch.soumettre(asset, barres.prix(), marqueur=barres.nb_ajouts):
+                compteur = 0
+        self._barres_depuis_ajustement[asset] = compteur
+
+    def _appliquer_ajustement_garch(self, asset, parametres, variance, marqueur):
+        """Résultat d'un ajustement (thread du pool) : repart de la variance estimée et rejoue les barres arrivées depuis."""
+        with self.verrou:
+            clotures = self.barres_garch[asset].prix()
+            recentes = max(min(self.barres_garch[asset].nb_ajouts - marqueur + 1, len(clotures) - 1), 0)
+            # `variance` est celle du dernier rendement ajusté : repartir du prix qui le précède
+            etat = EtatGARCH(parametres, variance, dernier_prix=float(clotures[-recentes - 1]))
+            if recentes:
+                # Pas de tranche clotures[-0:] : elle rejouerait toute la fenêtre
+                for cloture in clotures[-recentes:].tolist():
+                    etat.mettre_a_jour(cloture)
+            self.etats_garch[asset] = etat
+        self.log_limite.log(logging.INFO, f"garch-{asset}", "GARCH réajusté pour %s : omega=%.3g, alpha=%.3f, beta=%.3f.",
+                            asset, *parametres)
+
+    def integrer_bougies_plage(self, asset, bougies, duree_bougie=DUREE_BOUGIE):
+        """
+        Intègre des bougies OHLC historiques (format de charger_donnees_tick_deribit) dans les estimateurs d'étendue
+        de l'actif, en un lot vectorisé. Les bougies étant plus longues que les barres en direct, le facteur de
+        décroissance est ajusté pour conserver la même demi-vie en secondes et les variances sont ramenées à la
+        durée d'une barre, afin que les barres en direct prennent le relais sans discontinuité.
+        :return: Nombre de points ajoutés à l'historique des estimateurs d'étendue.
+        """
+        if not bougies:
+            return 0
+        n = len(bougies)
+        timestamps = np.fromiter((item['timestamp'] for item in bougies), dtype=np.float64, count=n)
+        clotures = np.fromiter((item['mark_price'] for item in bougies), dtype=np.float64, count=n)
+        ouvertures, hauts, bas = (np.fromiter((item.get(cle, item['mark_price']) for item in bougies), dtype=np.float64,
+                                              count=n) for cle in ("open", "high", "low"))
+        variances = self.etat_plage(asset).rejouer(ouvertures, hauts, bas, clotures,
+                                                   lambda_factor=self.lambda_factor ** (duree_bougie / self.intervalle),
+                                                   echelle=self.intervalle / duree_bougie)
+        self.historique_plage(asset).extend(timestamps, np.sqrt(variances).T)
+        return n
+
+    def calculer_lot(self, maintenant=None):
+        """Calcule en un seul lot la volatilité de tous les actifs arrivés à échéance et notifie les abonnés."""
+        due_assets = self.ordonnanceur.actifs_dus(time.time() if maintenant is None else maintenant)
+        if not due_assets:
+            return due_assets
+        debut = time.perf_counter_ns()
+
+        for due_asset in due_assets:
+            new_volatility = self.appliquer_modele_ewma(due_asset)
+            if new_volatility is not None:
+                self.log_limite.log(logging.INFO, f"volatilite-{due_asset}", "Nouvelle volatilité calculée pour %s : %.6f",
+                                    due_asset, new_volatility)
+
+        self.metriques.observer("calcul_lot", time.perf_counter_ns() - debut)
+
+        # Une seule notification des abonnés par lot
+        for callback in self._abonnes:
+            callback(self, due_assets)
+        return due_assets
+
+    def combler_trou(self, asset, fin=None, **kwargs):
+        """
+        Rattrape la coupure du flux d'un actif : les bougies manquantes depuis le dernier tick intégré sont
+        téléchargées, rééchantillonnées sur la grille des barres et rejouées en un lot vectorisé dans l'état EWMA,
+        puis les ticks en direct reçus entre-temps prennent le relais. Sans ce rattrapage, le premier tick après
+        la reconnexion produirait un unique rendement couvrant toute la coupure.
+        :return: Nombre de points de volatilité ajoutés pour la période de la coupure.
+        """
+        with self.verrou:
+            self.rattrapages.setdefault(asset, [])
+            debut = self.resampler(asset).dernier_timestamp
+
+        bougies = []
+        if debut is not None:
+            fin = time.time() if fin is None else fin
+            kwargs.setdefault("base_url", self.api_url)
+            try:
+                bougies = charger_plage_deribit(asset, int(debut * 1000), int(fin * 1000), **kwargs)
+            except HistoriqueIncomplet as e:
+                # Mieux vaut rejouer les bougies obtenues : le trou restant sera couvert par un seul rendement
+                bougies = e.bougies
+
+        with self.verrou:
+            en_attente = self.rattrapages.pop(asset, [])
+            resampler = self.resampler(asset)
+            debut = resampler.dernier_timestamp
+            # Ne rejouer que l'historique strictement compris entre le dernier tick intégré et le premier tick en direct
+            limite = min((ts for ts, _ in en_attente if debut is None or ts > debut), default=float("inf"))
+            barres = []
+            retenues = []
+            for item in bougies:
+                if (debut is None or item['timestamp'] > debut) and item['timestamp'] < limite:
+                    self.buffer_prix(asset).append(item['timestamp'], item['mark_price'])
+                    barres.extend(resampler.ajouter(item['timestamp'], item['mark_price']))
+                    retenues.append(item)
+            if self.plages:
+                self.integrer_bougies_plage(asset, retenues)
+
+            nb_points = 0
+            if barres and self.covariance is not None:
+                self.covariance.ajouter_barres(asset, [barre.timestamp for barre in barres], [barre.close for barre in barres])
+            if barres and self.garch is not None:
+                self.integrer_barres_garch(asset, [barre.timestamp for barre in barres], [barre.close for barre in barres])
+            if barres:
+                variances = self.etat_ewma(asset).rejouer([barre.close for barre in barres])
+                nb_points = variances.shape[-1]
+                if nb_points:
+                    timestamps = np.fromiter((barre.timestamp for barre in barres), dtype=np.float64, count=len(barres))
+                    volatilities = np.sqrt(variances)
+                    self.historique_volatilite(asset).extend(timestamps[-nb_points:], volatilities[0])
+                    historique_banque = self.historique_banque(asset)
+                    if historique_banque is not None:
+                        historique_banque.extend(timestamps[-nb_points:], volatilities.T)
+
+            for timestamp, mark_price in en_attente:
+                self.traiter_tick(asset, timestamp, mark_price)
+        logger.info("Coupure du flux %s rattrapée : %d bougies, %d points de volatilité.", asset, len(bougies), nb_points)
+        return nb_points
+
+    def progression(self):
+        """Lignes du tableau de progression : remplissage de la fenêtre de prix et dernière volatilité par actif."""
+        progression_data = []
+        for asset in self.assets:
+            data_points = len(self.buffer_prix(asset))
+            historique = self.historique_volatilite(asset)
+            volatility_points = len(historique)
+            progression_data.append({
+                "Actif": asset,
+                "Progression des données de prix": f"{data_points}/{self.data_window}",
+                "Données de volatilité (points)": volatility_points,
+                "Dernière volatilité calculée": f"{historique.dernier()[1]:.6f}" if volatility_points > 0 else "N/A",
+            })
+        return progression_data
+
+    # --- Flux WebSocket --------------------------------------------------------------------------
+
+    def on_message(self, ws, message):
+        """Gère les messages reçus via WebSocket et traite les données en temps réel."""
+        debut = time.perf_counter_ns()
+        recu = time.time()
+        # Décoder uniquement les champs utiles (canal, prix marqué, timestamp de la plateforme)
+        decoded = decoder_message(message)
+        self.metriques.observer("reception_decodage", time.perf_counter_ns() - debut)
+        self.metriques.incrementer("messages")
+        if self.journal is not None:
+            self.journal.enregistrer(message, decoded, recu)
+
+        # Les réponses JSON-RPC et les heartbeats sont traités par le gestionnaire de connexions
+        if decoded.channel is None:
+            self.log_limite.log(logging.DEBUG, "ignore", "Structure de données inattendue dans le message. Ignoré.")
+            return
+
+        self.ingerer(decoded.channel, decoded.timestamp, decoded.mark_price)
+
+    def ingerer(self, channel, timestamp, mark_price, maintenant=None):
+        """
+        Chemin d'ingestion d'un tick décodé, commun au flux en direct et au rejeu d'un journal (voir rejeu.py).
+        :param maintenant: Heure utilisée pour l'échéancier des calculs (par défaut l'heure courante).
+        """
+        # Aiguillage canal -> actif en O(1)
+        asset = self.channel_dispatch.get(channel)
+        if asset is None:
+            self.metriques.incrementer("messages_ignores")
+            self.log_limite.log(logging.DEBUG, "non_selectionne", "Canal %s non sélectionné pour l'analyse.", channel)
+            return
+
+        if self.file is not None:
+            # Ne garder que la dernière mise à jour en attente de l'actif ; le thread de traitement s'occupe du reste
+            self.file.deposer(asset, (timestamp, mark_price))
+            return
+
+        with self.verrou:
+            self.traiter_tick(asset, timestamp, mark_price)
+            self.calculer_lot(maintenant)
+
+    def on_deconnecte(self, canaux):
+        """
+        Coupure d'une connexion : ses actifs devront être rattrapés à la reconnexion. Le trou commence au dernier
+        tick intégré de chaque actif (voir combler_trou), et non à l'instant où la coupure est détectée.
+        """
+        with self.verrou:
+            for canal in canaux:
+                asset = self.channel_dispatch.get(canal)
+                if asset is not None:
+                    self.actifs_interrompus.add(asset)
+
+    def on_connecte(self, canaux):
+        """(Re)connexion : les ticks en direct sont mis de côté pendant que la coupure est comblée en arrière-plan."""
+        with self.verrou:
+            a_rattraper = [self.channel_dispatch[canal] for canal in canaux
+                           if self.channel_dispatch.get(canal) in self.actifs_interrompus]
+            for asset in a_rattraper:
+                self.actifs_interrompus.discard(asset)
+                self.rattrapages.setdefault(asset, [])
+        # Appelé depuis la boucle asyncio : les requêtes REST partent dans un thread
+        for asset in a_rattraper:
+            threading.Thread(target=self._combler_trou, args=(asset,), name=f"rattrapage-{asset}", daemon=True).start()
+
+    def _combler_trou(self, asset):
+        try:
+            self.combler_trou(asset)
+        except Exception:
+            logger.exception("Échec du rattrapage de la coupure pour %s.", asset)
+            with self.verrou:
+                for timestamp, mark_price in self.rattrapages.pop(asset, []):
+                    self.traiter_tick(asset, timestamp, mark_price)
+
+    def demarrer_traitement(self):
+        """Démarre (une seule fois) le thread qui vide la file conflatante."""
+        if self.file is None or self._thread_traitement is not None:
+            return
+        self._thread_traitement = threading.Thread(target=self._boucle_traitement, name="traitement", daemon=True)
+        self._thread_traitement.start()
+
+    def _boucle_traitement(self):
+        """Traite tout ce qui est en attente, puis calcule un seul lot : les rafales ne créent jamais de retard cumulé."""
+        while not self._arret_traitement.is_set():
+            en_attente = self.file.vider(timeout=self.intervalle)
+            with self.verrou:
+                for asset, (timestamp, mark_price) in en_attente.items():
+                    self.traiter_tick(asset, timestamp, mark_price)
+                self.calculer_lot()
+            stats = self.file.statistiques()
+            self.log_limite.log(logging.INFO, "file", "File d'entrée : %d reçus, %d fusionnés, retard max %.3f s.",
+                                stats["recus"], stats["fusionnes"], stats["retard_max"])
+
+    def arreter(self):
+        """Ferme volontairement toutes les connexions WebSocket (sans reconnexion), le traitement et le pool GARCH."""
+        self._arret_traitement.set()
+        if self.connexions is not None:
+            self.connexions.arreter()
+        if self.garch is not None:
+            self.garch.arreter()
+        if self.journal is not None:
+            self.journal.vider()
+
+    def executer(self):
+        """Lance les connexions WebSocket pour la collecte de données en temps réel (bloquant)."""
+        self.demarrer_traitement()
+        self.connexions = GestionnaireConnexions(
+            self.ws_url,
+            [f"ticker.{asset}.raw" for asset in self.assets],
+            on_message=self.on_message,
+            client_id=self.client_id,
+            client_secret=self.client_secret,
+            on_connecte=self.on_connecte,
+            on_deconnecte=self.on_deconnecte,
+        )
+        self.connexions.executer()
+
+
+def construire_alertes(args):
+    """Moteur d'alertes décrit par les options --alert-* de la ligne de commande, ou None si aucune règle n'est demandée."""
+    regles = [RegleSeuil(seuil, direction=HAUSSE) for seuil in args.alert_above]
+    regles += [RegleSeuil(seuil, direction=BAISSE) for seuil in args.alert_below]
+    if args.alert_zscore:
+        regles.append(RegleZScore(args.alert_zscore))
+    if args.alert_divergence:
+        regles.append(RegleDivergence(args.alert_divergence))
+    if not regles:
+        return None
+    puits = [PuitsLog()]
+    if args.alert_webhook:
+        puits.append(PuitsWebhook(args.alert_webhook))
+    return MoteurAlertes(regles, puits, delai_reemission=args.alert_cooldown)
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande : moteur EWMA sans interface."""
+    parser = argparse.ArgumentParser(description="Calcul de volatilité EWMA en temps réel (sans interface).")
+    parser.add_argument("--assets", nargs="+", default=[], help="Instruments Deribit, ex. BTC-PERPETUAL ETH-PERPETUAL")
+    parser.add_argument("--universe", action="store_true",
+                        help="Suivre tous les instruments actifs de Deribit (perpétuels et futures par défaut)")
+    parser.add_argument("--kinds", nargs="+", default=["future"], help="Types d'instruments de l'univers, ex. future option")
+    parser.add_argument("--currencies", nargs="+", help="Devises de l'univers (défaut : toutes), ex. BTC ETH")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de processus entre lesquels répartir les instruments (mode réparti)")
+    parser.add_argument("--window", type=int, default=100, help="Taille de la fenêtre de prix (nombre de points)")
+    parser.add_argument("--interval", type=float, default=10.0, help="Intervalle entre deux estimations (secondes)")
+    parser.add_argument("--warmup-hours", type=float, default=1.0, help="Profondeur de l'historique de préchauffage (heures)")
+    parser.add_argument("--retention", type=int, default=20000, help="Nombre d'estimations conservées par actif")
+    parser.add_argument("--lambdas", nargs="*", type=float, default=[],
+                        help="Facteurs de décroissance EWMA supplémentaires, ex. 0.90 0.97 0.99")
+    parser.add_argument("--half-lives", nargs="*", type=float, default=[],
+                        help="Demi-vies EWMA supplémentaires en secondes, converties selon l'intervalle")
+    parser.add_argument("--covariance", action="store_true",
+                        help="Calculer la matrice de covariance EWMA entre les actifs (jointe aux rapports)")
+    parser.add_argument("--garch", action="store_true", help="Calculer aussi une prévision GARCH(1,1)")
+    parser.add_argument("--garch-refit", type=int, default=60, help="Nombre de barres entre deux réajustements GARCH")
+    parser.add_argument("--range-estimators", action="store_true",
+                        help="Calculer aussi les estimateurs d'étendue OHLC (Parkinson, Garman-Klass, Rogers-Satchell, "
+                             "Yang-Zhang), qui convergent plus vite et permettent un préchauffage plus court")
+    parser.add_argument("--alert-above", nargs="*", type=float, default=[],
+                        help="Seuils absolus d'alerte à la hausse, dans l'unité des estimations (écart-type par barre)")
+    parser.add_argument("--alert-below", nargs="*", type=float, default=[], help="Seuils absolus d'alerte à la baisse")
+    parser.add_argument("--alert-zscore", type=float,
+                        help="Alerte quand le z-score de la volatilité par rapport à sa distribution récente atteint ce seuil")
+    parser.add_argument("--alert-divergence", type=float,
+                        help="Alerte quand le rapport des volatilités rapide/lente de la banque atteint ce seuil "
+                             "(nécessite --lambdas ou --half-lives)")
+    parser.add_argument("--alert-cooldown", type=float, default=DELAI_REEMISSION,
+                        help="Délai minimal (secondes) entre deux déclenchements d'une même alerte pour un même actif")
+    parser.add_argument("--alert-webhook", help="URL recevant les alertes en JSON (HTTP POST), ex. http://127.0.0.1:8765/")
+    parser.add_argument("--alert-email", help="Adresse recevant les alertes (identifiants SMTP : FROMEMAIL, EMAILPASSWORD)")
+    parser.add_argument("--journal", help="Fichier journal où enregistrer les ticks reçus (rejouable avec rejeu.py)")
+    parser.add_argument("--journal-format", choices=FORMATS_JOURNAL, default="ticks",
+                        help="Lignes décodées compactes (ticks) ou trames brutes (trames)")
+    parser.add_argument("--metrics-port", type=int, help="Port local exposant les métriques au format Prometheus (/metrics)")
+    parser.add_argument("--ws-url", default=DERIBIT_WS_URL, help="URL du WebSocket Deribit")
+    parser.add_argument("--email", help="Adresse recevant un rapport toutes les 100 estimations "
+                                        "(identifiants SMTP via FROMEMAIL / EMAILPASSWORD)")
+    parser.add_argument("--conflation", action="store_true",
+                        help="Ne traiter que la dernière mise à jour en attente de chaque instrument")
+    parser.add_argument("--log-level", default="INFO", help="Niveau de journalisation (DEBUG, INFO, WARNING...)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s : %(message)s")
+
+    assets = list(args.assets)
+    if args.universe:
+        assets.extend(decouvrir_instruments(args.currencies, tuple(args.kinds)))
+        logger.info("Univers découvert : %d instruments.", len(assets))
+    if not assets:
+        parser.error("aucun instrument : préciser --assets ou --universe")
+
+    if args.workers > 1:
+        executer_reparti(args, assets)
+        return
+
+    alertes = construire_alertes(args)
+    moteur = MoteurVolatilite(
+        assets, data_window=args.window, intervalle=args.interval, retention=args.retention,
+        ws_url=args.ws_url, client_id=os.environ.get("API_KEY"), client_secret=os.environ.get("API_SECRET"),
+        conflation=args.conflation, lambdas=args.lambdas, demi_vies=args.half_lives, covariance=args.covariance,
+        garch=args.garch, garch_reajustement=args.garch_refit, plages=args.range_estimators,
+        journal=ouvrir_journal(args.journal, args.journal_format) if args.journal else None, alertes=alertes,
+    )
+    if alertes is not None:
+        moteur.metriques.compteur_externe("alertes_declenchees", lambda: alertes.nb_declenchees)
+        moteur.metriques.jauge("alertes_actives", lambda: len(alertes.actives()))
+
+    repartiteur = None
+    if args.email or (alertes is not None and args.alert_email):
+        from rapports import RepartiteurRapports
+
+        # Envoi en arrière-plan : le rapport est copié puis mis en file, sans bloquer le calcul
+        repartiteur = RepartiteurRapports(os.environ["FROMEMAIL"], os.environ["EMAILPASSWORD"], metriques=moteur.metriques)
+        moteur.metriques.jauge("rapports_en_attente", lambda: repartiteur.statistiques()["en_attente"])
+        if alertes is not None and args.alert_email:
+            alertes.ajouter_puits(PuitsEmail(repartiteur, [args.alert_email]))
+    if args.email:
+        def envoyer_rapport(asset, historique):
+            correlation = moteur.covariance.instantane() if moteur.covariance is not None else None
+            repartiteur.soumettre(historique, args.email, asset=asset, correlation=correlation)
+
+        moteur.abonner_rapport(envoyer_rapport)
+
+    if args.metrics_port:
+        moteur.metriques.demarrer_serveur(args.metrics_port)
+
+    for asset, nb_points in moteur.prechauffer(CacheHistorique(CACHE_HISTORIQUE_DIR), args.warmup_hours * 3600):
+        logger.info("Volatilité initiale calculée pour %s. Points calculés : %d.", asset, nb_points)
+
+    try:
+        moteur.executer()
+    finally:
+        if repartiteur is not None:
+            repartiteur.arreter()
+
+
+def executer_reparti(args, assets):
+    """Mode réparti de la ligne de commande : un processus par partition, résumé périodique lu dans la table partagée."""
+    from partition import MoteurReparti
+
+    alertes = args.alert_above or args.alert_below or args.alert_zscore or args.alert_divergence
+    if args.covariance or args.journal or args.email or args.metrics_port or alertes:
+        logger.warning("--covariance, --journal, --email, --metrics-port et les alertes ne sont pris en charge "
+                       "qu'avec un seul processus.")
+    moteur = MoteurReparti(
+        assets, nb_workers=args.workers, capacite=args.retention, duree_prechauffage=args.warmup_hours * 3600,
+        data_window=args.window, intervalle=args.interval, ws_url=args.ws_url, client_id=os.environ.get("API_KEY"),
+        client_secret=os.environ.get("API_SECRET"), conflation=args.conflation, lambdas=tuple(args.lambdas),
+        demi_vies=tuple(args.half_lives), garch=args.garch, garch_reajustement=args.garch_refit,
+        plages=args.range_estimators,
+    )
+    moteur.demarrer()
+    try:
+        while True:
+            time.sleep(max(args.interval, 5.0))
+            lignes = moteur.table.vue()
+            volatilites = np.where(lignes["nb_ajouts"] > 0, lignes["volatilite"], -np.inf)
+            plus_volatils = [f"{moteur.instruments[i]}={volatilites[i]:.6f}"
+                             for i in np.argsort(volatilites)[::-1][:5] if np.isfinite(volatilites[i])]
+            logger.info("%s · plus volatils : %s", moteur.statistiques(), ", ".join(plus_volatils) or "N/A")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        moteur.arreter()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import math
+
+import numpy as np
+
+
+class BanqueEWMA:
+    """
+    État EWMA incrémental d'un actif : le dernier prix et un vecteur de variances, une par facteur de décroissance.
+    Chaque nouveau prix est intégré en temps constant, sans rejouer la fenêtre de données, et met à jour
+    toutes les variances en une seule opération NumPy ; le premier facteur est le facteur principal
+    (variance, volatilite), les autres donnent des séries parallèles plus rapides ou plus lentes.
+    """
+
+    __slots__ = ("lambdas", "dernier_prix", "variances", "nb_rendements", "_complements")
+
+    def __init__(self, lambdas=(0.94,), variances=None, dernier_prix=None):
+        self.lambdas = np.atleast_1d(np.asarray(lambdas, dtype=np.float64))
+        self._complements = 1.0 - self.lambdas
+        self.dernier_prix = dernier_prix
+        self.variances = None if variances is None else np.array(variances, dtype=np.float64).reshape(self.lambdas.shape)
+        self.nb_rendements = 0
+
+    @property
+    def lambda_factor(self):
+        return float(self.lambdas[0])
+
+    @property
+    def variance(self):
+        """Variance du facteur principal, ou None si elle n'est pas encore définie."""
+        return None if self.variances is None else float(self.variances[0])
+
+    def mettre_a_jour(self, prix):
+        """Intègre un nouveau prix et retourne le vecteur des variances (None tant qu'aucun rendement n'est connu)."""
+        prix = float(prix)
+        if not (prix > 0.0 and math.isfinite(prix)):
+            return self.variances
+
+        if self.dernier_prix is None:
+            self.dernier_prix = prix
+            return self.variances
+
+        rendement = math.log(prix / self.dernier_prix)
+        carre = rendement * rendement
+        self.dernier_prix = prix
+        if self.variances is None:
+            # Premier rendement : toutes les variances sont amorcées avec son carré
+            self.variances = np.full(self.lambdas.shape, carre)
+        else:
+            self.variances *= self.lambdas
+            self.variances += self._complements * carre
+        self.nb_rendements += 1
+        return self.variances
+
+    def rejouer(self, prix):
+        """
+        Intègre une série de prix en une passe vectorisée (ex. rattrapage après une coupure du flux) et retourne
+        les variances de forme (L, T), une ligne par facteur de décroissance (équivalent à appeler mettre_a_jour
+        sur chaque prix).
+        """
+        prix = np.asarray(prix, dtype=np.float64)
+        prix = prix[(prix > 0.0) & np.isfinite(prix)]
+        if self.dernier_prix is None or self.variances is None:
+            variances = [self.mettre_a_jour(p) for p in prix.tolist()]
+            variances = [v.copy() for v in variances if v is not None]
+            if not variances:
+                return np.empty((len(self.lambdas), 0), dtype=np.float64)
+            return np.stack(variances, axis=-1)
+        if len(prix) == 0:
+            return np.empty((len(self.lambdas), 0), dtype=np.float64)
+
+        variances = calculer_variance_ewma_batch(np.concatenate(([self.dernier_prix], prix)), self.lambdas,
+                                                 variance_initiale=self.variances)
+        self.variances = variances[:, -1].copy()
+        self.dernier_prix = float(prix[-1])
+        self.nb_rendements += len(prix)
+        return variances
+
+    @property
+    def volatilite(self):
+        """Volatilité du facteur principal, ou None si la variance n'est pas encore définie."""
+        if self.variances is None:
+            return None
+        return math.sqrt(self.variances[0])
+
+    @property
+    def volatilites(self):
+        """Vecteur des volatilités (une par facteur), ou None si les variances ne sont pas encore définies."""
+        if self.variances is None:
+            return None
+        return np.sqrt(self.variances)
+
+
+def lambda_depuis_demi_vie(demi_vie, intervalle):
+    """
+    Facteur de décroissance dont la demi-vie vaut `demi_vie` secondes pour des barres de `intervalle` secondes :
+    le poids d'un rendement est divisé par deux toutes les demi_vie / intervalle barres.
+    """
+    if demi_vie <= 0:
+        raise ValueError("La demi-vie doit être strictement positive.")
+    return 0.5 ** (float(intervalle) / float(demi_vie))
+
+
+def _taille_bloc(lambda_min):
+    """Taille de bloc telle que lambda**-taille reste loin du débordement flottant."""
+    if lambda_min >= 1.0:
+        return 4096
+    if lambda_min <= 0.0:
+        return 1
+    return int(np.clip(115.0 / -np.log(lambda_min), 1, 4096))
+
+
+def calculer_variance_ewma_batch(prix, lambda_factor=0.94, variance_initiale=None):
+    """
+    Calcule en une passe vectorisée la trajectoire complète de la variance EWMA.
+
+    :param prix: Tableau de prix de forme (T,) ou (A, T) pour A actifs de même longueur.
+    :param lambda_factor: Facteur de décroissance scalaire ou tableau 1-D de L facteurs.
+    :param variance_initiale: Variance de départ (scalaire ou diffusable) ; par défaut la variance
+        empirique des rendements log, comme dans calculer_volatilite_initiale.
+    :return: Tableau des variances de forme (..., T-1), avec un axe L inséré avant l'axe temporel
+        lorsque lambda_factor est un tableau : (T-1,), (A, T-1), (L, T-1) ou (A, L, T-1).
+    """
+    prix = np.asarray(prix, dtype=np.float64)
+    rendements = np.diff(np.log(prix), axis=-1)
+    nb = rendements.shape[-1]
+    if variance_initiale is None and nb:
+        variance_initiale = np.var(rendements, axis=-1, ddof=1) if nb > 1 else rendements[..., 0] ** 2
+        variance_initiale = np.asarray(variance_initiale)[..., None]
+    return filtrer_ewma_batch(rendements * rendements, lambda_factor, variance_initiale)
+
+
+def filtrer_ewma_batch(termes, lambda_factor=0.94, variance_initiale=None):
+    """
+    Applique en une passe vectorisée la récursion v_t = lambda * v_{t-1} + (1 - lambda) * x_t à une série de termes
+    positifs : carrés des rendements (voir calculer_variance_ewma_batch) ou termes d'un estimateur d'étendue
+    (voir plages.py).
+
+    :param termes: Tableau de forme (T,) ou (A, T).
+    :param lambda_factor: Facteur de décroissance scalaire ou tableau 1-D de L facteurs.
+    :param variance_initiale: Valeur de départ, diffusable vers (..., L) ; par défaut la moyenne des termes.
+    :return: Tableau de forme (..., T), avec un axe L inséré avant l'axe temporel lorsque lambda_factor est un tableau.
+
+    La récursion est résolue par blocs à l'aide de sommes cumulées pondérées par lambda**-k ; tous les termes
+    étant positifs, il n'y a pas de perte de précision par annulation.
+    """
+    termes = np.asarray(termes, dtype=np.float64)
+    lambdas = np.asarray(lambda_factor, dtype=np.float64)
+    scalaire = lambdas.ndim == 0
+    lambdas = np.atleast_1d(lambdas)
+
+    nb = termes.shape[-1]
+    if nb == 0:
+        forme = termes.shape[:-1] + (() if scalaire else (len(lambdas),)) + (0,)
+        return np.empty(forme, dtype=np.float64)
+
+    # Forme de travail : (..., L, T)
+    if variance_initiale is None:
+        variance_initiale = np.mean(termes, axis=-1)[..., None]
+    termes = np.broadcast_to(termes[..., None, :], termes.shape[:-1] + (len(lambdas), nb))
+    lam = lambdas[:, None]
+    variance = np.broadcast_to(np.asarray(variance_initiale, dtype=np.float64), termes.shape[:-1]).copy()
+
+    variances = np.empty(termes.shape, dtype=np.float64)
+    taille = _taille_bloc(float(lambdas.min()))
+    for debut in range(0, nb, taille):
+        fin = min(debut + taille, nb)
+        k = np.arange(fin - debut, dtype=np.float64)
+        puissances = lam ** (k + 1)  # lambda**(k+1), forme (L, B)
+        poids = lam ** -k  # lambda**-k, forme (L, B)
+        cumul = np.cumsum(termes[..., debut:fin] * poids, axis=-1)
+        variances[..., debut:fin] = puissances * variance[..., None] + (1 - lam) * lam ** k * cumul
+        variance = variances[..., fin - 1]
+
+    if scalaire:
+        variances = variances[..., 0, :]
+    return variances
@@ -0,0 +1,165 @@
+import math
+import multiprocessing
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from decodage import logger
+
+# Paramètres GARCH(1,1) en unités de rendements log bruts : v_t = omega + alpha * r_{t-1}**2 + beta * v_{t-1}
+ParametresGARCH = namedtuple("ParametresGARCH", ["omega", "alpha", "beta"])
+
+# Nombre minimal de rendements pour estimer un GARCH(1,1)
+MIN_RENDEMENTS_GARCH = 50
+
+
+def ajuster_garch(prix, parametres_initiaux=None):
+    """
+    Estime un GARCH(1,1) (moyenne nulle, loi normale) sur les rendements log d'une série de prix.
+    Exécutée dans un processus de calcul : elle ne dépend que de ses arguments.
+    :param parametres_initiaux: ParametresGARCH de l'ajustement précédent, utilisés comme point de départ.
+    :return: Tuple (ParametresGARCH, variance conditionnelle en fin de série, durée de l'optimisation en secondes).
+    """
+    from arch import arch_model
+
+    debut = time.perf_counter()
+    rendements = np.diff(np.log(np.asarray(prix, dtype=np.float64)))
+    # Remise à l'échelle (écart-type unitaire) pour la stabilité de l'optimiseur
+    echelle = 1.0 / max(float(np.std(rendements)), 1e-12)
+    modele = arch_model(rendements * echelle, mean="Zero", vol="GARCH", p=1, q=1, dist="normal", rescale=False)
+    depart = None
+    if parametres_initiaux is not None:
+        depart = np.array([parametres_initiaux.omega * echelle ** 2, parametres_initiaux.alpha, parametres_initiaux.beta])
+    resultat = modele.fit(starting_values=depart, disp="off", show_warning=False)
+    omega, alpha, beta = (float(resultat.params[nom]) for nom in ("omega", "alpha[1]", "beta[1]"))
+    variance = float(resultat.conditional_volatility[-1]) ** 2 / echelle ** 2
+    parametres = ParametresGARCH(omega / echelle ** 2, alpha, beta)
+    return parametres, variance, time.perf_counter() - debut
+
+
+class EtatGARCH:
+    """
+    Prévision GARCH(1,1) incrémentale d'un actif entre deux ajustements : chaque barre met à jour la variance
+    conditionnelle en O(1) avec les derniers paramètres estimés.
+    """
+
+    __slots__ = ("parametres", "dernier_prix", "variance", "nb_rendements")
+
+    def __init__(self, parametres=None, variance=None, dernier_prix=None):
+        self.parametres = parametres
+        self.dernier_prix = dernier_prix
+        self.variance = variance
+        self.nb_rendements = 0
+
+    def mettre_a_jour(self, prix):
+        """Intègre un nouveau prix et retourne la variance prévue pour la barre suivante (None avant le premier ajustement)."""
+        prix = float(prix)
+        if not (prix > 0.0 and math.isfinite(prix)):
+            return self.variance
+        if self.dernier_prix is not None and self.parametres is not None and self.variance is not None:
+            rendement = math.log(prix / self.dernier_prix)
+            omega, alpha, beta = self.parametres
+            self.variance = omega + alpha * rendement * rendement + beta * self.variance
+            self.nb_rendements += 1
+        self.dernier_prix = prix
+        return self.variance
+
+    @property
+    def volatilite(self):
+        if self.variance is None:
+            return None
+        return math.sqrt(self.variance)
+
+
+class ReajusteurGARCH:
+    """
+    Réajustements GARCH périodiques dans un pool de processus.
+
+    Un seul ajustement par actif est en cours à la fois ; la soumission ne bloque jamais l'appelant.
+    À la fin d'un ajustement, `on_resultat(asset, parametres, variance, nb_barres_soumises)` est appelé
+    depuis un thread du pool. Les latences (soumission -> résultat) et durées d'optimisation sont mesurées.
+    """
+
+    def __init__(self, on_resultat, max_workers=None):
+        self.on_resultat = on_resultat
+        self.max_workers = max_workers
+        self.parametres = {}  # asset -> derniers ParametresGARCH (démarrage à chaud)
+        self.nb_ajustements = 0
+        self.nb_echecs = 0
+        self.derniere_latence = 0.0
+        self.latence_max = 0.0
+        self.latence_totale = 0.0
+        self.derniere_duree_ajustement = 0.0
+        self._en_cours = set()
+        self._verrou = threading.Lock()
+        self._executeur = None
+
+    def soumettre(self, asset, prix, marqueur=None):
+        """
+        Soumet un ajustement sur une copie des prix ; retourne False si un ajustement de l'actif est déjà en cours
+        ou si le pool refuse la soumission.
+        """
+        prix = np.array(prix, dtype=np.float64)
+        if len(prix) <= MIN_RENDEMENTS_GARCH:
+            return False
+        with self._verrou:
+            if asset in self._en_cours:
+                return False
+            self._en_cours.add(asset)
+            if self._executeur is None:
+                # "spawn" : un fork hériterait des verrous tenus par les threads de l'application (Streamlit, asyncio...)
+                self._executeur = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+            executeur = self._executeur
+        depart = time.perf_counter()
+        try:
+            future = executeur.submit(ajuster_garch, prix, self.parametres.get(asset))
+        except Exception as e:
+            # Pool arrêté ou cassé (processus tué) : il sera recréé à la prochaine soumission
+            with self._verrou:
+                self._en_cours.discard(asset)
+                if self._executeur is executeur:
+                    self._executeur = None
+            self.nb_echecs += 1
+            logger.warning("Impossible de soumettre l'ajustement GARCH de %s : %s", asset, e)
+            return False
+        future.add_done_callback(lambda f: self._terminer(asset, f, depart, marqueur))
+        return True
+
+    def _terminer(self, asset, future, depart, marqueur):
+        latence = time.perf_counter() - depart
+        with self._verrou:
+            self._en_cours.discard(asset)
+        try:
+            parametres, variance, duree = future.result()
+        except Exception as e:
+            self.nb_echecs += 1
+            logger.warning("Échec de l'ajustement GARCH pour %s : %s", asset, e)
+            return
+        self.parametres[asset] = parametres
+        self.nb_ajustements += 1
+        self.derniere_latence = latence
+        self.latence_max = max(self.latence_max, latence)
+        self.latence_totale += latence
+        self.derniere_duree_ajustement = duree
+        self.on_resultat(asset, parametres, variance, marqueur)
+
+    def statistiques(self):
+        """Nombre d'ajustements et latences (secondes) : dernière, maximale et moyenne, durée de l'optimisation."""
+        return {
+            "ajustements": self.nb_ajustements,
+            "echecs": self.nb_echecs,
+            "derniere_latence": self.derniere_latence,
+            "latence_max": self.latence_max,
+            "latence_moyenne": self.latence_totale / self.nb_ajustements if self.nb_ajustements else 0.0,
+            "duree_ajustement": self.derniere_duree_ajustement,
+        }
+
+    def arreter(self):
+        with self._verrou:
+            executeur, self._executeur = self._executeur, None
+        if executeur is not None:
+            executeur.shutdown(wait=False, cancel_futures=True)
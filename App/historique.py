@@ -0,0 +1,374 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from decodage import logger
+
+# API REST Deribit (surchargeable, par exemple pour un serveur HTTP local de test)
+DERIBIT_API_URL = "https://www.deribit.com/api/v2"
+
+# Parallélisme et débit par défaut, compatibles avec les limites de l'API publique Deribit
+MAX_REQUETES_PARALLELES = 4
+REQUETES_PAR_SECONDE = 10.0
+TIMEOUT_REQUETE = 10.0
+
+# Nombre maximal de bougies demandées par requête lors du découpage des longues plages
+BOUGIES_PAR_REQUETE = 1000
+
+# Format des fichiers de cache : une ligne par bougie, colonnes float64 (mark_price est la clôture)
+DTYPE_BOUGIES = np.dtype([("timestamp", "<f8"), ("mark_price", "<f8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8")])
+
+# Bornes du cache disque : ancienneté maximale des bougies conservées (au moins la profondeur de préchauffage
+# demandée) et taille totale du répertoire, au-delà de laquelle les fichiers les moins récemment utilisés sont supprimés
+DUREE_RETENTION_CACHE = 7 * 24 * 3600
+TAILLE_MAX_CACHE = 512 * 1024 * 1024
+
+
+def creer_session(taille_pool=MAX_REQUETES_PARALLELES):
+    """Session HTTP partagée avec un pool de connexions keep-alive dimensionné pour le parallélisme voulu."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=taille_pool, pool_maxsize=taille_pool)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class LimiteurDebit:
+    """Espace les départs de requêtes pour ne pas dépasser un nombre de requêtes par seconde (thread-safe)."""
+
+    def __init__(self, requetes_par_seconde=REQUETES_PAR_SECONDE):
+        self.espacement = 1.0 / requetes_par_seconde if requetes_par_seconde else 0.0
+        self._prochain = 0.0
+        self._verrou = threading.Lock()
+
+    def attendre(self):
+        with self._verrou:
+            maintenant = time.monotonic()
+            depart = max(maintenant, self._prochain)
+            self._prochain = depart + self.espacement
+        if depart > maintenant:
+            time.sleep(depart - maintenant)
+
+
+class HistoriqueIncomplet(Exception):
+    """
+    Au moins une requête d'une plage de bougies a échoué : `bougies` contient celles obtenues, avec un trou.
+    Une plage incomplète n'est jamais enregistrée dans le cache, où le trou deviendrait permanent.
+    """
+
+    def __init__(self, asset, bougies, nb_echecs):
+        super().__init__(f"{nb_echecs} requête(s) d'historique en échec pour {asset}")
+        self.asset = asset
+        self.bougies = bougies
+        self.nb_echecs = nb_echecs
+
+
+def _requete_bougies(asset, start_timestamp, end_timestamp, resolution="1", session=None, base_url=DERIBIT_API_URL,
+                     timeout=TIMEOUT_REQUETE):
+    """Une requête get_tradingview_chart_data ; lève une exception en cas d'erreur ou de réponse inexploitable."""
+    params = {
+        "instrument_name": asset,
+        "resolution": resolution,  # Résolution en minutes
+        "start_timestamp": start_timestamp,
+        "end_timestamp": end_timestamp
+    }
+    response = (session or requests).get(f"{base_url}/public/get_tradingview_chart_data", params=params, timeout=timeout)
+    response.raise_for_status()  # Vérifie si la requête a échoué
+    data = response.json()
+
+    # Vérifie si le résultat est valide et contient les clés nécessaires
+    if "result" not in data or not all(key in data["result"] for key in ["ticks", "close"]):
+        raise ValueError("réponse sans colonnes ticks/close")
+    resultat = data["result"]
+    clotures = resultat["close"]
+    ouvertures, hauts, bas = (resultat.get(cle) or clotures for cle in ("open", "high", "low"))
+    return [
+        {
+            'timestamp': ts / 1000,
+            'mark_price': close,
+            'open': open_,
+            'high': high,
+            'low': low
+        }
+        for ts, close, open_, high, low in zip(resultat["ticks"], clotures, ouvertures, hauts, bas)
+    ]
+
+
+def charger_donnees_tick_deribit(asset, start_timestamp=None, end_timestamp=None, resolution="1",
+                                 session=None, base_url=DERIBIT_API_URL, timeout=TIMEOUT_REQUETE):
+    """
+    Cette fonction récupère des données (par défaut l'heure précédente) pour un actif donné via l'API de Deribit,
+    et retourne une liste de dictionnaires au format :
+    [
+        {
+            'timestamp': <timestamp en secondes>,
+            'mark_price': <prix de clôture>,
+            'open': <prix d'ouverture>,
+            'high': <plus haut>,
+            'low': <plus bas>
+        },
+        ...
+    ]
+    Les timestamps de début et de fin sont en millisecondes. Si l'API ne renvoie pas les colonnes
+    open/high/low, elles valent la clôture. En cas d'erreur, l'erreur est journalisée et la liste est vide.
+    """
+    # Calcul des timestamps pour l'heure précédente (en millisecondes)
+    if end_timestamp is None:
+        end_timestamp = int(time.time() * 1000)
+    if start_timestamp is None:
+        start_timestamp = end_timestamp - 3600000  # 1 heure avant en millisecondes
+
+    try:
+        return _requete_bougies(asset, start_timestamp, end_timestamp, resolution, session, base_url, timeout)
+    except ValueError:
+        logger.warning("Les données historiques pour %s ne sont pas disponibles ou sont incomplètes.", asset)
+        return []
+    except requests.exceptions.RequestException as e:
+        logger.error("Erreur de connexion pour récupérer les données de %s : %s", asset, e)
+        return []
+    except Exception as e:
+        logger.error("Une erreur inattendue est survenue lors de la récupération des données pour %s : %s", asset, e)
+        return []
+
+
+def decouvrir_instruments(devises=None, kinds=("future",), session=None, base_url=DERIBIT_API_URL,
+                          timeout=TIMEOUT_REQUETE):
+    """
+    Univers des instruments Deribit actifs (non expirés), par défaut tous les perpétuels et futures de toutes
+    les devises. Les options peuvent être ajoutées avec kinds=("future", "option").
+    :param devises: Devises à parcourir (ex. ["BTC", "ETH"]) ; None pour toutes celles que liste l'API.
+    :return: Liste des noms d'instruments, sans doublon, dans l'ordre de l'API (liste vide en cas d'erreur).
+    """
+    client = session or requests
+    try:
+        if devises is None:
+            response = client.get(f"{base_url}/public/get_currencies", timeout=timeout)
+            response.raise_for_status()
+            devises = [item["currency"] for item in response.json().get("result", [])]
+
+        instruments = []
+        for devise in devises:
+            for kind in kinds:
+                params = {"currency": devise, "kind": kind, "expired": "false"}
+                response = client.get(f"{base_url}/public/get_instruments", params=params, timeout=timeout)
+                response.raise_for_status()
+                instruments.extend(item["instrument_name"] for item in response.json().get("result", [])
+                                   if item.get("is_active", True))
+        return list(dict.fromkeys(instruments))
+    except requests.exceptions.RequestException as e:
+        logger.error("Erreur de connexion lors de la découverte des instruments : %s", e)
+        return []
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error("Réponse inattendue lors de la découverte des instruments : %s", e)
+        return []
+
+
+def charger_plage_deribit(asset, start_timestamp, end_timestamp, resolution="1", limiteur=None, **kwargs):
+    """
+    Récupère une plage de bougies de longueur quelconque en la découpant en requêtes d'au plus
+    BOUGIES_PAR_REQUETE bougies. Les timestamps sont en millisecondes.
+    :raises HistoriqueIncomplet: Si au moins une requête a échoué (les autres morceaux sont tout de même chargés).
+    """
+    pas = BOUGIES_PAR_REQUETE * int(resolution) * 60000
+    historique_data = []
+    nb_echecs = 0
+    debut = start_timestamp
+    while debut < end_timestamp:
+        fin = min(debut + pas, end_timestamp)
+        if limiteur is not None:
+            limiteur.attendre()
+        try:
+            morceau = _requete_bougies(asset, debut, fin, resolution, **kwargs)
+        except Exception as e:
+            logger.error("Échec du chargement des bougies de %s entre %d et %d : %s", asset, debut, fin, e)
+            nb_echecs += 1
+            morceau = []
+        # Les bornes étant inclusives, la bougie de jonction peut apparaître deux fois
+        if historique_data and morceau and morceau[0]['timestamp'] <= historique_data[-1]['timestamp']:
+            morceau = [item for item in morceau if item['timestamp'] > historique_data[-1]['timestamp']]
+        historique_data.extend(morceau)
+        debut = fin
+    if nb_echecs:
+        raise HistoriqueIncomplet(asset, historique_data, nb_echecs)
+    return historique_data
+
+
+class CacheHistorique:
+    """
+    Cache disque des bougies historiques, un fichier NumPy par instrument et par résolution.
+    Les fichiers sont relus en mémoire mappée ; seule la fin manquante depuis la dernière bougie
+    en cache est demandée à l'API.
+
+    Le cache est borné : chaque écriture abandonne les bougies plus anciennes que `retention_secondes` (ou que la
+    profondeur demandée, si elle est plus grande), et nettoyer() supprime à l'ouverture les fichiers inutilisés
+    depuis plus longtemps, puis les moins récemment utilisés tant que le répertoire dépasse `taille_max` octets.
+    """
+
+    def __init__(self, repertoire, retention_secondes=DUREE_RETENTION_CACHE, taille_max=TAILLE_MAX_CACHE):
+        self.repertoire = repertoire
+        self.retention_secondes = retention_secondes
+        self.taille_max = taille_max
+        os.makedirs(repertoire, exist_ok=True)
+        self.nettoyer()
+
+    def nettoyer(self, maintenant=None):
+        """
+        Supprime les fichiers temporaires orphelins, les fichiers non modifiés depuis `retention_secondes`,
+        puis les plus anciens jusqu'à repasser sous `taille_max`.
+        :return: Nombre de fichiers supprimés.
+        """
+        maintenant = time.time() if maintenant is None else maintenant
+        fichiers = []
+        supprimes = 0
+        for entree in os.scandir(self.repertoire):
+            if not entree.is_file():
+                continue
+            try:
+                infos = entree.stat()
+            except OSError:
+                continue
+            temporaire = entree.name.endswith(".tmp") and maintenant - infos.st_mtime > 3600
+            if temporaire or (entree.name.endswith(".npy") and maintenant - infos.st_mtime > self.retention_secondes):
+                supprimes += self._supprimer(entree.path)
+            elif entree.name.endswith(".npy"):
+                fichiers.append((infos.st_mtime, infos.st_size, entree.path))
+        taille = sum(taille for _, taille, _ in fichiers)
+        for _, taille_fichier, chemin in sorted(fichiers):
+            if taille <= self.taille_max:
+                break
+            supprimes += self._supprimer(chemin)
+            taille -= taille_fichier
+        if supprimes:
+            logger.info("Cache historique : %d fichier(s) supprimé(s).", supprimes)
+        return supprimes
+
+    @staticmethod
+    def _supprimer(chemin):
+        try:
+            os.remove(chemin)
+            return 1
+        except OSError:
+            return 0
+
+    def chemin(self, asset, resolution="1"):
+        return os.path.join(self.repertoire, f"{asset}_{resolution}.npy")
+
+    def lire(self, asset, resolution="1"):
+        """Retourne les bougies en cache (tableau structuré en mémoire mappée), ou un tableau vide."""
+        chemin = self.chemin(asset, resolution)
+        if not os.path.exists(chemin):
+            return np.empty(0, dtype=DTYPE_BOUGIES)
+        try:
+            bougies = np.load(chemin, mmap_mode="r")
+        except (ValueError, OSError) as e:
+            logger.warning("Cache historique illisible pour %s, il sera reconstruit : %s", asset, e)
+            return np.empty(0, dtype=DTYPE_BOUGIES)
+        if bougies.dtype != DTYPE_BOUGIES:
+            # Ancien format (clôtures seules) : retéléchargé pour disposer des colonnes OHLC
+            logger.info("Cache historique de %s à l'ancien format, il sera reconstruit.", asset)
+            return np.empty(0, dtype=DTYPE_BOUGIES)
+        return bougies
+
+    def ecrire(self, asset, bougies, resolution="1"):
+        """Remplace atomiquement le fichier de cache de l'instrument."""
+        chemin = self.chemin(asset, resolution)
+        temporaire = f"{chemin}.{threading.get_ident()}.tmp"
+        with open(temporaire, "wb") as fichier:
+            np.save(fichier, np.ascontiguousarray(bougies, dtype=DTYPE_BOUGIES))
+        os.replace(temporaire, chemin)
+
+    def charger(self, asset, duree_secondes=3600, resolution="1", limiteur=None, **kwargs):
+        """
+        Retourne l'historique des `duree_secondes` dernières secondes au format de charger_donnees_tick_deribit,
+        en ne téléchargeant que ce qui manque au cache (début plus ancien que le cache et/ou fin récente).
+        Si une requête échoue, l'historique retourné a un trou et le cache n'est pas mis à jour : le cache ne
+        contient jamais que des plages continues, et la plage manquante sera redemandée à l'appel suivant.
+        """
+        end_timestamp = int(time.time() * 1000)
+        start_timestamp = end_timestamp - int(duree_secondes * 1000)
+        en_cache = self.lire(asset, resolution)
+
+        plages = []
+        if len(en_cache) == 0:
+            plages.append((start_timestamp, end_timestamp))
+        else:
+            premier_ms = int(en_cache["timestamp"][0] * 1000)
+            dernier_ms = int(en_cache["timestamp"][-1] * 1000)
+            if start_timestamp < premier_ms:
+                plages.append((start_timestamp, premier_ms))
+            # La dernière bougie en cache peut être incomplète : elle est redemandée et écrasée
+            plages.append((max(dernier_ms, start_timestamp), end_timestamp))
+
+        morceaux = []
+        complet = True
+        for debut, fin in plages:
+            try:
+                morceaux.append(charger_plage_deribit(asset, debut, fin, resolution, limiteur, **kwargs))
+            except HistoriqueIncomplet as e:
+                morceaux.append(e.bougies)
+                complet = False
+
+        nouvelles = [item for morceau in morceaux for item in morceau]
+        if nouvelles:
+            ajout = np.array([(item['timestamp'], item['mark_price'], item.get('open', item['mark_price']),
+                               item.get('high', item['mark_price']), item.get('low', item['mark_price']))
+                              for item in nouvelles], dtype=DTYPE_BOUGIES)
+            bougies = np.concatenate([np.asarray(en_cache), ajout])
+            # Trier et dédoublonner par timestamp en gardant la version la plus récente de chaque bougie
+            ordre = np.argsort(bougies["timestamp"], kind="stable")
+            bougies = bougies[ordre]
+            garder = np.append(bougies["timestamp"][1:] != bougies["timestamp"][:-1], True)
+            bougies = bougies[garder]
+            # Ne conserver que la période de rétention (au moins la profondeur demandée)
+            plus_ancienne = end_timestamp / 1000 - max(self.retention_secondes, duree_secondes)
+            bougies = bougies[np.searchsorted(bougies["timestamp"], plus_ancienne):]
+            if complet:
+                self.ecrire(asset, bougies, resolution)
+            else:
+                logger.warning("Historique de %s incomplet : le cache n'est pas mis à jour.", asset)
+        else:
+            bougies = en_cache
+
+        debut = np.searchsorted(bougies["timestamp"], start_timestamp / 1000)
+        return [
+            {'timestamp': ts, 'mark_price': prix, 'open': open_, 'high': high, 'low': low}
+            for ts, prix, open_, high, low in zip(*(bougies[champ][debut:].tolist() for champ in DTYPE_BOUGIES.names))
+        ]
+
+
+def charger_historiques(assets, max_workers=MAX_REQUETES_PARALLELES, requetes_par_seconde=REQUETES_PAR_SECONDE,
+                        base_url=DERIBIT_API_URL, timeout=TIMEOUT_REQUETE, cache=None, duree_secondes=3600, **kwargs):
+    """
+    Récupère en parallèle l'historique de tous les actifs via une session HTTP partagée.
+    Générateur : chaque couple (asset, historique_data) est produit dès que sa requête se termine,
+    ce qui permet d'afficher un actif sans attendre les autres.
+    Avec un CacheHistorique, seule la partie manquante de l'historique est téléchargée.
+    Si une requête échoue, l'historique de l'actif est produit avec un trou (l'erreur est journalisée).
+    Les arguments supplémentaires sont transmis à charger_donnees_tick_deribit.
+    """
+    assets = list(assets)
+    if not assets:
+        return
+
+    limiteur = LimiteurDebit(requetes_par_seconde)
+
+    def charger(asset):
+        options = dict(session=session, base_url=base_url, timeout=timeout, **kwargs)
+        if cache is not None:
+            return cache.charger(asset, duree_secondes, limiteur=limiteur, **options)
+        end_timestamp = int(time.time() * 1000)
+        try:
+            return charger_plage_deribit(asset, end_timestamp - int(duree_secondes * 1000), end_timestamp,
+                                         limiteur=limiteur, **options)
+        except HistoriqueIncomplet as e:
+            return e.bougies
+
+    with creer_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(charger, asset): asset for asset in assets}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
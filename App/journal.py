@@ -0,0 +1,165 @@
+"""
+Journal binaire des ticks reçus, en ajout seul, relu en mémoire mappée.
+
+Deux formats :
+  - JournalTicks : lignes décodées de taille fixe (réception, timestamp, mark_price, indice du canal),
+    la table des canaux étant ajoutée dans un fichier texte voisin (`<chemin>.canaux`) ;
+  - JournalTrames : trames Deribit brutes, chacune précédée de son instant de réception et de sa longueur.
+
+Les deux se relisent avec lire_journal, qui produit des tuples (recu, channel, timestamp, mark_price) quel que
+soit le format (voir rejeu.py pour le rejeu dans le moteur).
+"""
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from decodage import decoder_message
+
+# Ligne du journal décodé (28 octets, sans alignement)
+DTYPE_TICK = np.dtype([("recu", "<f8"), ("timestamp", "<f8"), ("mark_price", "<f8"), ("canal", "<u4")])
+
+# En-tête d'une trame brute : instant de réception (float64) et longueur en octets (uint32)
+ENTETE_TRAME = struct.Struct("<dI")
+
+# Lignes décodées lues par bloc depuis la mémoire mappée
+TAILLE_BLOC_LECTURE = 65536
+
+FORMATS_JOURNAL = ("ticks", "trames")
+
+
+class JournalTicks:
+    """Journal des ticks décodés : une ligne DTYPE_TICK par notification ticker."""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.canaux = lire_canaux(chemin)
+        self._indices = {canal: i for i, canal in enumerate(self.canaux)}
+        self._fichier = open(chemin, "ab")
+        self._fichier_canaux = open(f"{chemin}.canaux", "a", encoding="utf-8")
+        self._ligne = np.zeros(1, dtype=DTYPE_TICK)
+        self.nb_enregistres = 0
+
+    def enregistrer(self, message, decoded, recu):
+        """Enregistre un message déjà décodé (les réponses JSON-RPC sont ignorées)."""
+        if decoded.channel is None or decoded.mark_price is None:
+            return
+        indice = self._indices.get(decoded.channel)
+        if indice is None:
+            indice = self._indices[decoded.channel] = len(self.canaux)
+            self.canaux.append(decoded.channel)
+            self._fichier_canaux.write(decoded.channel + "\n")
+            self._fichier_canaux.flush()
+        ligne = self._ligne
+        ligne["recu"] = recu
+        ligne["timestamp"] = decoded.timestamp
+        ligne["mark_price"] = decoded.mark_price
+        ligne["canal"] = indice
+        self._fichier.write(ligne.tobytes())
+        self.nb_enregistres += 1
+
+    def vider(self):
+        self._fichier.flush()
+
+    def fermer(self):
+        self._fichier.close()
+        self._fichier_canaux.close()
+
+
+class JournalTrames:
+    """Journal des trames brutes, pour reproduire exactement un incident (décodage compris)."""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._fichier = open(chemin, "ab")
+        self.nb_enregistres = 0
+
+    def enregistrer(self, message, decoded, recu):
+        donnees = message.encode("utf-8") if isinstance(message, str) else bytes(message)
+        self._fichier.write(ENTETE_TRAME.pack(recu, len(donnees)))
+        self._fichier.write(donnees)
+        self.nb_enregistres += 1
+
+    def vider(self):
+        self._fichier.flush()
+
+    def fermer(self):
+        self._fichier.close()
+
+
+def ouvrir_journal(chemin, format_journal="ticks"):
+    """Ouvre un journal en écriture (ajout) au format "ticks" (lignes décodées) ou "trames" (trames brutes)."""
+    if format_journal == "ticks":
+        return JournalTicks(chemin)
+    if format_journal == "trames":
+        return JournalTrames(chemin)
+    raise ValueError(f"Format de journal inconnu : {format_journal}")
+
+
+def lire_canaux(chemin):
+    """Table des canaux d'un journal de ticks (liste vide si elle n'existe pas encore)."""
+    chemin_canaux = f"{chemin}.canaux"
+    if not os.path.exists(chemin_canaux):
+        return []
+    with open(chemin_canaux, encoding="utf-8") as fichier:
+        return [ligne.rstrip("\n") for ligne in fichier if ligne.strip()]
+
+
+def lire_ticks(chemin):
+    """
+    Relit un journal de ticks en mémoire mappée, sans copie.
+    :return: Tuple (canaux, tableau structuré DTYPE_TICK) ; une ligne incomplète en fin de fichier est ignorée.
+    """
+    nb_lignes = os.path.getsize(chemin) // DTYPE_TICK.itemsize if os.path.exists(chemin) else 0
+    if nb_lignes == 0:
+        return lire_canaux(chemin), np.empty(0, dtype=DTYPE_TICK)
+    return lire_canaux(chemin), np.memmap(chemin, dtype=DTYPE_TICK, mode="r", shape=(nb_lignes,))
+
+
+def lire_trames(chemin):
+    """Générateur des trames brutes (recu, message) d'un journal de trames, lu en mémoire mappée."""
+    if not os.path.exists(chemin) or os.path.getsize(chemin) == 0:
+        return
+    with open(chemin, "rb") as fichier, mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ) as donnees:
+        position, taille = 0, len(donnees)
+        while position + ENTETE_TRAME.size <= taille:
+            recu, longueur = ENTETE_TRAME.unpack_from(donnees, position)
+            position += ENTETE_TRAME.size
+            if position + longueur > taille:
+                break  # Trame incomplète (écriture interrompue)
+            yield recu, donnees[position:position + longueur].decode("utf-8")
+            position += longueur
+
+
+def detecter_format(chemin):
+    """Un journal de ticks est toujours accompagné de sa table des canaux."""
+    return "ticks" if os.path.exists(f"{chemin}.canaux") else "trames"
+
+
+def lire_journal(chemin, format_journal=None, canaux=None):
+    """
+    Générateur des ticks d'un journal, quel que soit son format : tuples (recu, channel, timestamp, mark_price).
+    Les trames brutes sont décodées avec decoder_message, comme en direct.
+    :param canaux: Canaux à conserver (ex. ceux d'une partition d'instruments, voir partition.py), ou None pour tous.
+        Pour un journal de ticks, le filtre est appliqué par bloc sur la colonne des indices de canaux.
+    """
+    format_journal = format_journal or detecter_format(chemin)
+    if format_journal == "trames":
+        for recu, message in lire_trames(chemin):
+            decoded = decoder_message(message)
+            if decoded.channel is not None and (canaux is None or decoded.channel in canaux):
+                yield recu, decoded.channel, decoded.timestamp, decoded.mark_price
+        return
+
+    table_canaux, ticks = lire_ticks(chemin)
+    selection = None
+    if canaux is not None:
+        selection = np.array([i for i, canal in enumerate(table_canaux) if canal in canaux], dtype=DTYPE_TICK["canal"])
+    for debut in range(0, len(ticks), TAILLE_BLOC_LECTURE):
+        bloc = ticks[debut:debut + TAILLE_BLOC_LECTURE]
+        if selection is not None:
+            bloc = bloc[np.isin(bloc["canal"], selection)]
+        for recu, timestamp, mark_price, canal in zip(bloc["recu"].tolist(), bloc["timestamp"].tolist(),
+                                                       bloc["mark_price"].tolist(), bloc["canal"].tolist()):
+            yield recu, table_canaux[canal], timestamp, mark_price
@@ -0,0 +1,229 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from decodage import logger
+
+# Bornes (secondes) des histogrammes de durée : de la microseconde (décodage) à la dizaine de secondes (e-mail)
+BORNES_DUREE = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Préfixe des noms de métriques exportées
+PREFIXE_PROMETHEUS = "volatilite"
+
+
+class Histogramme:
+    """
+    Histogramme à seaux fixes : une observation coûte une recherche dichotomique et un incrément,
+    sans allocation. Les bornes sont en secondes ; le dernier seau compte les valeurs au-delà de la dernière borne.
+    """
+
+    __slots__ = ("bornes", "comptes", "somme", "nombre")
+
+    def __init__(self, bornes=BORNES_DUREE):
+        self.bornes = tuple(bornes)
+        self.comptes = [0] * (len(self.bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur):
+        self.comptes[bisect.bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+    def quantile(self, q):
+        """Quantile approché : borne supérieure du seau qui contient le q-ième quantile (None si vide)."""
+        if self.nombre == 0:
+            return None
+        rang = q * self.nombre
+        cumul = 0
+        for indice, compte in enumerate(self.comptes):
+            cumul += compte
+            if cumul >= rang and compte:
+                return self.bornes[indice] if indice < len(self.bornes) else float("inf")
+        return float("inf")
+
+    @property
+    def moyenne(self):
+        return self.somme / self.nombre if self.nombre else None
+
+    def copie(self):
+        """Copie figée ; son nombre d'observations est recalculé depuis les seaux, pour rester cohérent avec eux."""
+        copie = Histogramme(self.bornes)
+        copie.comptes = list(self.comptes)
+        copie.somme = self.somme
+        copie.nombre = sum(copie.comptes)
+        return copie
+
+
+class Metriques:
+    """
+    Instrumentation du moteur : histogrammes de durée par étape, compteurs et jauges.
+
+    Les étapes sont chronométrées par l'appelant avec time.perf_counter_ns() puis enregistrées avec observer ;
+    les jauges sont des fonctions évaluées seulement à la lecture (ex. profondeur de file), de même que les compteurs
+    externes, tenus par un autre composant mais qui ne font que croître (ex. reconnexions). Les incréments ne sont
+    pas verrouillés : sous forte contention, un comptage peut exceptionnellement être perdu, ce qui est acceptable
+    pour du diagnostic et évite tout coût de synchronisation sur le chemin critique. Seules la création d'une
+    nouvelle étape ou d'un nouveau compteur et la lecture (instantane) prennent le verrou : la lecture depuis le
+    thread du serveur HTTP ne parcourt jamais un dictionnaire en cours d'agrandissement.
+    """
+
+    def __init__(self):
+        self.histogrammes = {}
+        self.compteurs = {}
+        self.jauges = {}
+        self.compteurs_externes = {}
+        self._verrou = threading.Lock()
+        self._serveur = None
+
+    def observer(self, etape, duree_ns):
+        """Enregistre la durée (nanosecondes) d'une étape."""
+        histogramme = self.histogrammes.get(etape)
+        if histogramme is None:
+            with self._verrou:
+                histogramme = self.histogrammes.setdefault(etape, Histogramme())
+        histogramme.observer(duree_ns * 1e-9)
+
+    def incrementer(self, compteur, n=1):
+        if compteur not in self.compteurs:
+            with self._verrou:
+                self.compteurs.setdefault(compteur, 0)
+        self.compteurs[compteur] += n
+
+    def instantane(self):
+        """Copies cohérentes des histogrammes et des compteurs internes, prises sous le verrou des créations."""
+        with self._verrou:
+            return ({etape: histogramme.copie() for etape, histogramme in self.histogrammes.items()},
+                    dict(self.compteurs))
+
+    def jauge(self, nom, fonction):
+        """Enregistre une jauge, évaluée à chaque lecture."""
+        with self._verrou:
+            self.jauges[nom] = fonction
+
+    def compteur_externe(self, nom, fonction):
+        """Enregistre un compteur tenu ailleurs (valeur croissante), évalué à chaque lecture et exporté en counter."""
+        with self._verrou:
+            self.compteurs_externes[nom] = fonction
+
+    def _evaluer(self, fonctions):
+        with self._verrou:
+            fonctions = list(fonctions.items())
+        valeurs = {}
+        for nom, fonction in fonctions:
+            try:
+                valeurs[nom] = fonction()
+            except Exception:
+                valeurs[nom] = None
+        return valeurs
+
+    def valeurs_jauges(self):
+        return self._evaluer(self.jauges)
+
+    def valeurs_compteurs(self, compteurs=None):
+        """Compteurs internes (par défaut un instantané) et externes (les externes illisibles sont omis)."""
+        valeurs = dict(self.instantane()[1] if compteurs is None else compteurs)
+        valeurs.update((nom, valeur) for nom, valeur in self._evaluer(self.compteurs_externes).items()
+                       if valeur is not None)
+        return valeurs
+
+    def resume(self):
+        """Résumé pour l'affichage : lignes par étape (nombre, moyenne, p50, p99 en ms), compteurs et jauges."""
+        histogrammes, compteurs = self.instantane()
+        etapes = []
+        for etape, histogramme in sorted(histogrammes.items()):
+            p50, p99 = histogramme.quantile(0.5), histogramme.quantile(0.99)
+            etapes.append({
+                "Étape": etape,
+                "Mesures": histogramme.nombre,
+                "Moyenne (ms)": histogramme.moyenne * 1000,
+                "p50 ≤ (ms)": p50 * 1000,
+                "p99 ≤ (ms)": p99 * 1000,
+            })
+        return {"etapes": etapes, "compteurs": self.valeurs_compteurs(compteurs), "jauges": self.valeurs_jauges()}
+
+    def format_prometheus(self):
+        """Exporte toutes les métriques au format texte Prometheus (version 0.0.4)."""
+        histogrammes, compteurs = self.instantane()
+        lignes = []
+        nom = f"{PREFIXE_PROMETHEUS}_etape_duree_secondes"
+        lignes.append(f"# HELP {nom} Durée de chaque étape du traitement.")
+        lignes.append(f"# TYPE {nom} histogram")
+        for etape, histogramme in sorted(histogrammes.items()):
+            cumul = 0
+            for borne, compte in zip(histogramme.bornes, histogramme.comptes):
+                cumul += compte
+                lignes.append(f'{nom}_bucket{{etape="{etape}",le="{borne:g}"}} {cumul}')
+            lignes.append(f'{nom}_bucket{{etape="{etape}",le="+Inf"}} {histogramme.nombre}')
+            lignes.append(f'{nom}_sum{{etape="{etape}"}} {histogramme.somme!r}')
+            lignes.append(f'{nom}_count{{etape="{etape}"}} {histogramme.nombre}')
+        for compteur, valeur in sorted(self.valeurs_compteurs(compteurs).items()):
+            lignes.append(f"# TYPE {PREFIXE_PROMETHEUS}_{compteur}_total counter")
+            lignes.append(f"{PREFIXE_PROMETHEUS}_{compteur}_total {valeur}")
+        for jauge, valeur in sorted(self.valeurs_jauges().items()):
+            if valeur is None:
+                continue
+            lignes.append(f"# TYPE {PREFIXE_PROMETHEUS}_{jauge} gauge")
+            lignes.append(f"{PREFIXE_PROMETHEUS}_{jauge} {float(valeur)!r}")
+        return "\n".join(lignes) + "\n"
+
+    def demarrer_serveur(self, port, hote="127.0.0.1"):
+        """
+        Expose les métriques en HTTP (GET /metrics) dans un thread de fond.
+        :return: True si le serveur écoute, False si le port est indisponible.
+        """
+        if self._serveur is not None:
+            return True
+        metriques = self
+
+        class GestionnaireMetriques(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                corps = metriques.format_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._serveur = ThreadingHTTPServer((hote, port), GestionnaireMetriques)
+        except OSError as e:
+            logger.warning("Impossible d'exposer les métriques sur %s:%s : %s", hote, port, e)
+            return False
+        threading.Thread(target=self._serveur.serve_forever, name="metriques", daemon=True).start()
+        logger.info("Métriques Prometheus exposées sur http://%s:%s/metrics", hote, port)
+        return True
+
+    def arreter_serveur(self):
+        if self._serveur is not None:
+            self._serveur.shutdown()
+            self._serveur.server_close()
+            self._serveur = None
+
+
+class Chronometre:
+    """Gestionnaire de contexte chronométrant un bloc dans une étape (pour les chemins peu fréquents)."""
+
+    __slots__ = ("metriques", "etape", "_debut")
+
+    def __init__(self, metriques, etape):
+        self.metriques = metriques
+        self.etape = etape
+
+    def __enter__(self):
+        self._debut = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.metriques.observer(self.etape, time.perf_counter_ns() - self._debut)
+        return False
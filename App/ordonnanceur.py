@@ -0,0 +1,44 @@
+import heapq
+import time
+
+
+class OrdonnanceurPredictions:
+    """
+    Planifie les calculs de volatilité avec une échéance propre à chaque actif (tas binaire).
+    Chaque actif est recalculé à intervalle régulier, indépendamment de l'ordre d'arrivée
+    des tickers des autres actifs.
+    """
+
+    def __init__(self, intervalle, assets=(), debut=None):
+        self.intervalle = float(intervalle)
+        self._tas = []
+        self._echeances = {}
+        debut = time.time() if debut is None else debut
+        for asset in assets:
+            self.ajouter(asset, debut)
+
+    def __len__(self):
+        return len(self._echeances)
+
+    def ajouter(self, asset, echeance=None):
+        """Ajoute (ou replanifie) un actif ; par défaut il est dû immédiatement."""
+        echeance = time.time() if echeance is None else echeance
+        self._echeances[asset] = echeance
+        heapq.heappush(self._tas, (echeance, asset))
+
+    def actifs_dus(self, maintenant=None):
+        """
+        Retourne, en un seul lot, tous les actifs dont l'échéance est atteinte et les replanifie.
+        La nouvelle échéance reste alignée sur la grille de l'actif : les créneaux manqués sont sautés
+        au lieu d'être rattrapés en rafale.
+        """
+        maintenant = time.time() if maintenant is None else maintenant
+        dus = []
+        while self._tas and self._tas[0][0] <= maintenant:
+            echeance, asset = heapq.heappop(self._tas)
+            if self._echeances.get(asset) != echeance:
+                continue  # Entrée obsolète (actif replanifié)
+            dus.append(asset)
+            retard = int((maintenant - echeance) // self.intervalle)
+            self.ajouter(asset, echeance + (retard + 1) * self.intervalle)
+        return dus
@@ -0,0 +1,534 @@
+"""
+Mode réparti : les instruments sont partagés entre plusieurs processus workers.
+
+Chaque worker possède ses connexions WebSocket, ses fenêtres de prix et ses états EWMA (un MoteurVolatilite
+complet pour sa partition), et publie ses estimations dans une table en mémoire partagée indexée par
+identifiant d'instrument. L'interface et les rapports lisent cette table directement, sans copie ni
+échange de messages avec les workers.
+
+    python App/engine.py --universe --workers 4
+    python App/rejeu.py univers.journal --generate 400000 --synthetic-assets 200 --bench --workers 1 2 4
+"""
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from decodage import logger
+from engine import MoteurVolatilite, calculer_lambdas, CACHE_HISTORIQUE_DIR
+from historique import CacheHistorique, REQUETES_PAR_SECONDE
+
+# Nombre d'estimations conservées par instrument dans la table partagée
+CAPACITE_HISTORIQUE_PARTAGE = 2000
+
+# Délai accordé aux workers pour s'arrêter avant d'être interrompus (secondes)
+DELAI_ARRET_WORKERS = 10.0
+
+# Description d'une table partagée, transmise aux workers pour s'y attacher
+DescriptionTable = namedtuple("DescriptionTable", ["nom", "nb_instruments", "capacite", "nb_lambdas"])
+
+
+def dtype_ligne(nb_lambdas):
+    """
+    Ligne de la table partagée (une par instrument) : compteur de séquence, position de l'historique circulaire,
+    dernière estimation, volatilités de tous les facteurs de la banque, dernier prix et nombre de ticks.
+    """
+    return np.dtype([
+        ("sequence", "<u8"),
+        ("nb_ajouts", "<u8"),
+        ("nb_ticks", "<u8"),
+        ("debut", "<i8"),
+        ("taille", "<i8"),
+        ("timestamp", "<f8"),
+        ("volatilite", "<f8"),
+        ("dernier_prix", "<f8"),
+        ("volatilites", "<f8", (nb_lambdas,)),
+    ])
+
+
+def partitionner(nb_instruments, nb_workers):
+    """Répartit les identifiants d'instruments entre les workers (tourniquet : les plus actifs, en tête d'univers, sont dispersés)."""
+    return [list(range(k, nb_instruments, nb_workers)) for k in range(nb_workers)]
+
+
+class TableVolatilites:
+    """
+    Table des volatilités en mémoire partagée, indexée par identifiant d'instrument.
+
+    Un seul segment contient les lignes (dtype_ligne) puis, pour chaque instrument, un historique circulaire
+    des estimations stocké en double exemplaire comme RingBufferPrix : les n dernières estimations sont toujours
+    une vue contiguë. Chaque instrument n'a qu'un écrivain (le worker de sa partition), qui encadre ses écritures
+    par deux incréments du compteur `sequence` (impair pendant l'écriture) ; les lecteurs réessaient si le compteur
+    a changé pendant leur lecture, sans verrou entre processus.
+    """
+
+    def __init__(self, description, memoire, proprietaire=False):
+        self.description = description
+        self.capacite = description.capacite
+        self._memoire = memoire
+        self._proprietaire = proprietaire
+        n, capacite = description.nb_instruments, description.capacite
+        dtype = dtype_ligne(description.nb_lambdas)
+        self.lignes = np.ndarray((n,), dtype=dtype, buffer=memoire.buf)
+        decalage = dtype.itemsize * n
+        self._timestamps = np.ndarray((n, 2 * capacite), dtype=np.float64, buffer=memoire.buf, offset=decalage)
+        decalage += self._timestamps.nbytes
+        self._volatilites = np.ndarray((n, 2 * capacite), dtype=np.float64, buffer=memoire.buf, offset=decalage)
+
+        # Colonnes de la table (vues sans copie)
+        self._sequence = self.lignes["sequence"]
+        self._nb_ajouts = self.lignes["nb_ajouts"]
+        self._debut = self.lignes["debut"]
+        self._taille = self.lignes["taille"]
+        self._nb_ticks = self.lignes["nb_ticks"]
+        self._timestamp = self.lignes["timestamp"]
+        self._volatilite = self.lignes["volatilite"]
+        self._dernier_prix = self.lignes["dernier_prix"]
+        self._volatilites_banque = self.lignes["volatilites"]
+
+    @staticmethod
+    def taille_octets(nb_instruments, capacite, nb_lambdas=1):
+        return nb_instruments * (dtype_ligne(nb_lambdas).itemsize + 2 * 2 * capacite * 8)
+
+    @classmethod
+    def creer(cls, nb_instruments, capacite=CAPACITE_HISTORIQUE_PARTAGE, nb_lambdas=1):
+        """Crée le segment partagé (le processus créateur le détruit à la fermeture)."""
+        memoire = shared_memory.SharedMemory(create=True, size=max(cls.taille_octets(nb_instruments, capacite, nb_lambdas), 1))
+        table = cls(DescriptionTable(memoire.name, nb_instruments, capacite, nb_lambdas), memoire, proprietaire=True)
+        table.lignes[:] = 0
+        for champ in ("timestamp", "volatilite", "dernier_prix", "volatilites"):
+            table.lignes[champ] = np.nan
+        return table
+
+    @classmethod
+    def attacher(cls, description):
+        """S'attache à une table existante (worker ou lecteur)."""
+        return cls(description, shared_memory.SharedMemory(name=description.nom))
+
+    def __len__(self):
+        return self.description.nb_instruments
+
+    def fermer(self):
+        """Détache la table ; le segment est détruit si ce processus l'a créé."""
+        if self._memoire is None:
+            return
+        self.lignes = self._timestamps = self._volatilites = None
+        self._sequence = self._nb_ajouts = self._debut = self._taille = self._nb_ticks = None
+        self._timestamp = self._volatilite = self._dernier_prix = self._volatilites_banque = None
+        memoire, self._memoire = self._memoire, None
+        memoire.close()
+        if self._proprietaire:
+            memoire.unlink()
+
+    # --- Écriture (worker propriétaire de l'instrument) ---------------------------------------------
+
+    def publier(self, indice, timestamps, volatilites, volatilites_banque=None, dernier_prix=math.nan, nb_ticks=0):
+        """Ajoute des estimations à l'historique d'un instrument et met à jour sa ligne."""
+        n = len(volatilites)
+        capacite = self.capacite
+        self._sequence[indice] += 1  # Impair : écriture en cours
+        try:
+            if n == 1:
+                # Cas courant (une estimation par lot) : écritures scalaires, sans tableau d'indices
+                timestamp, volatilite = float(timestamps[0]), float(volatilites[0])
+                debut, taille = int(self._debut[indice]), int(self._taille[indice])
+                position = (debut + taille) % capacite
+                self._timestamps[indice, position] = self._timestamps[indice, position + capacite] = timestamp
+                self._volatilites[indice, position] = self._volatilites[indice, position + capacite] = volatilite
+                if taille < capacite:
+                    self._taille[indice] = taille + 1
+                else:
+                    self._debut[indice] = (debut + 1) % capacite
+                self._nb_ajouts[indice] += 1
+                self._timestamp[indice] = timestamp
+                self._volatilite[indice] = volatilite
+            elif n:
+                timestamps = np.asarray(timestamps, dtype=np.float64)
+                volatilites = np.asarray(volatilites, dtype=np.float64)
+                self._nb_ajouts[indice] += n
+                self._timestamp[indice] = timestamps[-1]
+                self._volatilite[indice] = volatilites[-1]
+                if n > capacite:
+                    timestamps, volatilites, n = timestamps[-capacite:], volatilites[-capacite:], capacite
+                debut, taille = int(self._debut[indice]), int(self._taille[indice])
+                positions = (debut + taille + np.arange(n)) % capacite
+                for colonne, valeurs in ((self._timestamps, timestamps), (self._volatilites, volatilites)):
+                    colonne[indice, positions] = valeurs
+                    colonne[indice, positions + capacite] = valeurs
+                total = taille + n
+                if total > capacite:
+                    self._debut[indice] = (debut + total - capacite) % capacite
+                    self._taille[indice] = capacite
+                else:
+                    self._taille[indice] = total
+            if volatilites_banque is not None:
+                self._volatilites_banque[indice] = volatilites_banque
+            elif n:
+                self._volatilites_banque[indice, 0] = self._volatilite[indice]
+            self._dernier_prix[indice] = dernier_prix
+            self._nb_ticks[indice] = nb_ticks
+        finally:
+            self._sequence[indice] += 1
+
+    def publier_lot(self, indices, timestamps, volatilites, volatilites_banque=None, derniers_prix=None, nb_ticks=None):
+        """
+        Ajoute une estimation à chacun des instruments `indices` (distincts) en quelques opérations vectorisées :
+        c'est le cas courant, où un lot de calcul produit une estimation par actif arrivé à échéance.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        volatilites = np.asarray(volatilites, dtype=np.float64)
+        capacite = self.capacite
+        self._sequence[indices] += 1  # Impair : écriture en cours
+        try:
+            debut, taille = self._debut[indices], self._taille[indices]
+            positions = (debut + taille) % capacite
+            for colonne, valeurs in ((self._timestamps, timestamps), (self._volatilites, volatilites)):
+                colonne[indices, positions] = valeurs
+                colonne[indices, positions + capacite] = valeurs
+            self._debut[indices] = np.where(taille < capacite, debut, (debut + 1) % capacite)
+            self._taille[indices] = np.minimum(taille + 1, capacite)
+            self._nb_ajouts[indices] += 1
+            self._timestamp[indices] = timestamps
+            self._volatilite[indices] = volatilites
+            if volatilites_banque is not None:
+                self._volatilites_banque[indices] = volatilites_banque
+            else:
+                self._volatilites_banque[indices, 0] = volatilites
+            if derniers_prix is not None:
+                self._dernier_prix[indices] = derniers_prix
+            if nb_ticks is not None:
+                self._nb_ticks[indices] = nb_ticks
+        finally:
+            self._sequence[indices] += 1
+
+    # --- Lecture (interface, rapports) -------------------------------------------------------------
+
+    def _lecture_coherente(self, indice, lecture):
+        """Exécute `lecture()` jusqu'à obtenir un résultat non entrecoupé d'une écriture sur l'instrument."""
+        while True:
+            avant = int(self._sequence[indice])
+            if avant % 2 == 0:
+                resultat = lecture()
+                if int(self._sequence[indice]) == avant:
+                    return resultat
+            time.sleep(0)
+
+    def lire(self, indice):
+        """Copie cohérente de la ligne d'un instrument."""
+        return self._lecture_coherente(indice, lambda: self.lignes[indice].copy())
+
+    def vue(self):
+        """
+        Vue en lecture seule (sans copie) sur toutes les lignes, pour l'affichage de l'univers entier.
+        Une ligne en cours d'écriture peut y apparaître à moitié mise à jour ; utiliser lire() pour une ligne exacte.
+        """
+        vue = self.lignes.view()
+        vue.flags.writeable = False
+        return vue
+
+    def historique(self, indice):
+        return HistoriquePartage(self, indice)
+
+
+class HistoriquePartage:
+    """
+    Historique des estimations d'un instrument lu dans la table partagée, avec l'interface de lecture
+    de HistoriqueVolatilite (len, nb_ajouts, timestamps(n), volatilites(n), dernier) : utilisable tel quel
+    par les rapports. Les vues restent valides tant que le worker n'a pas écrit `capacite` nouvelles estimations.
+    """
+
+    lambdas = None
+
+    def __init__(self, table, indice):
+        self.table = table
+        self.indice = indice
+
+    def __len__(self):
+        return int(self.table._taille[self.indice])
+
+    @property
+    def nb_ajouts(self):
+        return int(self.table._nb_ajouts[self.indice])
+
+    def _bornes(self, n):
+        table, indice = self.table, self.indice
+        debut, taille = table._lecture_coherente(indice, lambda: (int(table._debut[indice]), int(table._taille[indice])))
+        n = taille if n is None else min(int(n), taille)
+        return debut + taille - n, debut + taille
+
+    def timestamps(self, n=None):
+        """Vue en lecture seule (sans copie) sur les n dernières dates d'estimation, de la plus ancienne à la plus récente."""
+        debut, fin = self._bornes(n)
+        vue = self.table._timestamps[self.indice, debut:fin]
+        vue.flags.writeable = False
+        return vue
+
+    def volatilites(self, n=None):
+        """Vue en lecture seule (sans copie) sur les n dernières volatilités."""
+        debut, fin = self._bornes(n)
+        vue = self.table._volatilites[self.indice, debut:fin]
+        vue.flags.writeable = False
+        return vue
+
+    def dernier(self):
+        """Dernière estimation (timestamp, volatilité), ou None si l'historique est vide."""
+        ligne = self.table.lire(self.indice)
+        if ligne["nb_ajouts"] == 0:
+            return None
+        return float(ligne["timestamp"]), float(ligne["volatilite"])
+
+
+class PublieurTable:
+    """Abonné du moteur d'un worker : recopie dans la table partagée les nouvelles estimations de ses instruments."""
+
+    def __init__(self, table, indices):
+        self.table = table
+        self.indices = indices  # asset -> identifiant dans la table
+        self._publies = {}  # asset -> nb_ajouts déjà publiés
+
+    def __call__(self, moteur, assets):
+        # Une estimation par actif (cas courant) : regroupées en une seule écriture vectorisée dans la table
+        indices, timestamps, volatilites, banques, derniers_prix, nb_ticks = [], [], [], [], [], []
+        banque = len(moteur.lambdas) > 1
+        for asset in assets:
+            indice = self.indices.get(asset)
+            if indice is None:
+                continue
+            historique = moteur.historique_volatilite(asset)
+            nouveaux = historique.nb_ajouts - self._publies.get(asset, 0)
+            if nouveaux <= 0:
+                continue
+            self._publies[asset] = historique.nb_ajouts
+            # Lecture directe des états (sans les contrôles de configuration des accesseurs du moteur)
+            etat = moteur.etats_ewma.get(asset) if banque else None
+            fenetre = moteur.prix.get(asset)
+            dernier = fenetre.dernier() if fenetre is not None else None
+            dernier_prix = dernier[1] if dernier is not None else math.nan
+            ticks = fenetre.nb_ajouts if fenetre is not None else 0
+            if nouveaux > 1 or (banque and etat is None):
+                # Préchauffage ou rattrapage d'une coupure : plusieurs estimations d'un coup
+                self.table.publier(indice, historique.timestamps(nouveaux), historique.volatilites(nouveaux),
+                                   etat.volatilites if etat is not None else None, dernier_prix, ticks)
+                continue
+            timestamp, volatilite = historique.dernier()
+            indices.append(indice)
+            timestamps.append(timestamp)
+            volatilites.append(volatilite)
+            derniers_prix.append(dernier_prix)
+            nb_ticks.append(ticks)
+            if banque:
+                banques.append(etat.variances)
+        if indices:
+            self.table.publier_lot(indices, timestamps, volatilites, np.sqrt(banques) if banque else None,
+                                   derniers_prix, nb_ticks)
+
+
+def _preparer_worker(description, instruments, indices, options_moteur, niveau_log):
+    logging.basicConfig(level=niveau_log, format="%(asctime)s %(levelname)s %(processName)s : %(message)s")
+    table = TableVolatilites.attacher(description)
+    # L'historique du moteur n'a pas besoin d'être plus long que celui de la table
+    moteur = MoteurVolatilite(instruments, **{**options_moteur, "retention": description.capacite})
+    publieur = PublieurTable(table, dict(zip(instruments, indices)))
+    moteur.abonner(publieur)
+    return table, moteur, publieur
+
+
+def _surveiller_arret(arret, moteur):
+    """Relaie la demande d'arrêt du coordinateur au moteur (répétée tant que les connexions ne sont pas ouvertes)."""
+    arret.wait()
+    while True:
+        moteur.arreter()
+        time.sleep(1.0)
+
+
+def executer_worker(description, instruments, indices, options_moteur, arret, duree_prechauffage=0,
+                    requetes_par_seconde=REQUETES_PAR_SECONDE, niveau_log=logging.INFO):
+    """Processus worker en direct : préchauffage de sa partition, puis flux WebSocket jusqu'à l'arrêt."""
+    table, moteur, publieur = _preparer_worker(description, instruments, indices, options_moteur, niveau_log)
+    threading.Thread(target=_surveiller_arret, args=(arret, moteur), name="arret", daemon=True).start()
+    try:
+        if duree_prechauffage:
+            cache = CacheHistorique(CACHE_HISTORIQUE_DIR)
+            for asset, nb_points in moteur.prechauffer(cache, duree_prechauffage, requetes_par_seconde=requetes_par_seconde):
+                logger.debug("Volatilité initiale calculée pour %s. Points calculés : %d.", asset, nb_points)
+                if arret.is_set():
+                    return
+            with moteur.verrou:
+                publieur(moteur, moteur.assets)
+        if not arret.is_set():
+            moteur.executer()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        moteur.arreter()
+        table.fermer()
+
+
+def rejouer_partition(description, instruments, indices, options_moteur, chemin, depart, resultats,
+                      niveau_log=logging.WARNING):
+    """Processus worker du banc d'essai : rejoue les ticks de sa partition d'un journal, puis renvoie (ticks, durée)."""
+    from rejeu import rejouer
+
+    table, moteur, _ = _preparer_worker(description, instruments, indices, options_moteur, niveau_log)
+    canaux = {f"ticker.{asset}.raw" for asset in instruments}
+    try:
+        depart.wait()
+        debut = time.perf_counter()
+        nb = rejouer(moteur, chemin, canaux=canaux)
+        resultats.put((nb, time.perf_counter() - debut))
+    finally:
+        table.fermer()
+
+
+class MoteurReparti:
+    """
+    Coordinateur du mode réparti : crée la table partagée, partitionne les instruments et lance un processus
+    worker par partition. Les lectures (historique, derniere_volatilite, progression) se font dans la table,
+    sans communication avec les workers.
+    Les options du moteur (data_window, intervalle, lambdas, identifiants API...) sont transmises à chaque worker.
+    """
+
+    def __init__(self, instruments, nb_workers=None, capacite=CAPACITE_HISTORIQUE_PARTAGE, duree_prechauffage=3600,
+                 **options_moteur):
+        self.instruments = list(dict.fromkeys(instruments))
+        if not self.instruments:
+            raise ValueError("Aucun instrument à répartir.")
+        self.indices = {asset: i for i, asset in enumerate(self.instruments)}
+        self.nb_workers = max(1, min(nb_workers or os.cpu_count() or 1, len(self.instruments)))
+        self.duree_prechauffage = duree_prechauffage
+        self.options_moteur = options_moteur
+        self.lambdas = calculer_lambdas(options_moteur.get("lambda_factor", 0.94), options_moteur.get("lambdas", ()),
+                                        options_moteur.get("demi_vies", ()), options_moteur.get("intervalle", 10.0))
+        self.partitions = partitionner(len(self.instruments), self.nb_workers)
+        self.table = TableVolatilites.creer(len(self.instruments), capacite, len(self.lambdas))
+
+        # Processus lancés par "spawn" : aucun thread ni verrou du processus parent n'est hérité
+        self._contexte = multiprocessing.get_context("spawn")
+        self._arret = self._contexte.Event()
+        self._processus = []
+        atexit.register(self.arreter)
+
+    def demarrer(self):
+        """Lance un worker par partition (sans effet si les workers sont déjà lancés)."""
+        if self._processus:
+            return
+        # Le débit des requêtes de préchauffage est partagé entre les workers (limites de l'API publique)
+        requetes_par_seconde = REQUETES_PAR_SECONDE / self.nb_workers
+        for numero, partition in enumerate(self.partitions):
+            processus = self._contexte.Process(
+                target=executer_worker,
+                args=(self.table.description, [self.instruments[i] for i in partition], partition, self.options_moteur,
+                      self._arret, self.duree_prechauffage, requetes_par_seconde, logger.getEffectiveLevel()),
+                name=f"worker-{numero}",
+            )
+            processus.start()
+            self._processus.append(processus)
+        logger.info("%d instruments répartis entre %d workers.", len(self.instruments), self.nb_workers)
+
+    def arreter(self, timeout=DELAI_ARRET_WORKERS):
+        """Arrête les workers (interrompus s'ils ne s'arrêtent pas à temps) et détruit la table partagée."""
+        self._arret.set()
+        limite = time.monotonic() + timeout
+        for processus in self._processus:
+            processus.join(max(limite - time.monotonic(), 0.0))
+            if processus.is_alive():
+                logger.warning("Le worker %s ne s'est pas arrêté à temps : interruption.", processus.name)
+                processus.terminate()
+                processus.join()
+        self._processus = []
+        self.table.fermer()
+
+    def historique(self, asset):
+        """Historique partagé d'un instrument (HistoriquePartage), lisible par les rapports sans copie."""
+        return self.table.historique(self.indices[asset])
+
+    def derniere_volatilite(self, asset):
+        """Dernière volatilité publiée pour un instrument, ou None."""
+        ligne = self.table.lire(self.indices[asset])
+        return float(ligne["volatilite"]) if ligne["nb_ajouts"] else None
+
+    def progression(self):
+        """Lignes du tableau de progression de tout l'univers, lues dans la table partagée."""
+        lignes = self.table.vue()
+        progression_data = []
+        for asset, nb_ticks, nb_ajouts, volatilite in zip(self.instruments, lignes["nb_ticks"].tolist(),
+                                                          lignes["nb_ajouts"].tolist(), lignes["volatilite"].tolist()):
+            progression_data.append({
+                "Actif": asset,
+                "Ticks reçus": nb_ticks,
+                "Données de volatilité (points)": nb_ajouts,
+                "Dernière volatilité calculée": f"{volatilite:.6f}" if nb_ajouts else "N/A",
+            })
+        return progression_data
+
+    def statistiques(self):
+        return {
+            "instruments": len(self.instruments),
+            "workers": self.nb_workers,
+            "workers_actifs": sum(processus.is_alive() for processus in self._processus),
+            "estimations": int(self.table.vue()["nb_ajouts"].sum()),
+        }
+
+
+def banc_essai_reparti(chemin, liste_workers=(1, 2, 4), assets=None, capacite=CAPACITE_HISTORIQUE_PARTAGE,
+                       **options_moteur):
+    """
+    Mesure le passage à l'échelle : pour chaque nombre de workers, les instruments du journal sont partitionnés
+    et chaque worker rejoue sa partition dans son propre processus (publication dans la table partagée comprise).
+    :return: Liste de dicts : workers, messages, durée (du départ commun au dernier worker), messages/seconde
+        et accélération par rapport au premier nombre de workers mesuré.
+    """
+    from rejeu import actifs_du_journal
+
+    assets = assets or actifs_du_journal(chemin)
+    lambdas = calculer_lambdas(options_moteur.get("lambda_factor", 0.94), options_moteur.get("lambdas", ()),
+                               options_moteur.get("demi_vies", ()), options_moteur.get("intervalle", 10.0))
+    contexte = multiprocessing.get_context("spawn")
+    resultats = []
+    for nb_workers in liste_workers:
+        nb_workers = max(1, min(int(nb_workers), len(assets)))
+        table = TableVolatilites.creer(len(assets), capacite, len(lambdas))
+        depart = contexte.Barrier(nb_workers + 1)
+        file_resultats = contexte.Queue()
+        processus = [
+            contexte.Process(target=rejouer_partition,
+                             args=(table.description, [assets[i] for i in partition], partition, options_moteur, chemin,
+                                   depart, file_resultats, logger.getEffectiveLevel()),
+                             name=f"banc-{numero}")
+            for numero, partition in enumerate(partitionner(len(assets), nb_workers))
+        ]
+        try:
+            for p in processus:
+                p.start()
+            depart.wait()
+            debut = time.perf_counter()
+            mesures = [file_resultats.get() for _ in processus]
+            duree = time.perf_counter() - debut
+            for p in processus:
+                p.join()
+            nb = sum(nb_ticks for nb_ticks, _ in mesures)
+            resultat = {
+                "workers": nb_workers,
+                "messages": nb,
+                "duree": duree,
+                "messages_par_seconde": nb / duree if duree > 0 else 0.0,
+                "duree_worker_max": max(duree_worker for _, duree_worker in mesures),
+                "estimations": int(table.vue()["nb_ajouts"].sum()),
+            }
+            resultat["acceleration"] = resultat["messages_par_seconde"] / (resultats[0]["messages_par_seconde"] or 1.0) \
+                if resultats else 1.0
+            resultats.append(resultat)
+        finally:
+            for p in processus:
+                if p.is_alive():
+                    p.terminate()
+            table.fermer()
+    return resultats
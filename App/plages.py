@@ -0,0 +1,155 @@
+"""
+Estimateurs de volatilité fondés sur l'étendue des barres OHLC : Parkinson, Garman-Klass, Rogers-Satchell
+et Yang-Zhang.
+
+Le plus haut, le plus bas et l'ouverture d'une barre portent bien plus d'information sur la variance que la
+seule clôture : à précision égale, ces estimateurs demandent beaucoup moins de barres que l'EWMA
+clôture-à-clôture, ce qui raccourcit le préchauffage. Chaque estimateur est ici pondéré comme l'EWMA
+(v_t = lambda * v_{t-1} + (1 - lambda) * x_t, où x_t est le terme de la barre), en lot vectorisé sur un
+historique ou incrémentalement barre par barre ; comme pour l'EWMA, la moyenne des rendements est supposée nulle.
+"""
+import math
+
+import numpy as np
+
+from ewma import filtrer_ewma_batch
+
+ESTIMATEURS_PLAGE = ("parkinson", "garman_klass", "rogers_satchell", "yang_zhang")
+
+NOMS_ESTIMATEURS = {
+    "parkinson": "Parkinson",
+    "garman_klass": "Garman-Klass",
+    "rogers_satchell": "Rogers-Satchell",
+    "yang_zhang": "Yang-Zhang",
+}
+
+# Termes élémentaires par barre : Parkinson, Garman-Klass, Rogers-Satchell, saut d'ouverture ln(o/c_prec)², corps ln(c/o)²
+NB_TERMES = 5
+
+FACTEUR_PARKINSON = 1.0 / (4.0 * math.log(2.0))
+FACTEUR_GARMAN_KLASS = 2.0 * math.log(2.0) - 1.0
+
+
+def termes_plage(ouvertures, hauts, bas, clotures, cloture_precedente=None):
+    """
+    Termes de variance de chaque barre, calculés en une passe vectorisée.
+    :param cloture_precedente: Clôture précédant la première barre (sinon son saut d'ouverture est nul).
+    :return: Tableau de forme (NB_TERMES, T), tous les termes étant positifs ou nuls.
+    """
+    o, h, l, c = (np.log(np.asarray(x, dtype=np.float64)) for x in (ouvertures, hauts, bas, clotures))
+    etendue, corps = h - l, c - o
+    termes = np.empty((NB_TERMES, len(c)), dtype=np.float64)
+    termes[0] = FACTEUR_PARKINSON * etendue * etendue
+    termes[1] = 0.5 * etendue * etendue - FACTEUR_GARMAN_KLASS * corps * corps
+    termes[2] = (h - c) * (h - o) + (l - c) * (l - o)
+    if len(c):
+        precedentes = np.empty_like(c)
+        precedentes[0] = math.log(cloture_precedente) if cloture_precedente else o[0]
+        precedentes[1:] = c[:-1]
+        saut = o - precedentes
+        termes[3] = saut * saut
+    termes[4] = corps * corps
+    return termes
+
+
+def coefficient_yang_zhang(lambda_factor):
+    """
+    Pondération k de Yang-Zhang, k = 0.34 / (1.34 + (n + 1) / (n - 1)), où n est le nombre effectif
+    d'observations d'une moyenne EWMA : (1 + lambda) / (1 - lambda).
+    """
+    n = (1.0 + lambda_factor) / (1.0 - lambda_factor)
+    return 0.34 / (1.34 + (n + 1.0) / (n - 1.0))
+
+
+def combiner_estimateurs(variances_termes, lambda_factor):
+    """
+    Variances des estimateurs (ordre ESTIMATEURS_PLAGE) à partir des moyennes EWMA des termes (axe 0) :
+    Yang-Zhang combine saut d'ouverture, corps et Rogers-Satchell, v = v_saut + k * v_corps + (1 - k) * v_rs.
+    """
+    k = coefficient_yang_zhang(lambda_factor)
+    variances_termes = np.asarray(variances_termes, dtype=np.float64)
+    yang_zhang = variances_termes[3] + k * variances_termes[4] + (1.0 - k) * variances_termes[2]
+    return np.stack([variances_termes[0], variances_termes[1], variances_termes[2], yang_zhang])
+
+
+def variances_plage_ewma_batch(ouvertures, hauts, bas, clotures, lambda_factor=0.94, variances_initiales=None,
+                               cloture_precedente=None):
+    """
+    Trajectoires des variances EWMA des quatre estimateurs sur un historique OHLC, en une passe vectorisée.
+    :param variances_initiales: Moyennes de départ des NB_TERMES termes ; par défaut la moyenne de chaque terme.
+    :return: Tableau de forme (4, T), dans l'ordre ESTIMATEURS_PLAGE.
+    """
+    termes = termes_plage(ouvertures, hauts, bas, clotures, cloture_precedente)
+    depart = None if variances_initiales is None else np.asarray(variances_initiales, dtype=np.float64)[:, None]
+    return combiner_estimateurs(filtrer_ewma_batch(termes, lambda_factor, depart), lambda_factor)
+
+
+class EtatPlageEWMA:
+    """
+    État incrémental des estimateurs d'étendue d'un actif : moyennes EWMA des NB_TERMES termes et dernière clôture.
+    Chaque barre OHLC terminée est intégrée en temps constant, comme BanqueEWMA pour les clôtures.
+    """
+
+    __slots__ = ("lambda_factor", "variances", "derniere_cloture", "nb_barres")
+
+    def __init__(self, lambda_factor=0.94, variances=None, derniere_cloture=None):
+        self.lambda_factor = lambda_factor
+        self.variances = None if variances is None else [float(v) for v in variances]
+        self.derniere_cloture = derniere_cloture
+        self.nb_barres = 0
+
+    def mettre_a_jour(self, ouverture, haut, bas, cloture):
+        """Intègre une barre OHLC et retourne les variances des estimateurs (None avant la première barre valide)."""
+        if not (0.0 < bas <= min(ouverture, cloture) and max(ouverture, cloture) <= haut < math.inf):
+            return self.variances_estimateurs
+        o, h, l, c = math.log(ouverture), math.log(haut), math.log(bas), math.log(cloture)
+        etendue, corps = h - l, c - o
+        saut = o - math.log(self.derniere_cloture) if self.derniere_cloture else 0.0
+        termes = (
+            FACTEUR_PARKINSON * etendue * etendue,
+            0.5 * etendue * etendue - FACTEUR_GARMAN_KLASS * corps * corps,
+            (h - c) * (h - o) + (l - c) * (l - o),
+            saut * saut,
+            corps * corps,
+        )
+        lam = self.lambda_factor
+        if self.variances is None:
+            # Première barre : les moyennes sont amorcées avec ses termes
+            self.variances = list(termes)
+        else:
+            self.variances = [lam * v + (1 - lam) * x for v, x in zip(self.variances, termes)]
+        self.derniere_cloture = float(cloture)
+        self.nb_barres += 1
+        return self.variances_estimateurs
+
+    def rejouer(self, ouvertures, hauts, bas, clotures, lambda_factor=None, echelle=1.0):
+        """
+        Intègre un lot de barres en une passe vectorisée (ex. bougies historiques) et retourne la trajectoire
+        des variances des estimateurs, de forme (4, T).
+        :param lambda_factor: Facteur de décroissance du lot, si ses barres n'ont pas la durée des barres en direct.
+        :param echelle: Facteur appliqué aux termes pour les ramener à la durée d'une barre en direct
+            (ex. intervalle / 60 pour des bougies d'une minute).
+        """
+        lam = self.lambda_factor if lambda_factor is None else lambda_factor
+        termes = termes_plage(ouvertures, hauts, bas, clotures, self.derniere_cloture) * echelle
+        if termes.shape[-1] == 0:
+            return np.empty((len(ESTIMATEURS_PLAGE), 0), dtype=np.float64)
+        depart = None if self.variances is None else np.asarray(self.variances)[:, None]
+        variances_termes = filtrer_ewma_batch(termes, lam, depart)
+        self.variances = variances_termes[:, -1].tolist()
+        self.derniere_cloture = float(clotures[-1])
+        self.nb_barres += termes.shape[-1]
+        return combiner_estimateurs(variances_termes, lam)
+
+    @property
+    def variances_estimateurs(self):
+        """Variances des estimateurs (ordre ESTIMATEURS_PLAGE), ou None avant la première barre."""
+        if self.variances is None:
+            return None
+        return combiner_estimateurs(self.variances, self.lambda_factor)
+
+    @property
+    def volatilites(self):
+        """Volatilités des estimateurs (ordre ESTIMATEURS_PLAGE), ou None avant la première barre."""
+        variances = self.variances_estimateurs
+        return None if variances is None else np.sqrt(variances)
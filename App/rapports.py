@@ -0,0 +1,370 @@
+import csv
+import gzip
+import html
+import io
+import queue
+import random
+import smtplib
+import ssl
+import threading
+import time
+from collections import namedtuple
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import numpy as np
+
+from decodage import logger
+
+# Nombre de lignes du tableau dans le corps du rapport
+NB_LIGNES_RAPPORT = 100
+
+# Au-delà de ce nombre de points, l'historique complet est joint au rapport (CSV compressé ou Parquet)
+SEUIL_PIECE_JOINTE = 1000
+
+# File d'envoi : taille maximale d'un lot envoyé sur une même connexion SMTP, et attente de regroupement (secondes)
+TAILLE_LOT_ENVOI = 20
+DELAI_REGROUPEMENT = 0.5
+
+# Nouvelles tentatives après une erreur temporaire : nombre maximal et délai initial (secondes, doublé à chaque échec)
+TENTATIVES_ENVOI = 5
+DELAI_NOUVELLE_TENTATIVE = 2.0
+
+# Durée (secondes) après laquelle une connexion SMTP inutilisée est fermée
+DUREE_CONNEXION_INACTIVE = 60.0
+
+# Rapport en attente d'envoi : copie des colonnes de l'historique prise au moment de la soumission
+DemandeRapport = namedtuple("DemandeRapport", ["destinataire", "asset", "timestamps", "volatilites", "lambdas", "correlation"])
+
+# Message libre en attente d'envoi (ex. alertes, voir alertes.PuitsEmail)
+MessageEmail = namedtuple("MessageEmail", ["destinataire", "sujet", "corps_html"])
+
+
+def tableau_correlation_html(correlation):
+    """Tableau HTML d'une matrice de corrélation (MatriceCorrelation), ou chaîne vide si elle est absente."""
+    if correlation is None or len(correlation.assets) < 2:
+        return ""
+    entetes = "".join(f'<th style="text-align: left;">{html.escape(asset)}</th>' for asset in correlation.assets)
+    lignes = "".join(
+        f"<tr><th style=\"text-align: left;\">{html.escape(asset)}</th>"
+        + "".join("<td>N/A</td>" if valeur != valeur else f"<td>{valeur:.3f}</td>" for valeur in ligne)
+        + "</tr>"
+        for asset, ligne in zip(correlation.assets, correlation.matrice.tolist())
+    )
+    return f"""
+            <p>Matrice de corrélation EWMA entre les actifs suivis :</p>
+            <table border="1" cellpadding="5" cellspacing="0" style="border-collapse: collapse;">
+                <thead><tr style="background-color: #f2f2f2;"><th></th>{entetes}</tr></thead>
+                <tbody>{lignes}</tbody>
+            </table>
+    """
+
+
+def _colonnes(volatilites):
+    """Volatilités de forme (n,) ou (n, L) -> liste de colonnes (listes Python)."""
+    volatilites = np.asarray(volatilites, dtype=np.float64)
+    if volatilites.ndim == 1:
+        return [volatilites.tolist()]
+    return [colonne.tolist() for colonne in volatilites.T]
+
+
+def tableau_volatilites_html(timestamps, volatilites, lambdas=()):
+    """
+    Tableau HTML des volatilités, rendu en une seule passe sur les colonnes (timestamps, volatilités) :
+    les lignes sont produites par un générateur et assemblées par un unique join.
+    """
+    if lambdas:
+        entetes = "".join(f'<th style="text-align: left;">Volatilité (λ={lam:.4g})</th>' for lam in lambdas)
+    else:
+        entetes = '<th style="text-align: left;">Volatilité</th>'
+    horodatages = (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)) for ts in np.asarray(timestamps).tolist())
+    lignes = "".join(
+        f"<tr><td>{html.escape(horodatage)}</td>" + "".join(f"<td>{valeur:.6f}</td>" for valeur in valeurs) + "</tr>"
+        for horodatage, *valeurs in zip(horodatages, *_colonnes(volatilites))
+    )
+    return f"""
+            <table border="1" cellpadding="5" cellspacing="0" style="border-collapse: collapse; width: 100%;">
+                <thead>
+                    <tr style="background-color: #f2f2f2;">
+                        <th style="text-align: left;">Timestamp</th>
+                        {entetes}
+                    </tr>
+                </thead>
+                <tbody>{lignes}</tbody>
+            </table>
+    """
+
+
+def piece_jointe_historique(timestamps, volatilites, lambdas=(), format_fichier="csv", nom="volatilites"):
+    """
+    Historique complet en pièce jointe : CSV compressé (gzip) par défaut, ou Parquet si pandas et pyarrow
+    sont disponibles (repli sur le CSV sinon).
+    """
+    noms = [f"volatilite_{lam:.4g}" for lam in lambdas] if lambdas else ["volatilite"]
+    colonnes = _colonnes(volatilites)
+    if format_fichier == "parquet":
+        try:
+            import pandas as pd
+
+            tampon = io.BytesIO()
+            pd.DataFrame({"timestamp": np.asarray(timestamps), **dict(zip(noms, colonnes))}).to_parquet(tampon, index=False)
+            partie = MIMEApplication(tampon.getvalue(), Name=f"{nom}.parquet")
+            partie["Content-Disposition"] = f'attachment; filename="{nom}.parquet"'
+            return partie
+        except ImportError:
+            logger.warning("Parquet indisponible (pandas ou pyarrow manquant) : pièce jointe au format CSV.")
+
+    texte = io.StringIO()
+    ecrivain = csv.writer(texte)
+    ecrivain.writerow(["timestamp", *noms])
+    ecrivain.writerows(zip(np.asarray(timestamps).tolist(), *colonnes))
+    partie = MIMEApplication(gzip.compress(texte.getvalue().encode("utf-8")), Name=f"{nom}.csv.gz")
+    partie["Content-Disposition"] = f'attachment; filename="{nom}.csv.gz"'
+    return partie
+
+
+def demande_rapport(volatility_data, destinataire_email, asset=None, correlation=None):
+    """Copie l'historique (HistoriqueVolatilite) : la demande reste valable pendant que le moteur continue d'écrire."""
+    return DemandeRapport(destinataire_email, asset, volatility_data.timestamps().copy(), volatility_data.volatilites().copy(),
+                          tuple(getattr(volatility_data, "lambdas", None) or ()), correlation)
+
+
+def construire_message(message, email_expediteur):
+    """E-mail HTML d'un MessageEmail."""
+    msg = MIMEMultipart("mixed")
+    msg['From'] = email_expediteur
+    msg['To'] = message.destinataire
+    msg['Subject'] = message.sujet
+    msg.attach(MIMEText(message.corps_html, "html"))
+    return msg
+
+
+def construire_message_rapport(demande, email_expediteur, format_piece_jointe="csv", seuil_piece_jointe=SEUIL_PIECE_JOINTE):
+    """
+    E-mail d'un rapport : tableau des 100 dernières volatilités, matrice de corrélation éventuelle,
+    et historique complet en pièce jointe s'il dépasse `seuil_piece_jointe` points.
+    """
+    msg = MIMEMultipart("mixed")
+    msg['From'] = email_expediteur
+    msg['To'] = demande.destinataire
+    msg['Subject'] = "Rapport des 100 derniers indices de volatilité - Modèle EWMA" + (f" - {demande.asset}" if demande.asset else "")
+
+    joindre = len(demande.timestamps) > seuil_piece_jointe
+    mention = f"<p>L'historique complet ({len(demande.timestamps)} points) est joint à ce message.</p>" if joindre else ""
+    message_html = f"""
+    <html>
+        <body>
+            <p>Bonjour,</p>
+            <p>Veuillez trouver ci-dessous le rapport des <strong>100 derniers indices de volatilité</strong> générés par le modèle EWMA :</p>
+            {tableau_volatilites_html(demande.timestamps[-NB_LIGNES_RAPPORT:], demande.volatilites[-NB_LIGNES_RAPPORT:], demande.lambdas)}
+            {tableau_correlation_html(demande.correlation)}
+            {mention}
+            <p>Merci et à bientôt,</p>
+            <p><em>Équipe d'analyse des données financières</em></p>
+        </body>
+    </html>
+    """
+    msg.attach(MIMEText(message_html, "html"))
+    if joindre:
+        nom = f"volatilites_{demande.asset}" if demande.asset else "volatilites"
+        msg.attach(piece_jointe_historique(demande.timestamps, demande.volatilites, demande.lambdas, format_piece_jointe, nom))
+    return msg
+
+
+class RepartiteurRapports:
+    """
+    File d'envoi des rapports en arrière-plan.
+
+    soumettre() copie l'historique et rend la main immédiatement ; un thread dédié construit les messages,
+    regroupe les rapports en attente en lots envoyés sur une seule connexion SMTP authentifiée (conservée
+    entre deux lots tant qu'elle répond), et réessaie les envois en échec temporaire avec un délai exponentiel
+    aléatoire. Les refus définitifs (codes 5xx) ne sont pas réessayés.
+    """
+
+    def __init__(self, email_expediteur, mot_de_passe, serveur_smtp="smtp.gmail.com", port_smtp=587, starttls=True,
+                 format_piece_jointe="csv", seuil_piece_jointe=SEUIL_PIECE_JOINTE, taille_lot=TAILLE_LOT_ENVOI,
+                 tentatives=TENTATIVES_ENVOI, delai_nouvelle_tentative=DELAI_NOUVELLE_TENTATIVE, metriques=None):
+        self.email_expediteur = email_expediteur
+        self.mot_de_passe = mot_de_passe
+        self.serveur_smtp = serveur_smtp
+        self.port_smtp = port_smtp
+        self.starttls = starttls
+        self.format_piece_jointe = format_piece_jointe
+        self.seuil_piece_jointe = seuil_piece_jointe
+        self.taille_lot = taille_lot
+        self.tentatives = tentatives
+        self.delai_nouvelle_tentative = delai_nouvelle_tentative
+        self.metriques = metriques
+
+        self.nb_envoyes = 0
+        self.nb_echecs = 0
+        self.nb_nouvelles_tentatives = 0
+        self.nb_connexions = 0
+        self._file = queue.Queue()
+        self._connexion = None
+        self._derniere_utilisation = 0.0
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._boucle, name="rapports", daemon=True)
+        self._thread.start()
+
+    def soumettre(self, volatility_data, destinataire_email, asset=None, correlation=None):
+        """Met un rapport en file sans bloquer ; l'historique est copié immédiatement."""
+        self._file.put(demande_rapport(volatility_data, destinataire_email, asset, correlation))
+
+    def soumettre_message(self, destinataire_email, sujet, corps_html):
+        """Met un e-mail HTML libre en file, envoyé avec les rapports sur la même connexion."""
+        self._file.put(MessageEmail(destinataire_email, sujet, corps_html))
+
+    def statistiques(self):
+        return {
+            "en_attente": self._file.qsize(),
+            "envoyes": self.nb_envoyes,
+            "echecs": self.nb_echecs,
+            "nouvelles_tentatives": self.nb_nouvelles_tentatives,
+            "connexions": self.nb_connexions,
+        }
+
+    def attendre(self, timeout=None):
+        """Attend que tous les rapports soumis soient envoyés ou abandonnés ; retourne False à l'expiration du délai."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._file.unfinished_tasks:
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def arreter(self, timeout=10.0):
+        """Termine les envois en cours (au plus `timeout` secondes), puis ferme la connexion SMTP."""
+        self.attendre(timeout)
+        self._arret.set()
+        self._thread.join(timeout)
+        self._fermer_connexion()
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            try:
+                lot = [self._file.get(timeout=DELAI_REGROUPEMENT)]
+            except queue.Empty:
+                if self._connexion is not None and time.monotonic() - self._derniere_utilisation > DUREE_CONNEXION_INACTIVE:
+                    self._fermer_connexion()
+                continue
+            # Regrouper les rapports déjà en attente sur la même connexion
+            while len(lot) < self.taille_lot:
+                try:
+                    lot.append(self._file.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._envoyer_lot(lot)
+            except Exception:
+                self.nb_echecs += len(lot)
+                logger.exception("Erreur inattendue lors de l'envoi des rapports.")
+            finally:
+                for _ in lot:
+                    self._file.task_done()
+
+    def _ouvrir_connexion(self):
+        """Réutilise la connexion ouverte si elle répond encore, sinon ouvre et authentifie une nouvelle connexion."""
+        if self._connexion is not None:
+            try:
+                if self._connexion.noop()[0] == 250:
+                    return self._connexion
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._fermer_connexion()
+        connexion = smtplib.SMTP(self.serveur_smtp, self.port_smtp, timeout=30)
+        try:
+            if self.starttls:
+                connexion.starttls(context=ssl.create_default_context())
+            if self.mot_de_passe:
+                connexion.login(self.email_expediteur, self.mot_de_passe)
+        except Exception:
+            connexion.close()
+            raise
+        self._connexion = connexion
+        self.nb_connexions += 1
+        return connexion
+
+    def _fermer_connexion(self):
+        connexion, self._connexion = self._connexion, None
+        if connexion is not None:
+            try:
+                connexion.quit()
+            except (smtplib.SMTPException, OSError):
+                connexion.close()
+
+    def _construire(self, demande):
+        if isinstance(demande, MessageEmail):
+            return construire_message(demande, self.email_expediteur)
+        return construire_message_rapport(demande, self.email_expediteur, self.format_piece_jointe, self.seuil_piece_jointe)
+
+    def _envoyer_lot(self, lot):
+        """Envoie un lot de rapports ; ceux en échec temporaire sont renvoyés avec un délai croissant."""
+        restants = [(demande, self._construire(demande).as_string()) for demande in lot]
+        tentative = 0
+        while restants:
+            debut = time.perf_counter_ns()
+            echoues = []
+            try:
+                connexion = self._ouvrir_connexion()
+                while restants:
+                    demande, message = restants[0]
+                    try:
+                        connexion.sendmail(self.email_expediteur, demande.destinataire, message)
+                        self.nb_envoyes += 1
+                    except smtplib.SMTPRecipientsRefused as e:
+                        if all(code < 500 for code, _ in e.recipients.values()):
+                            echoues.append(restants[0])
+                        else:
+                            self.nb_echecs += 1
+                            logger.error("Rapport refusé pour %s : %s", demande.destinataire, e.recipients)
+                    except (smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                        if e.smtp_code >= 500:
+                            self.nb_echecs += 1
+                            logger.error("Rapport rejeté pour %s : %s %s", demande.destinataire, e.smtp_code, e.smtp_error)
+                        else:
+                            echoues.append(restants[0])
+                    restants.pop(0)
+                self._derniere_utilisation = time.monotonic()
+            except (smtplib.SMTPException, OSError) as e:
+                # Connexion perdue ou refusée : les rapports non encore envoyés sont réessayés
+                logger.warning("Erreur SMTP (%s) : %s", type(e).__name__, e)
+                self._fermer_connexion()
+            if self.metriques is not None:
+                self.metriques.observer("envoi_smtp", time.perf_counter_ns() - debut)
+
+            restants = echoues + restants
+            if not restants:
+                break
+            tentative += 1
+            if tentative >= self.tentatives:
+                self.nb_echecs += len(restants)
+                logger.error("Abandon de %d rapport(s) après %d tentatives.", len(restants), tentative)
+                break
+            self.nb_nouvelles_tentatives += len(restants)
+            delai = self.delai_nouvelle_tentative * 2 ** (tentative - 1) * random.uniform(0.5, 1.0)
+            logger.info("Nouvel essai d'envoi de %d rapport(s) dans %.1f secondes...", len(restants), delai)
+            if self._arret.wait(delai):
+                self.nb_echecs += len(restants)
+                break
+
+
+def envoyer_email_rapport_volatilites(volatility_data, destinataire_email, email_expediteur, mot_de_passe,
+                                      asset=None, serveur_smtp="smtp.gmail.com", port_smtp=587, correlation=None):
+    """
+    Envoie immédiatement, dans le thread appelant, le rapport d'un historique (HistoriqueVolatilite).
+    Pour l'historique d'une banque EWMA, une colonne est ajoutée par facteur de décroissance ; la matrice
+    de corrélation inter-actifs (MatriceCorrelation) est jointe sous le tableau si elle est fournie.
+    Pour des envois réguliers, préférer RepartiteurRapports, qui ne bloque pas l'appelant.
+    """
+    msg = construire_message_rapport(demande_rapport(volatility_data, destinataire_email, asset, correlation), email_expediteur)
+    try:
+        context = ssl.create_default_context()
+        with smtplib.SMTP(serveur_smtp, port_smtp) as serveur:
+            serveur.starttls(context=context)
+            serveur.login(email_expediteur, mot_de_passe)
+            serveur.sendmail(email_expediteur, destinataire_email, msg.as_string())
+            logger.info("Email envoyé avec succès!")
+    except Exception as e:
+        logger.error("Erreur lors de l'envoi de l'email : %s", e)
@@ -0,0 +1,202 @@
+"""
+Rejeu d'un journal de ticks (voir journal.py) dans le moteur, sans réseau.
+
+Les ticks passent par le même chemin d'ingestion que le flux en direct (décodage des trames brutes,
+aiguillage, fenêtre de prix, barres et EWMA), au plus vite ou au rythme enregistré. Le banc d'essai mesure
+le débit (messages/seconde), les centiles de latence par tick et la croissance mémoire :
+
+    python App/rejeu.py ticks.journal --bench --repetitions 3
+    python App/rejeu.py ticks.journal --pace 1.0
+    python App/rejeu.py synthetique.journal --generate 200000 --assets BTC-PERPETUAL ETH-PERPETUAL --bench
+    python App/rejeu.py univers.journal --generate 400000 --synthetic-assets 200 --bench --workers 1 2 4
+
+Avec --workers, le banc d'essai mesure le mode réparti (voir partition.py) pour chaque nombre de workers.
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import time
+
+import numpy as np
+
+from decodage import decoder_message, logger
+from engine import MoteurVolatilite
+from journal import lire_journal, lire_ticks, lire_trames, detecter_format, ouvrir_journal, FORMATS_JOURNAL
+from ordonnanceur import OrdonnanceurPredictions
+
+CENTILES_LATENCE = (50, 90, 99, 99.9)
+
+
+def actifs_du_journal(chemin):
+    """Instruments présents dans un journal (canaux ticker.<asset>.raw), dans l'ordre d'apparition."""
+    if detecter_format(chemin) == "ticks":
+        canaux = lire_ticks(chemin)[0]
+    else:
+        canaux = dict.fromkeys(decoder_message(message).channel for _, message in lire_trames(chemin))
+    return [canal.split(".")[1] for canal in canaux if canal and canal.startswith("ticker.")]
+
+
+def memoire_residente():
+    """Mémoire résidente du processus en octets (pic de mémoire si /proc n'est pas disponible)."""
+    try:
+        with open("/proc/self/statm") as fichier:
+            return int(fichier.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def rejouer(moteur, chemin, vitesse=None, latences=None, canaux=None):
+    """
+    Injecte les ticks d'un journal dans le moteur.
+    :param vitesse: None pour rejouer au plus vite, 1.0 pour le rythme enregistré (2.0 : deux fois plus vite...).
+    :param latences: Tableau NumPy d'au moins autant d'éléments que de ticks, rempli avec la durée (ns) de chaque tick.
+    :param canaux: Canaux à rejouer (partition d'un worker, voir partition.py), ou None pour tous.
+    :return: Nombre de ticks rejoués.
+    """
+    format_journal = detecter_format(chemin)
+    if format_journal == "trames":
+        # Les trames brutes sont décodées dans la mesure, comme en direct
+        source = lire_trames(chemin)
+    else:
+        source = ((recu, (channel, timestamp, mark_price))
+                  for recu, channel, timestamp, mark_price in lire_journal(chemin, canaux=canaux))
+
+    nb = 0
+    premier_recu = depart = None
+    horloge = time.perf_counter_ns
+    for recu, donnees in source:
+        if premier_recu is None:
+            # L'échéancier des calculs suit l'heure enregistrée, et non l'heure du rejeu
+            premier_recu, depart = recu, time.monotonic()
+            moteur.ordonnanceur = OrdonnanceurPredictions(moteur.intervalle, moteur.assets, debut=recu)
+        if vitesse:
+            attente = (recu - premier_recu) / vitesse - (time.monotonic() - depart)
+            if attente > 0:
+                time.sleep(attente)
+
+        debut = horloge()
+        if format_journal == "trames":
+            decoded = decoder_message(donnees)
+            if decoded.channel is not None and (canaux is None or decoded.channel in canaux):
+                moteur.ingerer(decoded.channel, decoded.timestamp, decoded.mark_price, maintenant=recu)
+        else:
+            moteur.ingerer(*donnees, maintenant=recu)
+        if latences is not None:
+            latences[nb] = horloge() - debut
+        nb += 1
+    return nb
+
+
+def compter_ticks(chemin):
+    if detecter_format(chemin) == "ticks":
+        return len(lire_ticks(chemin)[1])
+    return sum(1 for _ in lire_trames(chemin))
+
+
+def banc_essai(chemin, repetitions=3, assets=None, **options_moteur):
+    """
+    Rejoue le journal au plus vite `repetitions` fois, chaque fois dans un moteur neuf.
+    :return: Liste de dicts : messages, durée, messages/seconde, centiles de latence (µs) et croissance mémoire (octets).
+    """
+    assets = assets or actifs_du_journal(chemin)
+    latences = np.zeros(compter_ticks(chemin), dtype=np.int64)
+    resultats = []
+    for _ in range(repetitions):
+        moteur = MoteurVolatilite(assets, **options_moteur)
+        memoire = memoire_residente()
+        debut = time.perf_counter()
+        nb = rejouer(moteur, chemin, latences=latences)
+        duree = time.perf_counter() - debut
+        centiles = np.percentile(latences[:nb], CENTILES_LATENCE) / 1000 if nb else [0.0] * len(CENTILES_LATENCE)
+        resultats.append({
+            "messages": nb,
+            "duree": duree,
+            "messages_par_seconde": nb / duree if duree > 0 else 0.0,
+            **{f"latence_p{c:g}_us": float(v) for c, v in zip(CENTILES_LATENCE, centiles)},
+            "latence_max_us": float(latences[:nb].max()) / 1000 if nb else 0.0,
+            "croissance_memoire": memoire_residente() - memoire,
+            "estimations": sum(len(moteur.historique_volatilite(asset)) for asset in assets),
+        })
+    return resultats
+
+
+def generer_journal_synthetique(chemin, assets, nb_ticks, frequence=50.0, format_journal="ticks", graine=0):
+    """
+    Écrit un journal de ticks synthétiques (mouvement brownien géométrique, instruments entrelacés),
+    pour mesurer les performances sans enregistrement préalable.
+    """
+    for fichier in (chemin, f"{chemin}.canaux"):
+        if os.path.exists(fichier):
+            os.remove(fichier)
+    rng = np.random.default_rng(graine)
+    debut = time.time() - nb_ticks / frequence
+    prix = np.full(len(assets), 100.0)
+    journal = ouvrir_journal(chemin, format_journal)
+    try:
+        for i in range(nb_ticks):
+            indice = i % len(assets)
+            prix[indice] *= np.exp(1e-4 * rng.standard_normal())
+            recu = debut + i / frequence
+            message = json.dumps({
+                "jsonrpc": "2.0",
+                "method": "subscription",
+                "params": {
+                    "channel": f"ticker.{assets[indice]}.raw",
+                    "data": {"mark_price": float(prix[indice]), "timestamp": int(recu * 1000)},
+                },
+            })
+            journal.enregistrer(message, decoder_message(message), recu)
+    finally:
+        journal.fermer()
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande : rejeu et banc d'essai hors ligne."""
+    parser = argparse.ArgumentParser(description="Rejeu d'un journal de ticks dans le moteur EWMA (sans réseau).")
+    parser.add_argument("journal", help="Fichier journal (enregistré avec engine.py --journal)")
+    parser.add_argument("--pace", type=float, help="Rejouer au rythme enregistré multiplié par ce facteur (défaut : au plus vite)")
+    parser.add_argument("--bench", action="store_true", help="Mesurer débit, latences par tick et croissance mémoire")
+    parser.add_argument("--repetitions", type=int, default=3, help="Nombre de rejeux du banc d'essai")
+    parser.add_argument("--window", type=int, default=100, help="Taille de la fenêtre de prix (nombre de points)")
+    parser.add_argument("--interval", type=float, default=10.0, help="Intervalle entre deux estimations (secondes)")
+    parser.add_argument("--generate", type=int, metavar="N", help="Écrire d'abord un journal synthétique de N ticks")
+    parser.add_argument("--assets", nargs="+", default=["BTC-PERPETUAL", "ETH-PERPETUAL"],
+                        help="Instruments du journal synthétique")
+    parser.add_argument("--synthetic-assets", type=int, metavar="K",
+                        help="Journal synthétique sur K instruments fictifs (remplace --assets)")
+    parser.add_argument("--workers", nargs="+", type=int,
+                        help="Banc d'essai du mode réparti avec ces nombres de workers, ex. 1 2 4")
+    parser.add_argument("--format", choices=FORMATS_JOURNAL, default="ticks", help="Format du journal synthétique")
+    parser.add_argument("--log-level", default="WARNING", help="Niveau de journalisation (DEBUG, INFO, WARNING...)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s : %(message)s")
+
+    if args.generate:
+        assets = [f"SYN{i}-PERPETUAL" for i in range(args.synthetic_assets)] if args.synthetic_assets else args.assets
+        generer_journal_synthetique(args.journal, assets, args.generate, format_journal=args.format)
+
+    if args.bench and args.workers:
+        from partition import banc_essai_reparti
+
+        for resultat in banc_essai_reparti(args.journal, args.workers, data_window=args.window, intervalle=args.interval):
+            print(json.dumps(resultat))
+        return
+
+    if args.bench:
+        for resultat in banc_essai(args.journal, args.repetitions, data_window=args.window, intervalle=args.interval):
+            print(json.dumps(resultat))
+        return
+
+    moteur = MoteurVolatilite(actifs_du_journal(args.journal), data_window=args.window, intervalle=args.interval)
+    debut = time.perf_counter()
+    nb = rejouer(moteur, args.journal, vitesse=args.pace)
+    logger.warning("%d ticks rejoués en %.2f s.", nb, time.perf_counter() - debut)
+    for ligne in moteur.progression():
+        print(json.dumps(ligne, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
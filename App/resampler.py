@@ -0,0 +1,113 @@
+import math
+from collections import namedtuple
+
+# Barre de temps terminée : timestamp de clôture (fin de l'intervalle), OHLC et nombre de ticks reçus
+Barre = namedtuple("Barre", ["timestamp", "open", "high", "low", "close", "nb_ticks"])
+
+# Politiques de remplissage des intervalles sans tick
+POLITIQUES_REMPLISSAGE = ("precedent", "lineaire", "aucun")
+
+
+class ResamplerBarres:
+    """
+    Rééchantillonnage incrémental d'un flux de ticks en barres de durée fixe.
+
+    La barre k couvre l'intervalle ](k-1)*intervalle, k*intervalle] (grille alignée sur l'époque Unix) et
+    sa clôture est le dernier prix reçu dans cet intervalle. Chaque tick est traité en O(1) (hors barres vides
+    à combler) et les barres terminées sont retournées dès qu'un tick postérieur à leur fin arrive.
+
+    Politiques pour les barres sans tick :
+      - "precedent" : répète la dernière clôture (rendement nul, la variance totale est préservée) ;
+      - "lineaire" : interpole entre la dernière observation et le tick suivant ;
+      - "aucun" : n'émet pas de barre (le rendement suivant couvre tout l'écart).
+    """
+
+    def __init__(self, intervalle, politique="precedent"):
+        if intervalle <= 0:
+            raise ValueError("L'intervalle des barres doit être strictement positif.")
+        if politique not in POLITIQUES_REMPLISSAGE:
+            raise ValueError(f"Politique de remplissage inconnue : {politique}")
+        self.intervalle = float(intervalle)
+        self.politique = politique
+        self.index_barre = None  # Indice sur la grille de la barre en cours (fin = indice * intervalle)
+        self.dernier_timestamp = None
+        self.dernier_prix = None
+        self._ohlc = None  # [open, high, low, close] de la barre en cours
+        self._nb_ticks = 0
+
+    def _index_de(self, timestamp):
+        """Indice de la barre (alignée sur la grille) contenant ce timestamp."""
+        return math.ceil(timestamp / self.intervalle)
+
+    @property
+    def fin_barre(self):
+        """Timestamp de fin de la barre en cours, ou None avant le premier tick."""
+        return None if self.index_barre is None else self.index_barre * self.intervalle
+
+    def ajouter(self, timestamp, prix):
+        """
+        Intègre un tick et retourne la liste (souvent vide) des barres terminées.
+        Un tick antérieur à la barre en cours est rattaché à celle-ci.
+        """
+        timestamp = float(timestamp)
+        prix = float(prix)
+        barres = []
+
+        if self.index_barre is None:
+            self.index_barre = self._index_de(timestamp)
+        elif self._index_de(timestamp) > self.index_barre:
+            barres = self._terminer_jusqua(timestamp, prix)
+
+        if self._ohlc is None:
+            self._ohlc = [prix, prix, prix, prix]
+        else:
+            ohlc = self._ohlc
+            if prix > ohlc[1]:
+                ohlc[1] = prix
+            if prix < ohlc[2]:
+                ohlc[2] = prix
+            ohlc[3] = prix
+        self._nb_ticks += 1
+        self.dernier_timestamp = max(timestamp, self.dernier_timestamp or timestamp)
+        self.dernier_prix = prix
+        return barres
+
+    def vider(self):
+        """Émet la barre en cours si elle contient des ticks (ex. fin d'un historique) et passe à la suivante."""
+        if self._ohlc is None:
+            return []
+        barre = self._emettre()
+        self.index_barre += 1
+        return [barre]
+
+    def _emettre(self):
+        o, h, l, c = self._ohlc
+        barre = Barre(self.fin_barre, o, h, l, c, self._nb_ticks)
+        self._ohlc = None
+        self._nb_ticks = 0
+        return barre
+
+    def _terminer_jusqua(self, timestamp, prix):
+        """Termine la barre en cours puis comble les barres vides jusqu'à celle qui contient `timestamp`."""
+        barres = []
+        if self._ohlc is not None:
+            barres.append(self._emettre())
+            self.index_barre += 1
+
+        nouvel_index = self._index_de(timestamp)
+        if self.dernier_prix is None or self.politique == "aucun":
+            self.index_barre = nouvel_index
+            return barres
+
+        # Barres vides entre la dernière observation et le tick courant
+        duree = timestamp - self.dernier_timestamp
+        while self.index_barre < nouvel_index:
+            fin = self.fin_barre
+            if self.politique == "lineaire" and duree > 0:
+                poids = (fin - self.dernier_timestamp) / duree
+                valeur = self.dernier_prix + poids * (prix - self.dernier_prix)
+            else:
+                valeur = self.dernier_prix
+            barres.append(Barre(fin, valeur, valeur, valeur, valeur, 0))
+            self.index_barre += 1
+        return barres
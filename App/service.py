@@ -0,0 +1,279 @@
+import threading
+import time
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from alertes import MoteurAlertes, PuitsLog, PuitsMemoire
+from buffers import reduire_minmax
+from decodage import logger
+from engine import MoteurVolatilite, CACHE_HISTORIQUE_DIR
+from historique import CacheHistorique
+from plages import ESTIMATEURS_PLAGE
+
+# Nombre maximal de points par série publiée, quelle que soit la durée de la session
+NB_POINTS_GRAPHIQUE = 2000
+
+# Série de volatilité publiée pour un actif : déjà sous-échantillonnée et convertie pour l'affichage.
+# `banque` associe chaque facteur de décroissance supplémentaire à sa série parallèle (timestamps, volatilites) ;
+# `garch` contient la série prévue par le GARCH (timestamps, volatilites), ou None ;
+# `plages` associe chaque estimateur d'étendue (ESTIMATEURS_PLAGE) à sa série (timestamps, volatilites).
+SerieVolatilite = namedtuple("SerieVolatilite", ["nb_ajouts", "timestamps", "volatilites", "banque", "garch",
+                                                 "plages"])
+
+# Instantané en lecture seule de l'état du moteur, partagé par toutes les sessions
+# `alertes` : dernières alertes émises (alertes.Alerte), de la plus récente à la plus ancienne
+Instantane = namedtuple("Instantane", ["version", "horodatage", "series", "progression", "statistiques", "correlation",
+                                       "alertes"])
+
+INSTANTANE_VIDE = Instantane(0, 0.0, {}, [], {}, None, [])
+
+
+def convertir_timestamps(timestamps):
+    """Convertit des timestamps en secondes (float) en datetime64[ms] NumPy, sans passer par pandas."""
+    return (np.asarray(timestamps) * 1000).astype("datetime64[ms]")
+
+
+class ServiceVolatilite:
+    """
+    Flux de marché et calcul partagés par toutes les sessions du tableau de bord.
+
+    Un seul moteur (un seul gestionnaire de connexions WebSocket) tourne dans un thread de fond pour l'union des
+    actifs demandés par les sessions. Après chaque lot de calcul, un instantané immuable est publié
+    par simple remplacement de référence : les sessions le lisent sans verrou ni copie, et le coût
+    du flux et du calcul ne dépend pas du nombre de spectateurs.
+
+    Le thread du flux ne fait que décoder les trames et les déposer dans la file conflatante du moteur,
+    dont le thread de traitement met à jour l'EWMA et signale chaque lot. Un thread de publication copie alors brièvement les historiques modifiés sous le verrou du
+    moteur, puis sous-échantillonne et construit l'instantané hors verrou.
+
+    Les réglages propres à une session ne recréent jamais le service : la fenêtre, la rétention et la profondeur
+    de préchauffage retiennent la plus grande valeur demandée (voir configurer), le GARCH et les estimateurs
+    d'étendue s'activent en cours de route, et les règles d'alerte de chaque session s'ajoutent au moteur d'alertes
+    partagé (elles remplacent les précédentes de la session, et ses alertes ne sont envoyées qu'à son adresse). Seul l'intervalle des barres définit le flux ; arreter() libère connexion, threads et port des métriques.
+    """
+
+    def __init__(self, data_window=100, intervalle=10.0, retention=20000, duree_prechauffage=3600,
+                 client_id=None, client_secret=None, rapporteur=None, lambdas=(), demi_vies=(),
+                 garch=False, garch_reajustement=60, port_metriques=None, plages=False, regles_alertes=()):
+        # Alertes évaluées par le moteur à chaque estimation ; les dernières sont conservées pour l'instantané
+        self.memoire_alertes = PuitsMemoire()
+        self.alertes = MoteurAlertes(regles_alertes, [PuitsLog(), self.memoire_alertes])
+        self.moteur = MoteurVolatilite([], data_window=data_window, intervalle=intervalle, retention=retention,
+                                       client_id=client_id, client_secret=client_secret, conflation=True,
+                                       lambdas=lambdas, demi_vies=demi_vies, covariance=True,
+                                       garch=garch, garch_reajustement=garch_reajustement, plages=plages,
+                                       alertes=self.alertes)
+        self.duree_prechauffage = duree_prechauffage
+        self.metriques = self.moteur.metriques
+        if port_metriques:
+            self.metriques.demarrer_serveur(port_metriques)
+        self.cache = CacheHistorique(CACHE_HISTORIQUE_DIR)
+        self.instantane = INSTANTANE_VIDE
+
+        # Destinataires des rapports par actif, enregistrés par les sessions : adresse -> nombre de sessions inscrites
+        self.destinataires = {}
+        # Session propriétaire de règles d'alerte -> (adresse, actifs suivis) recevant ses alertes
+        self.abonnes_alertes = {}
+        self.rapporteur = rapporteur
+
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        self._en_prechauffage = set()
+        self._thread_flux = None
+        self._lot_calcule = threading.Event()
+        self._thread_publication = threading.Thread(target=self._boucle_publication, name="publication", daemon=True)
+        self._thread_publication.start()
+        self.moteur.abonner(self._signaler_lot)
+        self.moteur.abonner_rapport(self._envoyer_rapports)
+
+    def ajouter_actifs(self, assets):
+        """Ajoute les actifs d'une session : préchauffage en arrière-plan, puis souscription sur le flux partagé."""
+        with self._verrou:
+            # Un actif en cours de préchauffage (autre session, ou relance de celle-ci) n'est pas préchauffé à nouveau
+            nouveaux = [asset for asset in dict.fromkeys(assets)
+                        if asset not in self.moteur.assets and asset not in self._en_prechauffage]
+            if nouveaux:
+                self._en_prechauffage.update(nouveaux)
+                threading.Thread(target=self._prechauffer_et_souscrire, args=(nouveaux,),
+                                 name="prechauffage", daemon=True).start()
+            if self._thread_flux is None:
+                self._thread_flux = threading.Thread(target=self._executer, name="flux-deribit", daemon=True)
+                self._thread_flux.start()
+
+    def configurer(self, data_window=None, retention=None, duree_prechauffage=None):
+        """
+        Réglages demandés par une session, appliqués sans recréer le service : la plus grande valeur demandée
+        est retenue, pour qu'une session ne réduise jamais la fenêtre ou l'historique des autres.
+        """
+        with self.moteur.verrou:
+            self.moteur.configurer(
+                data_window=max(self.moteur.data_window, data_window) if data_window else None,
+                retention=max(self.moteur.retention, retention) if retention else None,
+            )
+            if duree_prechauffage:
+                self.duree_prechauffage = max(self.duree_prechauffage, duree_prechauffage)
+
+    def activer_garch(self, garch_reajustement=None):
+        self.moteur.activer_garch(garch_reajustement)
+
+    def activer_plages(self):
+        self.moteur.activer_plages()
+
+    def ajouter_regles_alertes(self, regles, session=None, email=None, assets=()):
+        """
+        Ajoute les règles d'une session au moteur d'alertes partagé, en remplaçant celles qu'elle avait ajoutées
+        auparavant ; ses alertes sur `assets` sont envoyées à `email` (voir destinataires_alerte).
+        :return: Noms des règles évaluées.
+        """
+        with self.moteur.verrou:
+            if session is not None:
+                self.alertes.retirer_regles(session)
+            noms = [self.alertes.ajouter_regle(regle, session).nom for regle in regles]
+        if session is not None:
+            with self._verrou:
+                self.abonnes_alertes[session] = (email, frozenset(assets))
+        return noms
+
+    def retirer_regles_alertes(self, session):
+        """Retire les règles d'une session (supprimées si aucune autre session ne les utilise) et son adresse."""
+        with self.moteur.verrou:
+            self.alertes.retirer_regles(session)
+        with self._verrou:
+            self.abonnes_alertes.pop(session, None)
+
+    def destinataires_alerte(self, alerte):
+        """Adresses des sessions propriétaires de la règle de l'alerte qui suivent son actif."""
+        with self.moteur.verrou:
+            sessions = self.alertes.proprietaires(alerte.regle)
+        with self._verrou:
+            abonnes = [self.abonnes_alertes.get(session) for session in sessions]
+        return sorted({email for email, assets in filter(None, abonnes) if email and alerte.asset in assets})
+
+    def arreter(self):
+        """Arrête le flux, le calcul et la publication, et libère le port des métriques."""
+        self._arret.set()
+        self.moteur.arreter()
+        self.metriques.arreter_serveur()
+        self._lot_calcule.set()
+
+    def ajouter_destinataire(self, asset, email):
+        """Enregistre une adresse e-mail recevant les rapports d'un actif (une fois par session inscrite)."""
+        with self._verrou:
+            self.destinataires.setdefault(asset, Counter())[email] += 1
+
+    def retirer_destinataire(self, asset, email):
+        """
+        Annule une inscription faite par ajouter_destinataire (ex. adresse modifiée ou actif retiré par la session).
+        L'adresse ne reçoit plus les rapports de l'actif dès qu'aucune session ne l'y inscrit plus.
+        """
+        with self._verrou:
+            compteur = self.destinataires.get(asset)
+            if compteur is None or email not in compteur:
+                return
+            compteur[email] -= 1
+            if compteur[email] <= 0:
+                del compteur[email]
+            if not compteur:
+                del self.destinataires[asset]
+
+    def destinataires_actif(self, asset):
+        """Adresses inscrites aux rapports d'un actif (copie, lisible pendant que les sessions s'inscrivent)."""
+        with self._verrou:
+            return list(self.destinataires.get(asset, ()))
+
+    def _prechauffer_et_souscrire(self, assets):
+        try:
+            for asset, nb_points in self.moteur.prechauffer(self.cache, self.duree_prechauffage, assets=assets):
+                logger.info("Volatilité initiale calculée pour %s. Points calculés : %d.", asset, nb_points)
+            self.moteur.ajouter_actifs(assets)
+        finally:
+            with self._verrou:
+                self._en_prechauffage.difference_update(assets)
+        self._lot_calcule.set()
+
+    def _executer(self):
+        # Attendre qu'au moins un actif soit prêt avant d'ouvrir la connexion
+        while not self.moteur.assets:
+            if self._arret.wait(0.1):
+                return
+        self.moteur.executer()
+
+    def _signaler_lot(self, moteur, assets):
+        """Abonné du moteur, appelé sur le thread du flux : ne fait que réveiller le thread de publication."""
+        self._lot_calcule.set()
+
+    def _boucle_publication(self):
+        while True:
+            self._lot_calcule.wait()
+            self._lot_calcule.clear()
+            if self._arret.is_set():
+                return
+            try:
+                self._publier()
+            except Exception:
+                logger.exception("Erreur lors de la publication de l'instantané.")
+
+    def _publier(self):
+        """Construit et publie un nouvel instantané ; seule la copie des données brutes se fait sous verrou."""
+        series = dict(self.instantane.series)
+        copies = {}
+        with self.moteur.verrou:
+            for asset in self.moteur.assets:
+                historique = self.moteur.historique_volatilite(asset)
+                serie = series.get(asset)
+                if len(historique) == 0 or (serie is not None and serie.nb_ajouts == historique.nb_ajouts):
+                    continue
+                historique_banque = self.moteur.historique_banque(asset)
+                banque = None
+                if historique_banque is not None and len(historique_banque):
+                    banque = (historique_banque.timestamps().copy(), historique_banque.volatilites().copy())
+                historique_garch = self.moteur.historique_garch(asset)
+                garch = None
+                if historique_garch is not None and len(historique_garch):
+                    garch = (historique_garch.timestamps().copy(), historique_garch.volatilites().copy())
+                historique_plage = self.moteur.historique_plage(asset)
+                plages = None
+                if historique_plage is not None and len(historique_plage):
+                    plages = (historique_plage.timestamps().copy(), historique_plage.volatilites().copy())
+                copies[asset] = (historique.nb_ajouts, historique.timestamps().copy(), historique.volatilites().copy(),
+                                 banque, garch, plages)
+            lambdas = self.moteur.lambdas
+            progression = self.moteur.progression()
+            correlation = self.moteur.covariance.instantane()
+        statistiques = self.moteur.file.statistiques()
+        if self.moteur.garch is not None:
+            statistiques["garch"] = self.moteur.garch.statistiques()
+        statistiques["alertes"] = self.alertes.statistiques()
+
+        for asset, (nb_ajouts, timestamps, volatilites, banque, garch, plages) in copies.items():
+            series_banque = {}
+            if banque is not None:
+                # Historique de la banque : une colonne par facteur, la première étant la série principale
+                timestamps_banque, volatilites_banque = banque
+                for colonne, lam in enumerate(lambdas[1:], start=1):
+                    x, y = reduire_minmax(timestamps_banque, np.ascontiguousarray(volatilites_banque[:, colonne]),
+                                          NB_POINTS_GRAPHIQUE)
+                    series_banque[lam] = (convertir_timestamps(x), y)
+            if garch is not None:
+                x, y = reduire_minmax(*garch, NB_POINTS_GRAPHIQUE)
+                garch = (convertir_timestamps(x), y)
+            series_plages = {}
+            if plages is not None:
+                # Historique des estimateurs d'étendue : une colonne par estimateur
+                timestamps_plages, volatilites_plages = plages
+                for colonne, nom in enumerate(ESTIMATEURS_PLAGE):
+                    x, y = reduire_minmax(timestamps_plages, np.ascontiguousarray(volatilites_plages[:, colonne]),
+                                          NB_POINTS_GRAPHIQUE)
+                    series_plages[nom] = (convertir_timestamps(x), y)
+            timestamps, volatilites = reduire_minmax(timestamps, volatilites, NB_POINTS_GRAPHIQUE)
+            series[asset] = SerieVolatilite(nb_ajouts, convertir_timestamps(timestamps), volatilites, series_banque, garch,
+                                            series_plages)
+        self.instantane = Instantane(self.instantane.version + 1, time.time(), series, progression, statistiques,
+                                     correlation, self.memoire_alertes.recentes())
+
+    def _envoyer_rapports(self, asset, historique):
+        if self.rapporteur is None:
+            return
+        for email in self.destinataires_actif(asset):
+            self.rapporteur(asset, historique, email, correlation=self.instantane.correlation)
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# Les modules de l'application sont importés à plat depuis App/, comme au lancement de StreamlitApp.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "App"))
+
+
+class ServeurDeribitFactice:
+    """
+    Serveur HTTP local imitant public/get_tradingview_chart_data (bougies d'une minute, prix = minute).
+    :param en_erreur: Instruments pour lesquels toute requête échoue (HTTP 500).
+    :param requetes_en_erreur: Rangs (à partir de 0, tous instruments confondus) des requêtes qui échouent.
+    """
+
+    def __init__(self, en_erreur=(), requetes_en_erreur=()):
+        self.requetes = []
+        self.en_erreur = set(en_erreur)
+        self.requetes_en_erreur = set(requetes_en_erreur)
+        self._verrou = threading.Lock()
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {cle: valeurs[0] for cle, valeurs in parse_qs(url.query).items()}
+                with serveur._verrou:
+                    rang = len(serveur.requetes)
+                    serveur.requetes.append((url.path, params))
+                if url.path != "/public/get_tradingview_chart_data":
+                    self.send_error(404)
+                    return
+                if params["instrument_name"] in serveur.en_erreur or rang in serveur.requetes_en_erreur:
+                    self.send_error(500)
+                    return
+                debut = -(-int(params["start_timestamp"]) // 60000) * 60000
+                ticks = list(range(debut, int(params["end_timestamp"]) + 1, 60000))
+                clotures = [tick / 60000 for tick in ticks]
+                corps = json.dumps({"result": {"ticks": ticks, "close": clotures, "status": "ok"}}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._serveur = ThreadingHTTPServer(("127.0.0.1", 0), Gestionnaire)
+        self.base_url = f"http://127.0.0.1:{self._serveur.server_address[1]}"
+        threading.Thread(target=self._serveur.serve_forever, daemon=True).start()
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
+
+
+@pytest.fixture
+def serveur_deribit():
+    """Fabrique de serveurs Deribit factices, arrêtés à la fin du test."""
+    serveurs = []
+
+    def creer(**kwargs):
+        serveur = ServeurDeribitFactice(**kwargs)
+        serveurs.append(serveur)
+        return serveur
+
+    yield creer
+    for serveur in serveurs:
+        serveur.arreter()
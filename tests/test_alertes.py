@@ -0,0 +1,39 @@
+from alertes import DECLENCHEE, MoteurAlertes, PuitsEmail, RegleSeuil
+
+
+class RepartiteurFactice:
+    def __init__(self):
+        self.messages = []
+
+    def soumettre_message(self, destinataire, sujet, corps_html):
+        self.messages.append((destinataire, sujet))
+
+
+def test_regles_d_un_proprietaire_retirees_avec_leurs_etats():
+    moteur = MoteurAlertes([RegleSeuil(0.9, nom="permanente")])
+    moteur.ajouter_regle(RegleSeuil(0.5), "session-1")
+    moteur.ajouter_regle(RegleSeuil(0.5), "session-2")
+    moteur.ajouter_regle(RegleSeuil(0.7), "session-1")
+    assert [alerte.regle for alerte in moteur.evaluer("BTC", 1.0, 0.8)] == ["seuil_hausse_0.5", "seuil_hausse_0.7"]
+
+    # La règle partagée reste évaluée pour l'autre session, avec son état (toujours active : pas de nouvelle alerte)
+    assert moteur.retirer_regles("session-1") == ["seuil_hausse_0.7"]
+    assert [regle.nom for regle in moteur.regles] == ["permanente", "seuil_hausse_0.5"]
+    assert moteur.proprietaires("seuil_hausse_0.5") == {"session-2"}
+    assert moteur.evaluer("BTC", 2.0, 0.8) == []
+    assert moteur.actives() == [("BTC", "seuil_hausse_0.5")]
+
+    assert moteur.retirer_regles("session-2") == ["seuil_hausse_0.5"]
+    assert moteur.retirer_regles(None) == []
+    assert [regle.nom for regle in moteur.regles] == ["permanente"]
+    assert [alerte.etat for alerte in moteur.evaluer("BTC", 3.0, 0.95)] == [DECLENCHEE]
+
+
+def test_puits_email_par_alerte():
+    repartiteur = RepartiteurFactice()
+    moteur = MoteurAlertes(puits=[PuitsEmail(repartiteur, lambda alerte: [f"{alerte.regle}@exemple.fr"])])
+    moteur.ajouter_regle(RegleSeuil(0.5), "session-1")
+
+    moteur.evaluer("BTC", 1.0, 0.8)
+
+    assert repartiteur.messages == [("seuil_hausse_0.5@exemple.fr", "Alerte de volatilité - BTC - seuil_hausse_0.5")]
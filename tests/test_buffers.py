@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from buffers import HistoriqueVolatilite, RingBufferPrix, reduire_minmax
+
+
+def remplir(buffer, debut, fin):
+    for i in range(debut, fin):
+        buffer.append(float(i), 100.0 + i)
+
+
+def test_remplissage_partiel():
+    buffer = RingBufferPrix(5)
+    assert len(buffer) == 0 and buffer.dernier() is None
+    remplir(buffer, 0, 3)
+    assert len(buffer) == 3
+    np.testing.assert_array_equal(buffer.timestamps(), [0.0, 1.0, 2.0])
+    np.testing.assert_array_equal(buffer.prix(2), [101.0, 102.0])
+    assert buffer.dernier() == (2.0, 102.0)
+
+
+@pytest.mark.parametrize("nb_points", [5, 6, 12, 13])
+def test_rebouclage_conserve_les_derniers_points_dans_l_ordre(nb_points):
+    buffer = RingBufferPrix(5)
+    remplir(buffer, 0, nb_points)
+    attendus = np.arange(nb_points - 5, nb_points, dtype=np.float64)
+    np.testing.assert_array_equal(buffer.timestamps(), attendus)
+    np.testing.assert_array_equal(buffer.prix(), 100.0 + attendus)
+    np.testing.assert_array_equal(buffer.timestamps(3), attendus[-3:])
+    assert buffer.dernier() == (attendus[-1], 100.0 + attendus[-1])
+
+
+def test_vues_sans_copie_en_lecture_seule():
+    buffer = RingBufferPrix(4)
+    remplir(buffer, 0, 7)
+    vue = buffer.prix()
+    assert vue.flags.c_contiguous and not vue.flags.owndata
+    with pytest.raises(ValueError):
+        vue[0] = 0.0
+
+
+@pytest.mark.parametrize("capacite", [2, 4, 10])
+def test_redimensionner_conserve_les_points_les_plus_recents(capacite):
+    buffer = RingBufferPrix(4)
+    remplir(buffer, 0, 7)
+    buffer.redimensionner(capacite)
+    attendus = np.arange(7 - min(capacite, 4), 7, dtype=np.float64)
+    assert buffer.capacite == capacite
+    np.testing.assert_array_equal(buffer.timestamps(), attendus)
+    assert buffer.nb_ajouts == 7
+
+    # Le buffer redimensionné reboucle normalement
+    remplir(buffer, 7, 7 + capacite)
+    np.testing.assert_array_equal(buffer.timestamps(), np.arange(7, 7 + capacite, dtype=np.float64))
+
+
+def test_capacite_invalide():
+    with pytest.raises(ValueError):
+        RingBufferPrix(0)
+
+
+@pytest.mark.parametrize("taille_lot", [1, 3, 4, 9])
+def test_extend_equivaut_a_des_ajouts_successifs(taille_lot):
+    reference, buffer = RingBufferPrix(4), RingBufferPrix(4)
+    remplir(reference, 0, 2 + taille_lot)
+    remplir(buffer, 0, 2)
+    lot = np.arange(2, 2 + taille_lot, dtype=np.float64)
+    buffer.extend(lot, 100.0 + lot)
+
+    np.testing.assert_array_equal(buffer.timestamps(), reference.timestamps())
+    np.testing.assert_array_equal(buffer.prix(), reference.prix())
+    assert buffer.nb_ajouts == reference.nb_ajouts == 2 + taille_lot
+
+    # Les ajouts suivants rebouclent à partir de la bonne position
+    remplir(buffer, 2 + taille_lot, 5 + taille_lot)
+    remplir(reference, 2 + taille_lot, 5 + taille_lot)
+    np.testing.assert_array_equal(buffer.timestamps(), reference.timestamps())
+
+
+def test_historique_volatilite_borne():
+    historique = HistoriqueVolatilite(3)
+    for i in range(10):
+        historique.append(float(i), 0.01 * i)
+    assert len(historique) == 3
+    np.testing.assert_allclose(historique.volatilites(), [0.07, 0.08, 0.09])
+
+
+def test_reduction_minmax_conserve_les_extremes():
+    rng = np.random.default_rng(0)
+    valeurs = rng.normal(size=10007)
+    valeurs[1234], valeurs[8000] = 50.0, -50.0
+    timestamps = np.arange(len(valeurs), dtype=np.float64)
+
+    ts, reduites = reduire_minmax(timestamps, valeurs, 200)
+    assert len(reduites) <= 200 + 4
+    assert np.all(np.diff(ts) > 0)
+    np.testing.assert_array_equal(reduites, valeurs[ts.astype(int)])
+    assert {1234.0, 8000.0, 10006.0} <= set(ts)
+    assert reduites.max() == 50.0 and reduites.min() == -50.0
+
+
+def test_reduction_minmax_serie_courte_inchangee():
+    timestamps, valeurs = np.arange(10.0), np.arange(10.0)
+    ts, reduites = reduire_minmax(timestamps, valeurs, 100)
+    assert ts is timestamps and reduites is valeurs
+
+
+def test_colonnes_multiples():
+    buffer = RingBufferPrix(3, nb_colonnes=2)
+    assert buffer.nb_colonnes == 2 and RingBufferPrix(3).nb_colonnes is None
+    for i in range(5):
+        buffer.append(float(i), [i, 10.0 * i])
+    buffer.extend([5.0, 6.0], [[5.0, 50.0], [6.0, 60.0]])
+
+    assert buffer.prix().shape == (3, 2)
+    np.testing.assert_array_equal(buffer.prix()[:, 1], [40.0, 50.0, 60.0])
+    timestamp, valeur = buffer.dernier()
+    assert timestamp == 6.0
+    np.testing.assert_array_equal(valeur, [6.0, 60.0])
+
+    buffer.redimensionner(5)
+    assert buffer.nb_colonnes == 2
+    np.testing.assert_array_equal(buffer.prix()[:, 0], [4.0, 5.0, 6.0])
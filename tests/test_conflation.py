@@ -0,0 +1,40 @@
+import threading
+import time
+
+from conflation import FileConflation
+
+
+def test_une_valeur_en_attente_par_instrument():
+    file = FileConflation()
+    for i in range(5):
+        file.deposer("BTC", i)
+    file.deposer("ETH", "a")
+    assert len(file) == 2
+
+    assert file.vider(timeout=0) == {"BTC": 4, "ETH": "a"}
+    assert len(file) == 0
+    statistiques = file.statistiques()
+    assert (statistiques["recus"], statistiques["fusionnes"], statistiques["traites"]) == (6, 4, 2)
+    assert statistiques["profondeur"] == 0 and statistiques["profondeur_max"] == 2
+
+
+def test_retard_mesure_depuis_le_premier_depot_non_traite():
+    file = FileConflation()
+    file.deposer("BTC", 1)
+    time.sleep(0.05)
+    file.deposer("BTC", 2)  # La fusion ne réinitialise pas l'ancienneté de l'entrée
+    assert file.vider(timeout=0) == {"BTC": 2}
+    assert file.dernier_retard >= 0.05
+    assert file.retard_max == file.dernier_retard
+
+
+def test_vider_attend_un_depot():
+    file = FileConflation()
+    assert file.vider(timeout=0.01) == {}
+
+    minuterie = threading.Timer(0.05, file.deposer, ("BTC", 1))
+    minuterie.start()
+    debut = time.monotonic()
+    assert file.vider(timeout=5.0) == {"BTC": 1}
+    assert time.monotonic() - debut < 4.0
+    minuterie.join()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+
+import pytest
+import websockets
+from websockets.asyncio.server import serve
+
+import connexion as module_connexion
+from connexion import GestionnaireConnexions
+
+CANAL = "ticker.BTC-PERPETUAL.100ms"
+
+
+def notification(prix):
+    return json.dumps({"jsonrpc": "2.0", "method": "subscription",
+                       "params": {"channel": CANAL, "data": {"mark_price": prix, "timestamp": 0}}})
+
+
+class ServeurFactice:
+    """
+    Serveur WebSocket local répondant aux requêtes JSON-RPC du gestionnaire ; après la souscription,
+    `scenario(indice, connexion)` pilote les trames envoyées sur la indice-ième connexion.
+    """
+
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.nb_connexions = 0
+        self.requetes = []
+
+    async def gerer(self, connexion):
+        indice = self.nb_connexions
+        self.nb_connexions += 1
+        try:
+            async for message in connexion:
+                requete = json.loads(message)
+                self.requetes.append((indice, requete["method"]))
+                if requete["method"] == "public/test":
+                    continue
+                await connexion.send(json.dumps({"jsonrpc": "2.0", "id": requete["id"], "result": "ok"}))
+                if requete["method"] == "public/subscribe":
+                    await self.scenario(indice, connexion)
+        except websockets.ConnectionClosed:
+            pass
+
+
+async def executer(scenario, condition, intervalle_heartbeat=0, timeout=5.0):
+    """Lance le gestionnaire contre le serveur factice jusqu'à ce que condition(recus, serveur) soit vraie."""
+    serveur = ServeurFactice(scenario)
+    recus = []
+    async with serve(serveur.gerer, "127.0.0.1", 0) as serveur_ws:
+        port = serveur_ws.sockets[0].getsockname()[1]
+        gestionnaire = GestionnaireConnexions(f"ws://127.0.0.1:{port}", [CANAL],
+                                              on_message=lambda connexion, message: recus.append(message),
+                                              intervalle_heartbeat=intervalle_heartbeat)
+        tache = asyncio.create_task(gestionnaire._principal())
+        try:
+            async with asyncio.timeout(timeout):
+                while not condition(recus, serveur):
+                    await asyncio.sleep(0.01)
+        finally:
+            gestionnaire.arreter()
+            await asyncio.wait_for(tache, timeout)
+    return gestionnaire, serveur, recus
+
+
+@pytest.fixture(autouse=True)
+def reconnexion_rapide(monkeypatch):
+    monkeypatch.setattr(module_connexion, "DELAI_RECONNEXION_MIN", 0.01)
+
+
+def test_trame_invalide_ignoree_sans_coupure():
+    async def scenario(indice, connexion):
+        await connexion.send("{pas du json")
+        await connexion.send(json.dumps({"jsonrpc": "2.0", "id": None}) + "]")
+        await connexion.send(notification(100.0))
+
+    gestionnaire, serveur, recus = asyncio.run(executer(scenario, lambda recus, serveur: len(recus) >= 1))
+
+    assert recus == [notification(100.0)]
+    assert serveur.nb_connexions == 1
+    assert gestionnaire.reconnexions == 0
+
+
+def test_reconnexion_et_nouvelle_souscription_apres_fermeture():
+    async def scenario(indice, connexion):
+        await connexion.send(notification(100.0 + indice))
+        if indice == 0:
+            await connexion.close()
+
+    gestionnaire, serveur, recus = asyncio.run(executer(scenario, lambda recus, serveur: len(recus) >= 2))
+
+    assert recus == [notification(100.0), notification(101.0)]
+    assert serveur.nb_connexions == 2
+    assert gestionnaire.reconnexions == 1
+    # La nouvelle connexion souscrit de nouveau au canal du shard
+    assert [methode for indice, methode in serveur.requetes if indice == 1] == ["public/subscribe"]
+
+
+def test_connexion_muette_rouverte_et_heartbeat_repondu():
+    async def scenario(indice, connexion):
+        # Demande de test du heartbeat, puis silence : la lecture doit expirer et la connexion être rouverte
+        await connexion.send(json.dumps({"jsonrpc": "2.0", "method": "heartbeat", "params": {"type": "test_request"}}))
+
+    gestionnaire, serveur, recus = asyncio.run(
+        executer(scenario, lambda recus, serveur: serveur.nb_connexions >= 2 and len(serveur.requetes) >= 6,
+                 intervalle_heartbeat=0.1))
+
+    assert gestionnaire.reconnexions >= 1
+    assert [methode for indice, methode in serveur.requetes if indice == 0] == [
+        "public/set_heartbeat", "public/subscribe", "public/test"]
+
+
+def test_arret_concurrent_du_demarrage():
+    # arreter() appelé depuis un autre thread pendant que la boucle démarre ne lève jamais d'exception
+    for _ in range(50):
+        gestionnaire = GestionnaireConnexions("ws://127.0.0.1:9", [CANAL])
+        fil = threading.Thread(target=gestionnaire.executer)
+        fil.start()
+        gestionnaire.arreter()
+        fil.join(5)
+        assert not fil.is_alive()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from covariance import CovarianceEWMA
+from engine import MoteurVolatilite
+
+LAMBDA = 0.94
+
+
+def clotures_correlees(nb_barres=360, graine=3):
+    """Deux marches aléatoires log-normales corrélées, sur une grille de barres de 10 secondes."""
+    generateur = np.random.default_rng(graine)
+    chocs = generateur.standard_normal((nb_barres - 1, 2)) @ np.linalg.cholesky([[1.0, 0.6], [0.6, 1.0]]).T * 1e-3
+    log_prix = np.vstack([np.zeros(2), np.cumsum(chocs, axis=0)])
+    timestamps = 1_700_000_000.0 + 10.0 * np.arange(nb_barres)
+    return timestamps, 100.0 * np.exp(log_prix)
+
+
+def covariance_batch(clotures, lambda_factor=LAMBDA):
+    """Covariance EWMA en lot : le premier rendement amorce la matrice (variances = carrés), puis C = λC + (1-λ)rr'."""
+    rendements = np.diff(np.log(clotures), axis=0)
+    premier = rendements[0]
+    depart = (1 - lambda_factor) * np.outer(premier, premier)
+    np.fill_diagonal(depart, premier ** 2)
+    poids = (1 - lambda_factor) * lambda_factor ** np.arange(len(rendements) - 2, -1, -1)
+    return lambda_factor ** (len(rendements) - 1) * depart + (rendements[1:].T * poids) @ rendements[1:]
+
+
+def test_historiques_collectes_integres_ensemble():
+    timestamps, clotures = clotures_correlees()
+    covariance = CovarianceEWMA(LAMBDA)
+
+    # Préchauffage d'un actif après l'autre : rien n'est intégré avant integrer_historiques
+    covariance.ajouter_historique("A", timestamps, clotures[:, 0])
+    covariance.ajouter_historique("B", timestamps, clotures[:, 1])
+    assert covariance.nb_barres == 0
+
+    assert covariance.integrer_historiques() == len(timestamps)
+    assert covariance.amorce.tolist() == [True, True]
+    assert covariance.dernier_timestamp == timestamps[-1]
+    correlation = covariance.correlation()
+    assert np.isfinite(correlation).all()
+    np.testing.assert_allclose(covariance.matrice, covariance_batch(clotures), rtol=1e-10)
+    assert 0.4 < correlation[0, 1] < 0.8
+
+
+def test_actif_ajoute_apres_coup_rattrape():
+    timestamps, clotures = clotures_correlees()
+    covariance = CovarianceEWMA(LAMBDA)
+    covariance.ajouter_historique("A", timestamps, clotures[:, 0])
+    covariance.integrer_historiques()
+    bloc_a, nb_barres = covariance.matrice.copy(), covariance.nb_barres
+
+    # L'historique de B est entièrement antérieur à la dernière barre intégrée : il est rattrapé
+    covariance.ajouter_historique("B", timestamps, clotures[:, 1])
+    assert covariance.integrer_historiques() == 0
+
+    assert covariance.assets == ["A", "B"]
+    assert covariance.nb_barres == nb_barres
+    np.testing.assert_array_equal(covariance.matrice[:1, :1], bloc_a)
+    np.testing.assert_allclose(covariance.matrice, covariance_batch(clotures), rtol=1e-10)
+
+    # Les barres en direct suivantes mettent à jour les deux actifs
+    covariance.ajouter_barre("A", timestamps[-1] + 10, clotures[-1, 0] * 1.001)
+    assert covariance.ajouter_barre("B", timestamps[-1] + 10, clotures[-1, 1] * 1.002) == 1
+    assert np.isfinite(covariance.correlation()).all()
+
+
+def test_prechauffage_du_moteur_amorce_la_correlation(serveur_deribit):
+    deribit = serveur_deribit()
+    moteur = MoteurVolatilite(["BTC-PERPETUAL", "ETH-PERPETUAL"], intervalle=60, covariance=True)
+
+    resultats = dict(moteur.prechauffer(duree_secondes=3600, base_url=deribit.base_url, requetes_par_seconde=None))
+
+    assert all(nb_points > 0 for nb_points in resultats.values())
+    covariance = moteur.covariance
+    assert covariance.amorce.all() and covariance.nb_barres >= 58
+    assert np.isfinite(covariance.correlation()).all()
+    # Le serveur factice sert les mêmes bougies d'une minute (prix = minute) pour les deux actifs
+    params = deribit.requetes[0][1]
+    minutes = np.arange(-(-int(params["start_timestamp"]) // 60000), int(params["end_timestamp"]) // 60000 + 1)
+    clotures = np.repeat(minutes[:covariance.nb_barres + 1, None], 2, axis=1).astype(np.float64)
+    np.testing.assert_allclose(covariance.matrice, covariance_batch(clotures), rtol=1e-6)
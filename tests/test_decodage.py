@@ -0,0 +1,51 @@
+import json
+import logging
+
+from decodage import LogLimite, construire_dispatch, decoder_message
+
+
+def notification(channel, mark_price, timestamp=1700000000123):
+    return json.dumps({"jsonrpc": "2.0", "method": "subscription",
+                       "params": {"channel": channel, "data": {"mark_price": mark_price, "timestamp": timestamp}}})
+
+
+def test_decodage_d_une_notification_ticker():
+    decoded = decoder_message(notification("ticker.BTC-PERPETUAL.raw", 64000.5))
+    assert decoded.channel == "ticker.BTC-PERPETUAL.raw"
+    assert decoded.mark_price == 64000.5
+    assert decoded.timestamp == 1700000000.123
+
+
+def test_trames_non_ticker_sans_prix():
+    trames = (
+        {"jsonrpc": "2.0", "id": 1, "result": ["ticker.BTC-PERPETUAL.raw"]},
+        {"jsonrpc": "2.0", "method": "heartbeat", "params": {"type": "test_request"}},
+        {"jsonrpc": "2.0", "method": "subscription", "params": {"channel": "book.BTC-PERPETUAL.raw", "data": [1, 2]}},
+    )
+    for trame in trames:
+        decoded = decoder_message(json.dumps(trame))
+        assert decoded.channel is None and decoded.mark_price is None and decoded.timestamp is None
+
+
+def test_aiguillage_par_canal():
+    dispatch = construire_dispatch(["BTC-PERPETUAL", "ETH-PERPETUAL"])
+    assert dispatch == {"ticker.BTC-PERPETUAL.raw": "BTC-PERPETUAL", "ticker.ETH-PERPETUAL.raw": "ETH-PERPETUAL"}
+    decoded = decoder_message(notification("ticker.ETH-PERPETUAL.raw", 3000.0))
+    assert dispatch.get(decoded.channel) == "ETH-PERPETUAL"
+    assert dispatch.get("ticker.SOL-PERPETUAL.raw") is None
+
+
+def test_journalisation_limitee_par_cle(caplog):
+    journal = logging.getLogger("test_decodage")
+    limite = LogLimite(intervalle=60.0, journal=journal)
+    with caplog.at_level(logging.WARNING, logger="test_decodage"):
+        for _ in range(5):
+            limite.log(logging.WARNING, "a", "message a")
+        limite.log(logging.WARNING, "b", "message b")
+    assert [r.getMessage() for r in caplog.records] == ["message a", "message b"]
+
+    # Les messages supprimés sont signalés avec le suivant, une fois l'intervalle écoulé
+    limite.intervalle = 0.0
+    with caplog.at_level(logging.WARNING, logger="test_decodage"):
+        limite.log(logging.WARNING, "a", "message a")
+    assert caplog.records[-1].getMessage() == "message a (4 messages similaires ignorés)"
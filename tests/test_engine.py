@@ -0,0 +1,67 @@
+import math
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from engine import MoteurVolatilite
+
+ASSETS = ["BTC-PERPETUAL", "ETH-PERPETUAL"]
+CANAUX = [f"ticker.{asset}.raw" for asset in ASSETS]
+
+
+def prix_direct(asset, timestamp):
+    # Même tendance que les bougies du serveur factice (prix = minute), avec une oscillation propre à chaque actif
+    oscillation = math.sin(timestamp / 37) if asset == ASSETS[0] else math.cos(timestamp / 53)
+    return timestamp / 60 * (1 + 0.001 * oscillation)
+
+
+def ticks_directs(debut, fin, pas=20):
+    return [(asset, ts, prix_direct(asset, ts)) for ts in range(debut, fin, pas) for asset in ASSETS]
+
+
+@pytest.fixture
+def deribit(serveur_deribit):
+    return serveur_deribit()
+
+
+def test_coupure_rattrapee_une_seule_fois(deribit):
+    t0 = (int(time.time()) // 60 - 60) * 60
+    avant, pendant, apres = ticks_directs(t0, t0 + 620), ticks_directs(t0 + 1800, t0 + 1900), ticks_directs(t0 + 1900, t0 + 2400)
+    moteur = MoteurVolatilite(ASSETS, intervalle=60, covariance=True, api_url=deribit.base_url)
+    for asset, ts, prix in avant:
+        moteur.traiter_tick(asset, ts, prix)
+
+    moteur.on_deconnecte(CANAUX)
+    with moteur.verrou:
+        # Les ticks reçus dès la reconnexion sont mis de côté jusqu'à la fin du rattrapage
+        moteur.on_connecte(CANAUX)
+        for asset, ts, prix in pendant:
+            moteur.traiter_tick(asset, ts, prix)
+    for fil in [fil for fil in threading.enumerate() if fil.name.startswith("rattrapage-")]:
+        fil.join(10)
+    for asset, ts, prix in apres:
+        moteur.traiter_tick(asset, ts, prix)
+    assert sorted(params["instrument_name"] for _, params in deribit.requetes) == ASSETS
+
+    # Référence sans coupure : les bougies d'une minute de la coupure (strictement entre le dernier tick avant
+    # la coupure et le premier tick après) arrivent dans le flux, chacune une seule fois
+    reference = MoteurVolatilite(ASSETS, intervalle=60, covariance=True)
+    bougies = [(asset, ts, ts / 60) for ts in range(t0 + 660, t0 + 1800, 60) for asset in ASSETS]
+    for asset, ts, prix in avant + bougies + pendant + apres:
+        reference.traiter_tick(asset, ts, prix)
+
+    for asset in ASSETS:
+        etat, attendu = moteur.etat_ewma(asset), reference.etat_ewma(asset)
+        assert etat.nb_rendements == attendu.nb_rendements
+        np.testing.assert_allclose(etat.variances, attendu.variances, rtol=1e-10)
+        assert len(moteur.buffer_prix(asset)) == len(reference.buffer_prix(asset))
+    assert moteur.covariance.nb_barres == reference.covariance.nb_barres
+    np.testing.assert_allclose(moteur.covariance.matrice, reference.covariance.matrice, rtol=1e-10, atol=1e-30)
+
+    # Une nouvelle connexion sans coupure intermédiaire ne rejoue rien
+    instantane = moteur.covariance.matrice.copy()
+    moteur.on_connecte(CANAUX)
+    assert not [fil for fil in threading.enumerate() if fil.name.startswith("rattrapage-")]
+    np.testing.assert_array_equal(moteur.covariance.matrice, instantane)
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from ewma import BanqueEWMA, calculer_variance_ewma_batch, filtrer_ewma_batch, lambda_depuis_demi_vie
+
+LAMBDAS = (0.94, 0.97, 0.99)
+
+
+def marche_aleatoire(n, graine=0):
+    rendements = np.random.default_rng(graine).normal(0.0, 1e-3, n)
+    return 50000.0 * np.exp(np.cumsum(rendements))
+
+
+def test_mise_a_jour_incrementale_egale_au_calcul_par_lot():
+    prix = marche_aleatoire(5000)
+    banque = BanqueEWMA(LAMBDAS)
+    assert banque.mettre_a_jour(prix[0]) is None
+    incrementales = np.stack([banque.mettre_a_jour(p).copy() for p in prix[1:]], axis=-1)
+
+    # Même amorçage que la banque : la variance de départ est le carré du premier rendement
+    premier = np.log(prix[1] / prix[0]) ** 2
+    lot = calculer_variance_ewma_batch(prix[1:], np.array(LAMBDAS), variance_initiale=np.full((len(LAMBDAS),), premier))
+
+    assert incrementales.shape == (len(LAMBDAS), len(prix) - 1)
+    np.testing.assert_allclose(incrementales[:, 1:], lot, rtol=1e-12, atol=1e-15)
+    assert banque.nb_rendements == len(prix) - 1
+
+
+def test_rejouer_equivaut_aux_mises_a_jour_successives():
+    prix = marche_aleatoire(3000, graine=1)
+    reference = BanqueEWMA(LAMBDAS)
+    for p in prix:
+        reference.mettre_a_jour(p)
+
+    banque = BanqueEWMA(LAMBDAS)
+    for p in prix[:100]:
+        banque.mettre_a_jour(p)
+    variances = banque.rejouer(prix[100:])
+
+    assert variances.shape == (len(LAMBDAS), len(prix) - 100)
+    np.testing.assert_allclose(banque.variances, reference.variances, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(variances[:, -1], reference.variances, rtol=1e-12, atol=1e-15)
+    assert banque.nb_rendements == reference.nb_rendements
+    assert banque.dernier_prix == reference.dernier_prix
+
+
+def test_prix_invalides_ignores():
+    banque = BanqueEWMA(LAMBDAS)
+    for p in (100.0, float("nan"), 0.0, -1.0, 101.0):
+        banque.mettre_a_jour(p)
+    assert banque.nb_rendements == 1
+    assert banque.variance == pytest.approx(np.log(101.0 / 100.0) ** 2)
+
+
+def test_noyau_par_lot_plusieurs_facteurs_et_actifs():
+    prix = np.stack([marche_aleatoire(500, graine=g) for g in range(3)])
+    lambdas = np.array([0.9, 0.94, 0.99])
+    lot = calculer_variance_ewma_batch(prix, lambdas)
+
+    assert lot.shape == (3, 3, 499)
+    for a in range(3):
+        for l, lam in enumerate(lambdas):
+            np.testing.assert_allclose(lot[a, l], calculer_variance_ewma_batch(prix[a], lam), rtol=1e-12, atol=1e-15)
+
+
+@pytest.mark.parametrize("lambda_factor", [0.5, 0.94, 0.9999])
+def test_noyau_par_lot_egal_a_la_recursion(lambda_factor):
+    # Série plus longue qu'un bloc pour couvrir les raccords entre blocs
+    prix = marche_aleatoire(20000, graine=2)
+    carres = np.diff(np.log(prix)) ** 2
+    attendu = np.empty_like(carres)
+    variance = 1e-6
+    for t, carre in enumerate(carres):
+        variance = lambda_factor * variance + (1.0 - lambda_factor) * carre
+        attendu[t] = variance
+    lot = calculer_variance_ewma_batch(prix, lambda_factor, variance_initiale=1e-6)
+    np.testing.assert_allclose(lot, attendu, rtol=1e-12, atol=1e-15)
+
+
+def test_demi_vie():
+    lam = lambda_depuis_demi_vie(600, 10)
+    assert lam ** 60 == pytest.approx(0.5)
+    with pytest.raises(ValueError):
+        lambda_depuis_demi_vie(0, 10)
+
+
+@pytest.mark.parametrize("lambda_factor", [0.5, 0.94, 0.9999])
+def test_filtre_par_blocs_egal_a_la_recursion(lambda_factor):
+    termes = np.random.default_rng(2).exponential(1e-6, 20000)
+    attendu = np.empty_like(termes)
+    variance = 1e-6
+    for t, terme in enumerate(termes):
+        variance = lambda_factor * variance + (1.0 - lambda_factor) * terme
+        attendu[t] = variance
+    np.testing.assert_allclose(filtrer_ewma_batch(termes, lambda_factor, 1e-6), attendu, rtol=1e-12, atol=1e-15)
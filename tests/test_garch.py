@@ -0,0 +1,82 @@
+import math
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from garch import EtatGARCH, MIN_RENDEMENTS_GARCH, ParametresGARCH, ReajusteurGARCH, ajuster_garch
+
+VRAIS_PARAMETRES = ParametresGARCH(2e-8, 0.08, 0.9)
+
+
+def simuler_garch(n, parametres=VRAIS_PARAMETRES, graine=0):
+    rng = np.random.default_rng(graine)
+    omega, alpha, beta = parametres
+    variance = omega / (1.0 - alpha - beta)
+    rendements = np.empty(n)
+    for t in range(n):
+        rendements[t] = math.sqrt(variance) * rng.standard_normal()
+        variance = omega + alpha * rendements[t] ** 2 + beta * variance
+    return 50000.0 * np.exp(np.concatenate(([0.0], np.cumsum(rendements))))
+
+
+def test_ajustement_retrouve_les_parametres():
+    parametres, variance, duree = ajuster_garch(simuler_garch(5000))
+    assert parametres.alpha == pytest.approx(VRAIS_PARAMETRES.alpha, abs=0.04)
+    assert parametres.beta == pytest.approx(VRAIS_PARAMETRES.beta, abs=0.05)
+    persistance = parametres.alpha + parametres.beta
+    assert parametres.omega / (1.0 - persistance) == pytest.approx(1e-6, rel=0.5)
+    assert variance > 0 and duree >= 0
+
+
+def test_prevision_incrementale_egale_a_la_recursion():
+    prix = simuler_garch(200, graine=1)
+    etat = EtatGARCH(VRAIS_PARAMETRES, variance=1e-6, dernier_prix=prix[0])
+    for p in prix[1:]:
+        etat.mettre_a_jour(p)
+
+    variance = 1e-6
+    for r in np.diff(np.log(prix)):
+        variance = VRAIS_PARAMETRES.omega + VRAIS_PARAMETRES.alpha * r * r + VRAIS_PARAMETRES.beta * variance
+    assert etat.variance == pytest.approx(variance, rel=1e-12)
+    assert etat.nb_rendements == len(prix) - 1
+    assert etat.volatilite == pytest.approx(math.sqrt(variance))
+
+
+def test_un_seul_ajustement_en_cours_par_actif():
+    resultats = []
+    termine = threading.Event()
+
+    def on_resultat(asset, parametres, variance, marqueur):
+        resultats.append((asset, marqueur))
+        termine.set()
+
+    reajusteur = ReajusteurGARCH(on_resultat, max_workers=1)
+    try:
+        prix = simuler_garch(1000, graine=2)
+        assert not reajusteur.soumettre("BTC", prix[:MIN_RENDEMENTS_GARCH])  # Historique trop court
+        assert reajusteur.soumettre("BTC", prix, marqueur=7)
+        assert not reajusteur.soumettre("BTC", prix)
+        assert termine.wait(60)
+    finally:
+        reajusteur.arreter()
+
+    assert resultats == [("BTC", 7)]
+    assert "BTC" in reajusteur.parametres
+    statistiques = reajusteur.statistiques()
+    assert statistiques["ajustements"] == 1 and statistiques["echecs"] == 0
+    assert statistiques["latence_max"] >= statistiques["duree_ajustement"] > 0
+
+
+def test_soumission_refusee_libere_l_actif():
+    reajusteur = ReajusteurGARCH(lambda *args: None, max_workers=1)
+    executeur = reajusteur._executeur = ProcessPoolExecutor(max_workers=1)
+    executeur.shutdown()
+
+    assert not reajusteur.soumettre("BTC", simuler_garch(200, graine=4))
+
+    # L'actif n'est pas bloqué « en cours » et le pool arrêté sera remplacé à la prochaine soumission
+    assert reajusteur._en_cours == set()
+    assert reajusteur._executeur is None
+    assert reajusteur.statistiques()["echecs"] == 1
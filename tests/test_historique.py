@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from historique import CacheHistorique, charger_historiques
+
+
+@pytest.fixture
+def deribit(serveur_deribit):
+    return serveur_deribit(en_erreur={"KO-PERPETUAL"})
+
+
+def charger(deribit, assets, **kwargs):
+    return dict(charger_historiques(assets, base_url=deribit.base_url, requetes_par_seconde=None, **kwargs))
+
+
+def test_chargement_parallele_de_tous_les_actifs(deribit):
+    historiques = charger(deribit, ["BTC-PERPETUAL", "ETH-PERPETUAL"], duree_secondes=3600)
+
+    assert set(historiques) == {"BTC-PERPETUAL", "ETH-PERPETUAL"}
+    for historique in historiques.values():
+        assert len(historique) in (60, 61)
+        timestamps = [item["timestamp"] for item in historique]
+        assert timestamps == sorted(set(timestamps))
+        assert all(item["mark_price"] == item["timestamp"] / 60 == item["open"] for item in historique)
+
+
+def test_longue_plage_decoupee_sans_doublon(deribit):
+    historique = charger(deribit, ["BTC-PERPETUAL"], duree_secondes=3 * 24 * 3600)["BTC-PERPETUAL"]
+
+    # 4320 minutes demandées par morceaux de 1000 bougies, bougies de jonction dédoublonnées
+    assert len([requete for requete in deribit.requetes if requete[1]["instrument_name"] == "BTC-PERPETUAL"]) == 5
+    timestamps = [item["timestamp"] for item in historique]
+    assert timestamps == sorted(set(timestamps))
+    assert len(historique) in (4320, 4321)
+
+
+def test_erreur_http_isolee_a_un_actif(deribit):
+    historiques = charger(deribit, ["KO-PERPETUAL", "BTC-PERPETUAL"], duree_secondes=3600)
+
+    assert historiques["KO-PERPETUAL"] == []
+    assert len(historiques["BTC-PERPETUAL"]) in (60, 61)
+
+
+def test_cache_ne_telecharge_que_la_fin(deribit, tmp_path):
+    cache = CacheHistorique(str(tmp_path))
+    premier = charger(deribit, ["BTC-PERPETUAL"], duree_secondes=3600, cache=cache)["BTC-PERPETUAL"]
+    deribit.requetes.clear()
+
+    second = charger(deribit, ["BTC-PERPETUAL"], duree_secondes=3600, cache=cache)["BTC-PERPETUAL"]
+
+    # Seuls le bord de la fenêtre glissante et la dernière bougie en cache (éventuellement incomplète) sont redemandés
+    debut_cache, fin_cache = int(premier[0]["timestamp"] * 1000), int(premier[-1]["timestamp"] * 1000)
+    for _, params in deribit.requetes:
+        debut, fin = int(params["start_timestamp"]), int(params["end_timestamp"])
+        assert fin <= debut_cache or debut >= fin_cache
+    assert any(int(params["start_timestamp"]) == fin_cache for _, params in deribit.requetes)
+    timestamps = [item["timestamp"] for item in second]
+    assert timestamps == sorted(set(timestamps))
+    assert set(timestamps) >= {item["timestamp"] for item in premier if item["timestamp"] >= timestamps[0]}
+
+
+def test_plage_avec_requete_en_echec_non_mise_en_cache(serveur_deribit, tmp_path):
+    deribit = serveur_deribit(requetes_en_erreur={2})
+    cache = CacheHistorique(str(tmp_path))
+
+    troue = charger(deribit, ["BTC-PERPETUAL"], duree_secondes=3 * 24 * 3600, cache=cache)["BTC-PERPETUAL"]
+
+    # Le troisième morceau de 1000 bougies manque : le reste est retourné, mais rien n'est écrit dans le cache
+    assert 3000 <= len(troue) <= 3321
+    assert not os.path.exists(cache.chemin("BTC-PERPETUAL"))
+
+    complet = charger(deribit, ["BTC-PERPETUAL"], duree_secondes=3 * 24 * 3600, cache=cache)["BTC-PERPETUAL"]
+
+    timestamps = [item["timestamp"] for item in complet]
+    assert timestamps == sorted(set(timestamps))
+    assert len(complet) in (4320, 4321)
+    assert os.path.exists(cache.chemin("BTC-PERPETUAL"))
+
+
+def test_plage_avec_requete_en_echec_sans_cache(serveur_deribit):
+    deribit = serveur_deribit(requetes_en_erreur={0})
+
+    historique = charger(deribit, ["BTC-PERPETUAL"], duree_secondes=3 * 24 * 3600)["BTC-PERPETUAL"]
+
+    assert len(deribit.requetes) == 5
+    assert 3320 <= len(historique) <= 3321
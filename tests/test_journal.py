@@ -0,0 +1,110 @@
+import json
+
+import numpy as np
+import pytest
+
+from decodage import decoder_message
+from engine import MoteurVolatilite
+from journal import DTYPE_TICK, lire_journal, lire_ticks, ouvrir_journal
+from ordonnanceur import OrdonnanceurPredictions
+from rejeu import actifs_du_journal, generer_journal_synthetique, rejouer
+
+ASSETS = ["BTC-PERPETUAL", "ETH-PERPETUAL"]
+
+
+def notifications(nb_ticks, graine=0):
+    """Trames ticker synthétiques horodatées de manière déterministe, instruments entrelacés."""
+    rng = np.random.default_rng(graine)
+    prix = np.full(len(ASSETS), 100.0)
+    for i in range(nb_ticks):
+        indice = i % len(ASSETS)
+        prix[indice] *= np.exp(1e-4 * rng.standard_normal())
+        recu = 1700000000.0 + i / 20.0
+        yield recu, json.dumps({"jsonrpc": "2.0", "method": "subscription",
+                                "params": {"channel": f"ticker.{ASSETS[indice]}.raw",
+                                           "data": {"mark_price": float(prix[indice]), "timestamp": int(recu * 1000)}}})
+
+
+@pytest.fixture
+def journaux(tmp_path):
+    chemins = {}
+    for format_journal in ("ticks", "trames"):
+        chemin = chemins[format_journal] = str(tmp_path / f"{format_journal}.journal")
+        journal = ouvrir_journal(chemin, format_journal)
+        for recu, message in notifications(3000):
+            journal.enregistrer(message, decoder_message(message), recu)
+        journal.fermer()
+    return chemins
+
+
+def test_aller_retour_identique_dans_les_deux_formats(journaux):
+    ticks = list(lire_journal(journaux["ticks"]))
+    trames = list(lire_journal(journaux["trames"]))
+
+    assert len(ticks) == 3000
+    assert ticks == trames
+    assert [channel for _, channel, _, _ in ticks[:4]] == [f"ticker.{asset}.raw" for asset in ASSETS] * 2
+    assert actifs_du_journal(journaux["ticks"]) == actifs_du_journal(journaux["trames"]) == ASSETS
+
+
+def test_enregistrement_relu_a_l_identique(tmp_path):
+    chemin = str(tmp_path / "direct.journal")
+    messages = [
+        json.dumps({"jsonrpc": "2.0", "id": 3, "result": ["ticker.BTC-PERPETUAL.raw"]}),
+        json.dumps({"jsonrpc": "2.0", "method": "subscription",
+                    "params": {"channel": "ticker.BTC-PERPETUAL.raw", "data": {"mark_price": 64000.5, "timestamp": 1700000000123}}}),
+    ]
+    journal = ouvrir_journal(chemin, "ticks")
+    for i, message in enumerate(messages):
+        journal.enregistrer(message, decoder_message(message), 1700000001.0 + i)
+    journal.fermer()
+
+    # La réponse JSON-RPC n'est pas journalisée ; une ligne incomplète (écriture interrompue) est ignorée
+    with open(chemin, "ab") as fichier:
+        fichier.write(b"\x00" * (DTYPE_TICK.itemsize - 1))
+    assert list(lire_journal(chemin)) == [(1700000002.0, "ticker.BTC-PERPETUAL.raw", 1700000000.123, 64000.5)]
+    assert len(lire_ticks(chemin)[1]) == 1
+
+
+def test_format_inconnu(tmp_path):
+    with pytest.raises(ValueError):
+        ouvrir_journal(str(tmp_path / "x.journal"), "csv")
+
+
+def test_journal_synthetique(tmp_path):
+    chemin = str(tmp_path / "synthetique.journal")
+    generer_journal_synthetique(chemin, ASSETS, 100)
+    ticks = list(lire_journal(chemin))
+    assert len(ticks) == 100
+    assert [recu for recu, _, _, _ in ticks] == sorted(recu for recu, _, _, _ in ticks)
+    assert actifs_du_journal(chemin) == ASSETS
+
+
+def test_rejeu_equivalent_a_l_ingestion_directe(journaux):
+    options = {"data_window": 50, "intervalle": 5.0}
+    moteurs = {format_journal: MoteurVolatilite(ASSETS, **options) for format_journal in journaux}
+    for format_journal, moteur in moteurs.items():
+        assert rejouer(moteur, journaux[format_journal]) == 3000
+
+    direct = MoteurVolatilite(ASSETS, **options)
+    direct.ordonnanceur = OrdonnanceurPredictions(direct.intervalle, direct.assets, debut=1700000000.0)
+    for recu, message in notifications(3000):
+        decoded = decoder_message(message)
+        direct.ingerer(decoded.channel, decoded.timestamp, decoded.mark_price, maintenant=recu)
+
+    for asset in ASSETS:
+        attendu = direct.historique_volatilite(asset)
+        assert len(attendu) > 0
+        for moteur in moteurs.values():
+            obtenu = moteur.historique_volatilite(asset)
+            np.testing.assert_array_equal(obtenu.timestamps(), attendu.timestamps())
+            np.testing.assert_array_equal(obtenu.volatilites(), attendu.volatilites())
+
+
+def test_filtre_des_canaux(journaux):
+    canaux = {"ticker.ETH-PERPETUAL.raw"}
+    for chemin in journaux.values():
+        ticks = list(lire_journal(chemin, canaux=canaux))
+        assert len(ticks) == 1500
+        assert {channel for _, channel, _, _ in ticks} == canaux
+    assert list(lire_journal(journaux["ticks"], canaux=canaux)) == list(lire_journal(journaux["trames"], canaux=canaux))
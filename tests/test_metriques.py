@@ -0,0 +1,55 @@
+import re
+import threading
+
+from metriques import Metriques
+
+
+def test_export_pendant_la_creation_de_nouvelles_cles():
+    metriques = Metriques()
+    arret = threading.Event()
+    erreurs = []
+
+    def ecrire():
+        indice = 0
+        while not arret.is_set():
+            metriques.observer(f"etape_{indice % 500}", 1000 * indice)
+            metriques.incrementer(f"compteur_{indice % 500}")
+            indice += 1
+
+    def lire():
+        try:
+            while not arret.is_set():
+                texte = metriques.format_prometheus()
+                # Chaque histogramme exporté est cohérent : le seau +Inf vaut le nombre d'observations
+                infinis = re.findall(r'etape="(\w+)",le="\+Inf"\} (\d+)', texte)
+                nombres = dict(re.findall(r'_count\{etape="(\w+)"\} (\d+)', texte))
+                assert all(nombres[etape] == nombre for etape, nombre in infinis)
+                metriques.resume()
+        except Exception as e:
+            erreurs.append(e)
+
+    fils = [threading.Thread(target=ecrire) for _ in range(2)] + [threading.Thread(target=lire)]
+    for fil in fils:
+        fil.start()
+    arret.wait(1.0)
+    arret.set()
+    for fil in fils:
+        fil.join()
+
+    assert erreurs == []
+    assert len(metriques.histogrammes) == len(metriques.compteurs) == 500
+
+
+def test_compteurs_et_jauges_exportes():
+    metriques = Metriques()
+    metriques.incrementer("messages", 3)
+    metriques.compteur_externe("reconnexions", lambda: 2)
+    metriques.jauge("profondeur_file", lambda: 5)
+    metriques.jauge("cassee", lambda: 1 / 0)
+
+    texte = metriques.format_prometheus()
+
+    assert "volatilite_messages_total 3" in texte
+    assert "volatilite_reconnexions_total 2" in texte
+    assert "volatilite_profondeur_file 5.0" in texte
+    assert "cassee" not in texte
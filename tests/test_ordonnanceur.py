@@ -0,0 +1,32 @@
+from ordonnanceur import OrdonnanceurPredictions
+
+
+def test_echeances_propres_a_chaque_actif():
+    ordonnanceur = OrdonnanceurPredictions(10.0, ["A", "B"], debut=100.0)
+    ordonnanceur.ajouter("C", 105.0)
+    assert len(ordonnanceur) == 3
+
+    assert ordonnanceur.actifs_dus(99.0) == []
+    assert sorted(ordonnanceur.actifs_dus(100.0)) == ["A", "B"]
+    assert ordonnanceur.actifs_dus(104.0) == []
+    assert ordonnanceur.actifs_dus(105.0) == ["C"]
+    assert sorted(ordonnanceur.actifs_dus(110.0)) == ["A", "B"]
+    assert ordonnanceur.actifs_dus(114.9) == []
+    assert ordonnanceur.actifs_dus(115.0) == ["C"]
+
+
+def test_creneaux_manques_sautes_sans_rafale():
+    ordonnanceur = OrdonnanceurPredictions(10.0, ["A"], debut=100.0)
+    # Réveil très en retard : l'actif n'est dû qu'une fois et reste aligné sur sa grille
+    assert ordonnanceur.actifs_dus(137.0) == ["A"]
+    assert ordonnanceur.actifs_dus(139.9) == []
+    assert ordonnanceur.actifs_dus(140.0) == ["A"]
+
+
+def test_replanification_remplace_l_echeance():
+    ordonnanceur = OrdonnanceurPredictions(10.0, ["A"], debut=100.0)
+    ordonnanceur.ajouter("A", 150.0)
+    assert len(ordonnanceur) == 1
+    # L'ancienne échéance est ignorée
+    assert ordonnanceur.actifs_dus(120.0) == []
+    assert ordonnanceur.actifs_dus(150.0) == ["A"]
@@ -0,0 +1,169 @@
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from buffers import RingBufferPrix
+from engine import MoteurVolatilite
+from journal import lire_journal
+from partition import PublieurTable, TableVolatilites, banc_essai_reparti, partitionner
+from rejeu import generer_journal_synthetique, rejouer
+
+ASSETS = [f"SYN{i}-PERPETUAL" for i in range(6)]
+OPTIONS = {"data_window": 50, "intervalle": 5.0, "lambdas": (0.97, 0.99)}
+
+
+@pytest.fixture
+def table():
+    table = TableVolatilites.creer(4, capacite=8, nb_lambdas=2)
+    yield table
+    table.fermer()
+
+
+def test_partition_en_tourniquet():
+    partitions = partitionner(7, 3)
+    assert partitions == [[0, 3, 6], [1, 4], [2, 5]]
+    assert sorted(i for partition in partitions for i in partition) == list(range(7))
+
+
+@pytest.mark.parametrize("tailles_lots", [[1] * 20, [3, 1, 9, 1, 2], [20]])
+def test_historique_partage_egal_au_buffer_circulaire(table, tailles_lots):
+    reference = RingBufferPrix(8)
+    valeurs = np.arange(sum(tailles_lots), dtype=np.float64)
+    debut = 0
+    for taille in tailles_lots:
+        lot = valeurs[debut:debut + taille]
+        table.publier(1, 1000.0 + lot, 0.01 * lot, dernier_prix=lot[-1], nb_ticks=debut + taille)
+        reference.extend(1000.0 + lot, 0.01 * lot)
+        debut += taille
+
+    historique = table.historique(1)
+    assert len(historique) == len(reference) and historique.nb_ajouts == len(valeurs)
+    np.testing.assert_array_equal(historique.timestamps(), reference.timestamps())
+    np.testing.assert_array_equal(historique.volatilites(3), reference.prix(3))
+    assert historique.dernier() == reference.dernier()
+    ligne = table.lire(1)
+    assert ligne["nb_ticks"] == len(valeurs) and ligne["volatilites"][0] == ligne["volatilite"]
+    # Les autres instruments ne sont pas touchés
+    assert table.lire(0)["nb_ajouts"] == 0 and table.historique(0).dernier() is None
+
+
+def test_publication_par_lot_egale_aux_publications_unitaires(table):
+    unitaire = TableVolatilites.creer(4, capacite=8, nb_lambdas=2)
+    try:
+        for k in range(11):
+            indices = [0, 2, 3] if k % 2 else [1, 2]
+            timestamps = [100.0 + k + i for i in indices]
+            volatilites = [0.01 * (k + i) for i in indices]
+            banques = [[v, 2 * v] for v in volatilites]
+            table.publier_lot(indices, timestamps, volatilites, banques, [float(k)] * len(indices), [k] * len(indices))
+            for i, t, v, b in zip(indices, timestamps, volatilites, banques):
+                unitaire.publier(i, [t], [v], b, float(k), k)
+        for i in range(4):
+            np.testing.assert_array_equal(table.historique(i).timestamps(), unitaire.historique(i).timestamps())
+            np.testing.assert_array_equal(table.historique(i).volatilites(), unitaire.historique(i).volatilites())
+            ligne, attendue = table.lire(i), unitaire.lire(i)
+            for champ in ligne.dtype.names:
+                np.testing.assert_array_equal(ligne[champ], attendue[champ])
+    finally:
+        unitaire.fermer()
+
+
+def test_lecture_reessayee_si_une_ecriture_l_a_entrecoupee(table):
+    lectures = []
+
+    def lecture():
+        lectures.append(int(table.lignes["sequence"][2]))
+        if len(lectures) == 1:
+            table.publier(2, [1.0], [0.5])  # Écriture complète pendant la lecture
+        return len(lectures)
+
+    assert table._lecture_coherente(2, lecture) == 2
+    assert lectures == [0, 2]
+
+
+def test_lecture_attend_la_fin_d_une_ecriture(table):
+    table.lignes["sequence"][0] = 1  # Écriture en cours
+    minuterie = threading.Timer(0.05, lambda: table.lignes["sequence"].__setitem__(0, 2))
+    minuterie.start()
+    assert table.lire(0)["sequence"] == 2
+    minuterie.join()
+
+
+def test_lectures_concurrentes_toujours_coherentes(table):
+    # L'écrivain publie des lignes dont tous les champs dérivent du même compteur
+    arret = threading.Event()
+
+    def ecrire():
+        k = 0
+        while not arret.is_set():
+            k += 1
+            table.publier(3, [float(k)], [float(k)], [float(k), float(k)], float(k), k)
+
+    intervalle = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    ecrivain = threading.Thread(target=ecrire)
+    ecrivain.start()
+    try:
+        for _ in range(5000):
+            ligne = table.lire(3)
+            if ligne["nb_ajouts"]:
+                k = float(ligne["nb_ticks"])
+                assert ligne["sequence"] % 2 == 0
+                assert ligne["timestamp"] == ligne["volatilite"] == ligne["dernier_prix"] == k
+                assert ligne["volatilites"].tolist() == [k, k]
+    finally:
+        arret.set()
+        ecrivain.join()
+        sys.setswitchinterval(intervalle)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    chemin = str(tmp_path / "univers.journal")
+    generer_journal_synthetique(chemin, ASSETS, 6000, frequence=60.0)
+    return chemin
+
+
+def test_mode_reparti_equivalent_au_moteur_unique(journal):
+    unique = MoteurVolatilite(ASSETS, **OPTIONS)
+    assert rejouer(unique, journal) == 6000
+
+    table = TableVolatilites.creer(len(ASSETS), capacite=500, nb_lambdas=len(unique.lambdas))
+    try:
+        nb_ticks = 0
+        for partition in partitionner(len(ASSETS), 3):
+            instruments = [ASSETS[i] for i in partition]
+            moteur = MoteurVolatilite(instruments, **OPTIONS)
+            moteur.abonner(PublieurTable(table, dict(zip(instruments, partition))))
+            nb_ticks += rejouer(moteur, journal, canaux={f"ticker.{asset}.raw" for asset in instruments})
+
+            for asset, indice in zip(instruments, partition):
+                # L'état EWMA d'un actif ne dépend que de ses propres ticks
+                attendu, obtenu = unique.etats_ewma[asset], moteur.etats_ewma[asset]
+                assert obtenu.nb_rendements == attendu.nb_rendements > 0
+                np.testing.assert_array_equal(obtenu.variances, attendu.variances)
+                np.testing.assert_array_equal(moteur.buffer_prix(asset).prix(), unique.buffer_prix(asset).prix())
+
+                # La table publie fidèlement l'historique du worker
+                historique, partage = moteur.historique_volatilite(asset), table.historique(indice)
+                assert partage.nb_ajouts == historique.nb_ajouts > 0
+                np.testing.assert_array_equal(partage.timestamps(), historique.timestamps())
+                np.testing.assert_array_equal(partage.volatilites(), historique.volatilites())
+                ligne = table.lire(indice)
+                np.testing.assert_allclose(ligne["volatilites"], moteur.historique_banque(asset).dernier()[1], rtol=1e-15)
+                # Dernier prix et nombre de ticks sont ceux du moment de la dernière estimation
+                prix = [tick[3] for tick in lire_journal(journal, canaux={f"ticker.{asset}.raw"})]
+                assert 0 < ligne["nb_ticks"] <= len(prix) == 1000
+                assert ligne["dernier_prix"] == prix[ligne["nb_ticks"] - 1]
+        assert nb_ticks == 6000
+    finally:
+        table.fermer()
+
+
+def test_banc_essai_reparti(journal):
+    resultats = banc_essai_reparti(journal, liste_workers=(2,), assets=ASSETS, capacite=100, **OPTIONS)
+    assert [resultat["workers"] for resultat in resultats] == [2]
+    assert resultats[0]["messages"] == 6000
+    assert resultats[0]["estimations"] > 0
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from plages import ESTIMATEURS_PLAGE, EtatPlageEWMA, termes_plage, variances_plage_ewma_batch
+
+SIGMA_BARRE = 1e-3
+
+
+def barres_browniennes(nb_barres, pas_par_barre=200, graine=0):
+    """Barres OHLC d'un mouvement brownien géométrique (variance SIGMA_BARRE² par barre, ouverture = clôture précédente)."""
+    rng = np.random.default_rng(graine)
+    increments = rng.normal(0.0, SIGMA_BARRE / np.sqrt(pas_par_barre), (nb_barres, pas_par_barre))
+    chemins = np.log(100.0) + np.cumsum(increments, axis=None).reshape(nb_barres, pas_par_barre)
+    ouvertures = np.concatenate(([np.log(100.0)], chemins[:-1, -1]))
+    hauts = np.maximum(chemins.max(axis=1), ouvertures)
+    bas = np.minimum(chemins.min(axis=1), ouvertures)
+    return tuple(np.exp(x) for x in (ouvertures, hauts, bas, chemins[:, -1]))
+
+
+def test_estimateurs_sans_biais_notable():
+    termes = termes_plage(*barres_browniennes(3000))
+    assert (termes >= 0).all()
+    variances = variances_plage_ewma_batch(*barres_browniennes(3000), lambda_factor=0.9999)
+    # Échantillonnage discret du chemin : le plus haut et le plus bas sont légèrement sous-estimés
+    np.testing.assert_allclose(variances[:, -1], SIGMA_BARRE ** 2, rtol=0.15)
+
+
+def test_mise_a_jour_incrementale_egale_au_calcul_par_lot():
+    o, h, l, c = barres_browniennes(2000, graine=1)
+    etat = EtatPlageEWMA(0.94)
+    incrementales = np.stack([etat.mettre_a_jour(*barre) for barre in zip(o, h, l, c)], axis=-1)
+
+    # Même amorçage que l'état incrémental : les moyennes partent des termes de la première barre
+    lot = variances_plage_ewma_batch(o, h, l, c, 0.94, variances_initiales=termes_plage(o[:1], h[:1], l[:1], c[:1])[:, 0])
+    assert incrementales.shape == lot.shape == (len(ESTIMATEURS_PLAGE), 2000)
+    np.testing.assert_allclose(incrementales, lot, rtol=1e-10, atol=1e-18)
+    assert etat.nb_barres == 2000
+
+
+def test_rejouer_puis_barres_en_direct():
+    o, h, l, c = barres_browniennes(3000, graine=2)
+    reference = EtatPlageEWMA(0.97)
+    for barre in zip(o, h, l, c):
+        reference.mettre_a_jour(*barre)
+
+    etat = EtatPlageEWMA(0.97)
+    etat.mettre_a_jour(o[0], h[0], l[0], c[0])
+    trajectoire = etat.rejouer(o[1:1500], h[1:1500], l[1:1500], c[1:1500])
+    assert trajectoire.shape == (len(ESTIMATEURS_PLAGE), 1499)
+    for barre in zip(o[1500:], h[1500:], l[1500:], c[1500:]):
+        etat.mettre_a_jour(*barre)
+
+    np.testing.assert_allclose(etat.variances, reference.variances, rtol=1e-10, atol=1e-18)
+    np.testing.assert_allclose(etat.volatilites, reference.volatilites, rtol=1e-10)
+    assert etat.nb_barres == reference.nb_barres == 3000
+    assert etat.derniere_cloture == reference.derniere_cloture
+
+
+def test_barre_incoherente_ignoree():
+    etat = EtatPlageEWMA(0.94)
+    assert etat.mettre_a_jour(100.0, 99.0, 101.0, 100.0) is None  # Plus haut sous le plus bas
+    assert etat.mettre_a_jour(100.0, 101.0, 0.0, 100.0) is None
+    variances = etat.mettre_a_jour(100.0, 101.0, 99.0, 100.5)
+    assert etat.nb_barres == 1
+    assert variances[0] == pytest.approx(np.log(101.0 / 99.0) ** 2 / (4 * np.log(2)))
@@ -0,0 +1,110 @@
+import email
+import email.policy
+import socket
+
+import numpy as np
+import pytest
+from aiosmtpd.controller import Controller
+
+from buffers import HistoriqueVolatilite
+from covariance import MatriceCorrelation
+from rapports import RepartiteurRapports, tableau_correlation_html
+
+EXPEDITEUR = "moteur@example.com"
+
+
+class BoiteReception:
+    """Gestionnaire aiosmtpd : conserve les messages reçus et refuse définitivement les destinataires `refuses`."""
+
+    def __init__(self, refuses=()):
+        self.messages = []
+        self.sessions = set()
+        self.refuses = set(refuses)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuses:
+            return "550 Destinataire inconnu"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append((envelope.rcpt_tos[0], email.message_from_bytes(envelope.content, policy=email.policy.default)))
+        return "250 Message accepté"
+
+
+def port_libre():
+    with socket.socket() as sonde:
+        sonde.bind(("127.0.0.1", 0))
+        return sonde.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    boite = BoiteReception(refuses={"inconnu@example.com"})
+    controleur = Controller(boite, hostname="127.0.0.1", port=port_libre())
+    controleur.start()
+    yield boite, controleur.port
+    controleur.stop()
+
+
+@pytest.fixture
+def repartiteur(smtp):
+    _, port = smtp
+    repartiteur = RepartiteurRapports(EXPEDITEUR, None, serveur_smtp="127.0.0.1", port_smtp=port, starttls=False,
+                                      seuil_piece_jointe=50, delai_nouvelle_tentative=0.01)
+    yield repartiteur
+    repartiteur.arreter()
+
+
+def historique(nb_points, lambdas=(0.94, 0.97)):
+    donnees = HistoriqueVolatilite(1000, nb_colonnes=len(lambdas), lambdas=lambdas)
+    donnees.extend(1.7e9 + 60.0 * np.arange(nb_points), np.full((nb_points, len(lambdas)), 0.01))
+    return donnees
+
+
+def test_lot_envoye_sur_une_seule_connexion(smtp, repartiteur):
+    boite, _ = smtp
+    for i in range(5):
+        repartiteur.soumettre(historique(10), f"analyste{i}@example.com", asset="BTC-PERPETUAL")
+    repartiteur.soumettre_message("analyste0@example.com", "Alerte BTC", "<p>Seuil franchi</p>")
+
+    assert repartiteur.attendre(timeout=10)
+    assert repartiteur.statistiques() == {"en_attente": 0, "envoyes": 6, "echecs": 0, "nouvelles_tentatives": 0,
+                                          "connexions": 1}
+    assert len(boite.messages) == 6
+    assert len(boite.sessions) == 1
+    sujets = [message["Subject"] for _, message in boite.messages]
+    assert sujets.count("Alerte BTC") == 1
+    assert all(sujet.endswith("BTC-PERPETUAL") for sujet in sujets if sujet != "Alerte BTC")
+
+
+def test_piece_jointe_au_dela_du_seuil(smtp, repartiteur):
+    boite, _ = smtp
+    repartiteur.soumettre(historique(10), "court@example.com")
+    repartiteur.soumettre(historique(200), "long@example.com", asset="ETH-PERPETUAL")
+
+    assert repartiteur.attendre(timeout=10)
+    pieces = {destinataire: [partie.get_filename() for partie in message.walk() if partie.get_filename()]
+              for destinataire, message in boite.messages}
+    assert pieces == {"court@example.com": [], "long@example.com": ["volatilites_ETH-PERPETUAL.csv.gz"]}
+
+
+def test_refus_definitif_non_reessaye(smtp, repartiteur):
+    boite, _ = smtp
+    repartiteur.soumettre(historique(10), "inconnu@example.com")
+    repartiteur.soumettre(historique(10), "analyste@example.com")
+
+    assert repartiteur.attendre(timeout=10)
+    statistiques = repartiteur.statistiques()
+    assert (statistiques["envoyes"], statistiques["echecs"], statistiques["nouvelles_tentatives"]) == (1, 1, 0)
+    assert [destinataire for destinataire, _ in boite.messages] == ["analyste@example.com"]
+
+
+def test_noms_d_actifs_echappes_dans_le_html():
+    correlation = MatriceCorrelation(("<b>BTC</b>", "ETH&CO"), np.eye(2))
+
+    tableau = tableau_correlation_html(correlation)
+
+    assert "<b>BTC</b>" not in tableau
+    assert "&lt;b&gt;BTC&lt;/b&gt;" in tableau and "ETH&amp;CO" in tableau
@@ -0,0 +1,54 @@
+import pytest
+
+from resampler import Barre, ResamplerBarres
+
+
+def test_barres_alignees_sur_la_grille():
+    resampler = ResamplerBarres(10)
+    assert resampler.ajouter(101.0, 100.0) == []
+    assert resampler.fin_barre == 110.0
+    assert resampler.ajouter(105.0, 103.0) == []
+    assert resampler.ajouter(110.0, 99.0) == []  # La borne droite appartient à la barre
+    barres = resampler.ajouter(112.0, 101.0)
+    assert barres == [Barre(110.0, 100.0, 103.0, 99.0, 99.0, 3)]
+    assert resampler.vider() == [Barre(120.0, 101.0, 101.0, 101.0, 101.0, 1)]
+    assert resampler.vider() == []
+
+
+def test_remplissage_par_prix_precedent():
+    resampler = ResamplerBarres(10)
+    resampler.ajouter(105.0, 100.0)
+    barres = resampler.ajouter(135.0, 130.0)
+    assert [b.timestamp for b in barres] == [110.0, 120.0, 130.0]
+    assert [b.close for b in barres] == [100.0, 100.0, 100.0]
+    assert [b.nb_ticks for b in barres] == [1, 0, 0]
+
+
+def test_remplissage_lineaire():
+    resampler = ResamplerBarres(10, politique="lineaire")
+    resampler.ajouter(110.0, 100.0)
+    barres = resampler.ajouter(140.0, 130.0)
+    assert [b.close for b in barres] == pytest.approx([100.0, 110.0, 120.0])
+
+
+def test_sans_remplissage():
+    resampler = ResamplerBarres(10, politique="aucun")
+    resampler.ajouter(105.0, 100.0)
+    barres = resampler.ajouter(135.0, 130.0)
+    assert [b.timestamp for b in barres] == [110.0]
+    assert resampler.fin_barre == 140.0
+
+
+def test_tick_en_retard_rattache_a_la_barre_en_cours():
+    resampler = ResamplerBarres(10)
+    resampler.ajouter(115.0, 100.0)
+    assert resampler.ajouter(108.0, 90.0) == []
+    assert resampler.dernier_timestamp == 115.0
+    assert resampler.vider() == [Barre(120.0, 100.0, 100.0, 90.0, 90.0, 2)]
+
+
+def test_parametres_invalides():
+    with pytest.raises(ValueError):
+        ResamplerBarres(0)
+    with pytest.raises(ValueError):
+        ResamplerBarres(10, politique="inconnue")
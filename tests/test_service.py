@@ -0,0 +1,70 @@
+import pytest
+
+import service as module_service
+from alertes import RegleSeuil
+from service import ServiceVolatilite
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setattr(module_service, "CACHE_HISTORIQUE_DIR", str(tmp_path))
+    rapports = []
+    service = ServiceVolatilite(rapporteur=lambda asset, historique, email, correlation=None: rapports.append((asset, email)))
+    service.rapports = rapports
+    yield service
+    service.arreter()
+
+
+def test_destinataire_retire_ne_recoit_plus_les_rapports(service):
+    service.ajouter_destinataire("BTC-PERPETUAL", "ancienne@exemple.fr")
+    service.retirer_destinataire("BTC-PERPETUAL", "ancienne@exemple.fr")
+    service.ajouter_destinataire("BTC-PERPETUAL", "nouvelle@exemple.fr")
+
+    service._envoyer_rapports("BTC-PERPETUAL", None)
+
+    assert service.rapports == [("BTC-PERPETUAL", "nouvelle@exemple.fr")]
+    assert service.destinataires_actif("BTC-PERPETUAL") == ["nouvelle@exemple.fr"]
+
+
+def test_adresse_partagee_par_deux_sessions(service):
+    service.ajouter_destinataire("ETH-PERPETUAL", "equipe@exemple.fr")
+    service.ajouter_destinataire("ETH-PERPETUAL", "equipe@exemple.fr")
+
+    # Une session change d'adresse : l'autre reste inscrite
+    service.retirer_destinataire("ETH-PERPETUAL", "equipe@exemple.fr")
+    assert service.destinataires_actif("ETH-PERPETUAL") == ["equipe@exemple.fr"]
+
+    service.retirer_destinataire("ETH-PERPETUAL", "equipe@exemple.fr")
+    service.retirer_destinataire("ETH-PERPETUAL", "inconnue@exemple.fr")
+    assert service.destinataires_actif("ETH-PERPETUAL") == []
+    assert service.destinataires == {}
+
+
+def test_alertes_envoyees_a_la_seule_session_proprietaire(service):
+    service.ajouter_regles_alertes([RegleSeuil(0.5)], "session-1", "un@exemple.fr", ["BTC-PERPETUAL"])
+    service.ajouter_regles_alertes([RegleSeuil(0.7)], "session-2", "deux@exemple.fr", ["BTC-PERPETUAL", "ETH-PERPETUAL"])
+
+    alertes = service.alertes.evaluer("BTC-PERPETUAL", 1.0, 0.8) + service.alertes.evaluer("ETH-PERPETUAL", 1.0, 0.8)
+
+    assert {(alerte.asset, alerte.regle): service.destinataires_alerte(alerte) for alerte in alertes} == {
+        ("BTC-PERPETUAL", "seuil_hausse_0.5"): ["un@exemple.fr"],
+        ("BTC-PERPETUAL", "seuil_hausse_0.7"): ["deux@exemple.fr"],
+        ("ETH-PERPETUAL", "seuil_hausse_0.5"): [],  # La session 1 ne suit pas ETH
+        ("ETH-PERPETUAL", "seuil_hausse_0.7"): ["deux@exemple.fr"],
+    }
+
+
+def test_regles_d_une_session_remplacees(service):
+    service.ajouter_regles_alertes([RegleSeuil(0.5)], "session-1", "un@exemple.fr", ["BTC-PERPETUAL"])
+
+    # Nouveau passage de la session avec d'autres réglages : l'ancienne règle disparaît au lieu de s'accumuler
+    noms = service.ajouter_regles_alertes([RegleSeuil(0.6)], "session-1", "nouvelle@exemple.fr", ["BTC-PERPETUAL"])
+
+    assert noms == ["seuil_hausse_0.6"]
+    assert [regle.nom for regle in service.alertes.regles] == ["seuil_hausse_0.6"]
+    [alerte] = service.alertes.evaluer("BTC-PERPETUAL", 1.0, 0.8)
+    assert service.destinataires_alerte(alerte) == ["nouvelle@exemple.fr"]
+
+    service.retirer_regles_alertes("session-1")
+    assert service.alertes.regles == []
+    assert service.destinataires_alerte(alerte) == []